@@ -2,11 +2,13 @@ from django.contrib import admin
 from .models.models import (
     Task, TipoDocumento, Docente, Estudiante, Programa, PeriodoAcademico,
     Asignatura, ResultadoDeAprendizaje, IndicadoresDeLogro, TipoActividad,
-    Actividad, RaActividad, Matricula, NotasActividad, Recurso, RaActividadIndicador
+    Actividad, RaActividad, Matricula, NotasActividad, Recurso, RaActividadIndicador,
+    Notificacion,
 )
 
 admin.site.register([
     Task, TipoDocumento, Docente, Estudiante, Programa, PeriodoAcademico,
     Asignatura, ResultadoDeAprendizaje, IndicadoresDeLogro, TipoActividad,
-    Actividad, RaActividad, Matricula, NotasActividad, Recurso, RaActividadIndicador
+    Actividad, RaActividad, Matricula, NotasActividad, Recurso, RaActividadIndicador,
+    Notificacion,
 ])
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .signals import signals  # noqa: F401
+        from .services import tareas  # noqa: F401  (registra las tareas de la cola)
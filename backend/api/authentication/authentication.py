@@ -0,0 +1,188 @@
+"""
+Autenticación por Bearer token (el token firmado que emite login_view).
+
+El token se verifica una sola vez por petición y el usuario (Docente/Estudiante) se
+resuelve a través de dos niveles de caché:
+- una LRU acotada en memoria del proceso (sin consultas ni red), con TTL corto;
+- la caché compartida de Django (entre workers), con TTL más largo.
+Los cambios de perfil o contraseña invalidan ambos niveles (ver signals/signals.py);
+en otros workers la LRU local puede servir el dato anterior a lo sumo AUTH_LRU_TTL segundos.
+Por eso la caché sólo resuelve tokens: login_view verifica la contraseña contra la fila
+recién leída (load_user), nunca contra un hash que otro worker pudo haber cambiado.
+
+El resultado queda en request.user como un Principal (rol, id, obj) y en request.auth
+el payload del token.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from rest_framework.authentication import BaseAuthentication
+
+from ..models.models import Docente, Estudiante
+
+TOKEN_MAX_AGE = 60 * 60 * 24 * 7
+STREAM_TOKEN_MAX_AGE = getattr(settings, "SSE_TOKEN_MAX_AGE", 60)
+_STREAM_SALT = "api.notificaciones.stream"
+LRU_SIZE = getattr(settings, "AUTH_LRU_SIZE", 2048)
+LRU_TTL = getattr(settings, "AUTH_LRU_TTL", 60)
+SHARED_TTL = getattr(settings, "AUTH_SHARED_CACHE_TTL", 300)
+
+_MODELS = {"docente": Docente, "estudiante": Estudiante}
+
+
+class Principal:
+    """Usuario autenticado: rol ("docente" | "estudiante"), id y la instancia del modelo."""
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, rol, id, obj):
+        self.rol, self.id, self.obj = rol, id, obj
+        self.pk = id
+
+    def __repr__(self):
+        return f"<Principal {self.rol}:{self.id}>"
+
+
+class _LRU:
+    def __init__(self, size, ttl):
+        self.size, self.ttl = size, ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_tokens = _LRU(LRU_SIZE, LRU_TTL)
+_users = _LRU(LRU_SIZE, LRU_TTL)
+
+
+def _shared_key(rol, uid):
+    return f"auth:user:{rol}:{uid}"
+
+
+def decode_token(token):
+    """Payload del token o None si es inválido/expiró. Verifica la firma una vez por token y proceso."""
+    hit = _tokens.get(token)
+    if hit is not None:
+        payload, expires_at = hit
+        return payload if expires_at > time.time() else None
+    try:
+        payload = signing.loads(token, max_age=TOKEN_MAX_AGE)
+        issued_at = signing.b62_decode(token.rsplit(":", 2)[-2])
+    except Exception:
+        return None
+    expires_at = issued_at + TOKEN_MAX_AGE
+    _tokens.set(token, (payload, expires_at), ttl=min(LRU_TTL, max(0, expires_at - time.time())))
+    return payload
+
+
+def get_user(rol, uid):
+    """Docente/Estudiante (con tipo_documento) a través de la LRU local y la caché compartida."""
+    model = _MODELS.get(rol)
+    if model is None or uid is None:
+        return None
+    key = _shared_key(rol, uid)
+    u = _users.get(key)
+    if u is not None:
+        return u
+    u = cache.get(key)
+    if u is None:
+        u = model.objects.filter(pk=uid).select_related("tipo_documento").first()
+        if u is None:
+            return None
+        cache.set(key, u, SHARED_TTL)
+    _users.set(key, u)
+    return u
+
+
+def load_user(rol, uid):
+    """Docente/Estudiante leído de la base, sin pasar por las cachés (login)."""
+    model = _MODELS.get(rol)
+    if model is None or uid is None:
+        return None
+    return model.objects.filter(pk=uid).select_related("tipo_documento").first()
+
+
+def invalidate_user(rol, uid):
+    key = _shared_key(rol, uid)
+    _users.delete(key)
+    cache.delete(key)
+
+
+def bearer_token(request):
+    auth = request.headers.get("Authorization", "")
+    return auth.split(" ", 1)[1] if auth.startswith("Bearer ") and " " in auth else None
+
+
+def principal_from_token(token):
+    """(Principal, payload) para un token válido de un usuario existente, o None."""
+    payload = decode_token(token) if token else None
+    if not payload:
+        return None
+    rol = payload.get("rol")
+    u = get_user(rol, payload.get("id"))
+    if u is None:
+        return None
+    return Principal(rol, u.pk, u), payload
+
+
+def stream_token(principal):
+    """
+    Token para ?token= del stream SSE (EventSource no admite headers): firmado con otra sal,
+    sólo sirve para ese endpoint y vence en STREAM_TOKEN_MAX_AGE segundos, así el que queda
+    en los logs de acceso y proxies no vale como sesión.
+    """
+    return signing.dumps({"rol": principal.rol, "id": principal.id}, salt=_STREAM_SALT)
+
+
+def principal_from_stream_token(token):
+    """Principal de un token de stream_token() vigente, o None."""
+    try:
+        payload = signing.loads(token, salt=_STREAM_SALT, max_age=STREAM_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    u = get_user(payload.get("rol"), payload.get("id"))
+    return Principal(payload["rol"], u.pk, u) if u is not None else None
+
+
+class BearerTokenAuthentication(BaseAuthentication):
+    """
+    Autentica con `Authorization: Bearer <token>`. Un token ausente o inválido deja la
+    petición como anónima (las vistas públicas siguen funcionando); las vistas que exigen
+    sesión usan views._principal_or_401 para responder 401.
+    """
+
+    def authenticate(self, request):
+        return principal_from_token(bearer_token(request))
+
+    def authenticate_header(self, request):
+        return "Bearer"
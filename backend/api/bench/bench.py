@@ -0,0 +1,235 @@
+"""
+Benchmark de endpoints: recorre las rutas de `manage.py list_urls`, rellena los
+parámetros de path con datos reales de la base (la asignatura con más matrículas,
+su RA con más actividades, un estudiante matriculado y, para las rutas que exigen
+docente, el de la asignatura...) y mide por endpoint:
+latencia p50/p95/p99, consultas SQL por request (con metrics.contar_consultas, que
+también ve las que las vistas async corren en hilos de concurrencia.gather) y pico de
+memoria Python (tracemalloc, en una corrida aparte para no distorsionar los tiempos).
+
+Las requests van con un Host de ALLOWED_HOSTS (el `testserver` del Client de pruebas
+se rechaza fuera de los tests) y contra una caché LocMem propia: la pasada en frío la
+vacía sin tocar la caché compartida del despliegue. Una ruta que responde con error
+no se mide; run() termina con BenchError listándolas.
+
+Los resultados se guardan como JSON ({tamaño: {ruta: métricas}}) y compare()
+los contrasta con una línea base: una ruta regresa si su p95 o su pico de memoria
+superan la base en más del umbral, o si hace más consultas que la base.
+Lo usan el comando bench_endpoints y EndpointBenchmarkTests (api/tests.py).
+"""
+import json
+import math
+import re
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import get_resolver
+
+from ..management.commands.list_urls import flatten
+from ..metrics.metrics import contar_consultas
+from ..models.models import Matricula, RaActividad
+
+_PARAM = re.compile(r"\(\?P<(\w+)>[^)]*\)|<(?:\w+:)?(\w+)>")
+
+# Rutas que no tiene sentido medir con GET repetidos (el stream SSE no termina; login
+# acepta GET pero necesita credenciales en la query string)
+EXCLUIR = {"api/", "api/metrics", "api/notificaciones/stream", "api/auth/login"}
+
+# Query string realista por ruta (plantilla normalizada -> {param: clave del contexto})
+QUERY = {
+    "api/ras/<ra_id>/actividades/": {"id_matricula": "id_matricula"},
+    "api/asignaturas/<codigo_asignatura>/gradebook/": {"id_periodo": "id_periodo"},
+    "api/asignaturas/<codigo_asignatura>/indicadores": {"id_periodo": "id_periodo"},
+}
+
+
+class BenchError(RuntimeError):
+    """Rutas que respondieron con un status distinto de 2xx/3xx: {plantilla: status}."""
+    def __init__(self, fallidas):
+        self.fallidas = fallidas
+        super().__init__(", ".join(f"{p} ({s})" for p, s in sorted(fallidas.items())))
+
+
+def _normalizar(path):
+    return _PARAM.sub(lambda m: f"<{m.group(1) or m.group(2)}>", path)
+
+
+def routes():
+    """[(plantilla, [parámetros], callback)] de las rutas GET candidatas bajo api/."""
+    out = []
+    for path, _, _, cb in flatten(get_resolver().url_patterns):
+        plantilla = _normalizar(path)
+        if not plantilla.startswith("api/") or plantilla in EXCLUIR or "<format>" in plantilla:
+            continue
+        params = [m.group(1) or m.group(2) for m in _PARAM.finditer(path)]
+        out.append((plantilla, params, cb))
+    return sorted(out, key=lambda r: r[0])
+
+
+def contexto():
+    """Parámetros realistas tomados del dataset actual (None si la base está vacía)."""
+    top = (Matricula.objects.values("asignatura_id", "asignatura__codigo_asignatura",
+                                    "asignatura__programa_id", "asignatura__docente_id", "periodo_id")
+           .annotate(n=Count("id_matricula")).order_by("-n").first())
+    if not top:
+        return None
+    mat = (Matricula.objects.filter(asignatura_id=top["asignatura_id"], periodo_id=top["periodo_id"])
+           .order_by("id_matricula").values("id_matricula", "estudiante_id").first())
+    ra = (RaActividad.objects.filter(ra__asignatura_id=top["asignatura_id"])
+          .values("ra_id").annotate(n=Count("id_ra_actividad")).order_by("-n").first())
+    return {
+        "codigo_asignatura": top["asignatura__codigo_asignatura"],
+        "id_programa": top["asignatura__programa_id"],
+        "id_periodo": top["periodo_id"],
+        "id_matricula": mat["id_matricula"],
+        "id_estudiante": mat["estudiante_id"],
+        "ra_id": ra["ra_id"] if ra else 0,
+        "token": signing.dumps({"rol": "estudiante", "id": mat["estudiante_id"]}),
+        # Rutas sólo para docentes (p. ej. exportaciones): el docente de la asignatura
+        "token_docente": signing.dumps({"rol": "docente", "id": top["asignatura__docente_id"]}),
+    }
+
+
+def _valor(param, cb, ctx):
+    if param == "pk":
+        model = getattr(getattr(getattr(cb, "cls", None), "queryset", None), "model", None)
+        return model.objects.order_by("pk").values_list("pk", flat=True).first() if model else None
+    return ctx.get(param)
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _host():
+    """Primer host concreto de ALLOWED_HOSTS ("localhost" si sólo hay comodines o está vacío)."""
+    return next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+
+
+def _cache_aislada():
+    """Cada alias de CACHES como LocMem propia del benchmark."""
+    return override_settings(CACHES={
+        alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"bench-{alias}"}
+        for alias in settings.CACHES
+    })
+
+
+def _get(client, url, query, token):
+    response = client.get(url, query, HTTP_AUTHORIZATION=f"Bearer {token}")
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def run(repeat=20, warmup=2, filtro=None, ctx=None, stdout=None):
+    """{plantilla: {url, status, p50_ms, p95_ms, p99_ms, queries, peak_kb}} para el dataset actual."""
+    ctx = ctx or contexto()
+    if ctx is None:
+        return {}
+    with _cache_aislada():
+        return _run(Client(HTTP_HOST=_host()), repeat, warmup, filtro, ctx, stdout)
+
+
+def _run(client, repeat, warmup, filtro, ctx, stdout):
+    out, fallidas = {}, {}
+    for plantilla, params, cb in routes():
+        if filtro and filtro not in plantilla:
+            continue
+        valores = {p: _valor(p, cb, ctx) for p in params}
+        if any(v is None for v in valores.values()):
+            continue
+        url = "/" + plantilla
+        for p, v in valores.items():
+            url = url.replace(f"<{p}>", str(v))
+        query = {k: ctx[v] for k, v in QUERY.get(plantilla, {}).items()}
+
+        cache.clear()  # primera llamada en frío, como después de un deploy
+        token = ctx["token"]
+        response = _get(client, url, query, token)
+        if response.status_code in (401, 403) and ctx.get("token_docente"):
+            token = ctx["token_docente"]
+            response = _get(client, url, query, token)
+        if response.status_code in (404, 405):
+            continue  # sólo POST/PUT, o sin datos para esta ruta
+        if not 200 <= response.status_code < 400:
+            fallidas[plantilla] = response.status_code
+            if stdout:
+                stdout.write(f"{plantilla:<60} {response.status_code:>3} ERROR, no se mide")
+            continue
+        for _ in range(max(0, warmup - 1)):
+            _get(client, url, query, token)
+
+        tiempos, consultas = [], 0
+        for _ in range(repeat):
+            with contar_consultas() as q:
+                t0 = time.perf_counter()
+                _get(client, url, query, token)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            consultas = max(consultas, q.count)
+
+        tracemalloc.start()
+        try:
+            _get(client, url, query, token)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        out[plantilla] = {
+            "url": url, "status": response.status_code,
+            "p50_ms": round(_percentil(tiempos, 50), 3),
+            "p95_ms": round(_percentil(tiempos, 95), 3),
+            "p99_ms": round(_percentil(tiempos, 99), 3),
+            "queries": consultas,
+            "peak_kb": round(peak / 1024, 1),
+        }
+        if stdout:
+            stdout.write(format_row(plantilla, out[plantilla]))
+    if fallidas:
+        raise BenchError(fallidas)
+    return out
+
+
+def format_row(plantilla, m):
+    return (f"{plantilla:<60} {m['status']:>3} p50={m['p50_ms']:>8.2f}ms p95={m['p95_ms']:>8.2f}ms "
+            f"p99={m['p99_ms']:>8.2f}ms q={m['queries']:>4} mem={m['peak_kb']:>9.1f}KB")
+
+
+def compare(resultados, base, threshold=0.25, min_ms=5.0, min_kb=64.0):
+    """
+    Regresiones [str] de `resultados` frente a `base` (ambos {tamaño: {ruta: métricas}}).
+    Además del umbral relativo, la diferencia debe superar min_ms / min_kb: en rutas de
+    pocos milisegundos el ruido del scheduler duplica el p95 sin que nada haya cambiado.
+    Rutas o tamaños nuevos no cuentan como regresión.
+    """
+    out = []
+    for size, rutas in resultados.items():
+        for plantilla, m in rutas.items():
+            b = base.get(size, {}).get(plantilla)
+            if not b:
+                continue
+            if m["queries"] > b["queries"]:
+                out.append(f"[{size}] {plantilla}: consultas {b['queries']} -> {m['queries']}")
+            if m["p95_ms"] > max(b["p95_ms"] * (1 + threshold), b["p95_ms"] + min_ms):
+                out.append(f"[{size}] {plantilla}: p95 {b['p95_ms']}ms -> {m['p95_ms']}ms")
+            if m["peak_kb"] > max(b["peak_kb"] * (1 + threshold), b["peak_kb"] + min_kb):
+                out.append(f"[{size}] {plantilla}: memoria {b['peak_kb']}KB -> {m['peak_kb']}KB")
+    return out
+
+
+def load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save(path, data):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write("\n")
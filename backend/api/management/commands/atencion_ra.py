@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models.models import Programa, PeriodoAcademico
+from api.services import analitica
+
+class Command(BaseCommand):
+    help = "Calcula el logro de RA/indicadores de un programa (o de todos) y deja el resultado en caché"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--programa", type=int, help="id_programa (por defecto todos)")
+        parser.add_argument("--periodo", help="Descripción del periodo (p. ej. 2025-1)")
+        parser.add_argument("--json", action="store_true", help="Imprime el resultado completo en JSON")
+
+    def handle(self, *args, **options):
+        periodo_id = None
+        if options["periodo"]:
+            periodo_id = (PeriodoAcademico.objects
+                          .filter(descripcion=options["periodo"])
+                          .values_list("id_periodo", flat=True)
+                          .first())
+            if not periodo_id:
+                raise CommandError(f"Periodo {options['periodo']} no existe")
+        programas = Programa.objects.order_by("id_programa").values_list("id_programa", flat=True)
+        if options["programa"]:
+            programas = programas.filter(pk=options["programa"])
+        for id_programa in programas:
+            res = analitica.get(id_programa, periodo_id, refresh=True)
+            if options["json"]:
+                self.stdout.write(json.dumps(res, ensure_ascii=False))
+                continue
+            for a in res["asignaturas"]:
+                for ra in a["ras"]:
+                    self.stdout.write(
+                        f"{a['codigo_asignatura']}\tRA {ra['id_ra']}\tevaluados={ra['evaluados']}\t"
+                        f"promedio={ra['promedio']}\taprobacion={ra['tasa_aprobacion']}"
+                    )
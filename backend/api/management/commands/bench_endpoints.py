@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bench import bench
+
+
+class Command(BaseCommand):
+    help = ("Mide p50/p95/p99, consultas y memoria de cada ruta GET de list_urls sobre los datos actuales "
+            "y compara contra una línea base JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Requests medidos por ruta")
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--route", help="Solo rutas que contengan este texto")
+        parser.add_argument("--label", default="actual", help="Clave del dataset en el JSON (p. ej. el tamaño)")
+        parser.add_argument("--baseline", help="JSON de línea base {label: {ruta: métricas}}")
+        parser.add_argument("--save-baseline", action="store_true", help="Escribe/actualiza --baseline con esta corrida")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Regresión tolerada (0.25 = +25%%)")
+        parser.add_argument("--output", help="Guarda los resultados de esta corrida en JSON")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat debe ser >= 1")
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline requiere --baseline")
+        ctx = bench.contexto()
+        if ctx is None:
+            raise CommandError("No hay matrículas; cargue datos primero (manage.py seed_load)")
+
+        try:
+            resultados = {options["label"]: bench.run(options["repeat"], options["warmup"], options["route"],
+                                                      ctx=ctx, stdout=self.stdout)}
+        except bench.BenchError as e:
+            raise CommandError(f"Rutas con error, revise ALLOWED_HOSTS/datos antes de medir: {e}")
+        if options["output"]:
+            bench.save(options["output"], resultados)
+
+        path = options["baseline"]
+        if not path:
+            return
+        base = bench.load(path) if os.path.exists(path) else {}
+        if options["save_baseline"]:
+            base.update(resultados)
+            bench.save(path, base)
+            self.stdout.write(f"Línea base actualizada en {path}")
+            return
+        regresiones = bench.compare(resultados, base, options["threshold"])
+        for r in regresiones:
+            self.stderr.write(r)
+        if regresiones:
+            raise CommandError(f"{len(regresiones)} regresiones frente a {path}")
+        self.stdout.write(f"Sin regresiones frente a {path} (umbral {options['threshold']:.0%})")
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.serializers.serializers import (
+    ValuesReadSerializer, TipoDocumentoSerializer, TipoActividadSerializer, ProgramaSerializer,
+    DocenteSerializer, EstudianteSerializer, AsignaturaSerializer,
+)
+
+SERIALIZERS = {
+    "tipo_documento": TipoDocumentoSerializer,
+    "tipo_actividad": TipoActividadSerializer,
+    "programa": ProgramaSerializer,
+    "docente": DocenteSerializer,
+    "estudiante": EstudianteSerializer,
+    "asignatura": AsignaturaSerializer,
+}
+
+class Command(BaseCommand):
+    help = "Compara filas/segundo de ModelSerializer vs ValuesReadSerializer sobre los datos actuales"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", choices=sorted(SERIALIZERS), help="Repetible; por defecto todos")
+        parser.add_argument("--limit", type=int, default=20000, help="Máximo de filas por corrida")
+        parser.add_argument("--repeat", type=int, default=3, help="Corridas por serializer (se toma la mejor)")
+
+    def _best(self, fn, repeat):
+        best, n = None, 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            n = len(fn())
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return n, best
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat debe ser >= 1")
+        self.stdout.write("modelo\tfilas\tModelSerializer filas/s\tValuesReadSerializer filas/s\tx")
+        for name in options["model"] or sorted(SERIALIZERS):
+            ser = SERIALIZERS[name]
+            qs = ser.Meta.model.objects.order_by("pk")[:options["limit"]]
+            reader = ValuesReadSerializer.for_serializer(ser)
+            n, t_full = self._best(lambda: ser(qs.all(), many=True).data, options["repeat"])
+            _, t_fast = self._best(lambda: reader.to_representation(reader.rows(qs.all())), options["repeat"])
+            if not n:
+                self.stdout.write(f"{name}\t0\t-\t-\t-")
+                continue
+            self.stdout.write(f"{name}\t{n}\t{n / t_full:,.0f}\t{n / t_fast:,.0f}\t{t_full / t_fast:.1f}")
@@ -0,0 +1,37 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import resumenes, trabajos
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía a cada estudiante el resumen de actividades sin calificar que vencen en los "
+        "próximos --dias días (ejecutar a diario, p. ej. vía cron; repetirlo el mismo día no duplica)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=resumenes.DIAS)
+        parser.add_argument("--fecha", help="Fecha de referencia YYYY-MM-DD (por defecto, hoy)")
+        parser.add_argument("--solo-generar", action="store_true", help="Llenar la bandeja de salida sin enviar")
+        parser.add_argument("--encolar", action="store_true", help="Delegar el pipeline a la cola de trabajos (run_workers)")
+
+    def handle(self, *args, **opts):
+        if opts["dias"] < 1:
+            raise CommandError("--dias debe ser >= 1")
+        try:
+            hoy = datetime.date.fromisoformat(opts["fecha"]) if opts["fecha"] else None
+        except ValueError:
+            raise CommandError(f"Fecha inválida: {opts['fecha']!r} (use YYYY-MM-DD)")
+        if opts["encolar"]:
+            if hoy:
+                raise CommandError("--encolar usa la fecha del worker; no se combina con --fecha")
+            t = trabajos.encolar("resumen_vencimientos", dias=opts["dias"])
+            self.stdout.write(f"Trabajo {t.id} encolado")
+            return
+        creados = resumenes.generar(opts["dias"], hoy)
+        self.stdout.write(f"{creados} resúmenes nuevos en la bandeja de salida")
+        if not opts["solo_generar"]:
+            enviados, con_error = resumenes.enviar_pendientes()
+            self.stdout.write(f"{enviados} correos enviados, {con_error} con error")
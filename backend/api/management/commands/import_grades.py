@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models.models import Asignatura, PeriodoAcademico
+from api.services.importacion import import_grades, ImportacionError, CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = "Importa notas de una asignatura desde un archivo CSV o XLSX (formato largo o ancho)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--asignatura", required=True, help="codigo_asignatura")
+        parser.add_argument("--periodo", help="Descripción del periodo (p. ej. 2025-1)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        asignatura = Asignatura.objects.filter(codigo_asignatura=options["asignatura"]).first()
+        if not asignatura:
+            raise CommandError(f"Asignatura {options['asignatura']} no existe")
+        periodo_id = None
+        if options["periodo"]:
+            periodo_id = (PeriodoAcademico.objects
+                          .filter(descripcion=options["periodo"])
+                          .values_list("id_periodo", flat=True)
+                          .first())
+            if not periodo_id:
+                raise CommandError(f"Periodo {options['periodo']} no existe")
+        try:
+            with open(options["archivo"], "rb") as f:
+                res = import_grades(f, options["archivo"], asignatura, periodo_id, chunk_size=options["chunk_size"])
+        except (OSError, ImportacionError) as e:
+            raise CommandError(str(e))
+        for err in res["errores"]:
+            self.stderr.write(f"línea {err['linea']}: {err['error']}")
+        self.stdout.write(
+            f"{res['filas']} filas: {res['created']} creadas, {res['updated']} actualizadas, "
+            f"{res['duplicate']} duplicadas, {res['error']} con error"
+        )
@@ -11,7 +11,7 @@ def flatten(patterns, prefix=""):
             name = p.name or ""
             cb = p.callback
             view = f"{cb.__module__}.{getattr(cb, '__name__', cb.__class__.__name__)}"
-            yield (path, name, view)
+            yield (path, name, view, cb)
 
 class Command(BaseCommand):
     help = "Lista todas las URLs registradas"
@@ -20,5 +20,5 @@ class Command(BaseCommand):
         resolver = get_resolver()
         rows = list(flatten(resolver.url_patterns))
         rows.sort(key=lambda r: r[0])
-        for path, name, view in rows:
+        for path, name, view, _ in rows:
             self.stdout.write(f"{path}\t{name}\t{view}")
\ No newline at end of file
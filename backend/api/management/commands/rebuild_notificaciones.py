@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api.services.notificaciones import rebuild_all
+
+class Command(BaseCommand):
+    help = "Recalcula el feed de notificaciones de todas las matrículas (ejecutar a diario, p. ej. vía cron)"
+
+    def handle(self, *args, **options):
+        n = rebuild_all()
+        self.stdout.write(f"Notificaciones recalculadas para {n} matrículas")
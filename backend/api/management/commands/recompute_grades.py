@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models.models import Asignatura, Matricula
+from api.services.calificaciones import recompute_matriculas
+
+class Command(BaseCommand):
+    help = "Recalcula NotaRa y Matricula.nota_final (todas las asignaturas o solo --asignatura)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asignatura", help="codigo_asignatura")
+
+    def handle(self, *args, **options):
+        mats = Matricula.objects.all()
+        if options["asignatura"]:
+            asig = Asignatura.objects.filter(codigo_asignatura=options["asignatura"]).first()
+            if not asig:
+                raise CommandError(f"Asignatura {options['asignatura']} no existe")
+            mats = mats.filter(asignatura=asig)
+        ids = list(mats.values_list("id_matricula", flat=True))
+        recompute_matriculas(ids)
+        self.stdout.write(f"Notas recalculadas para {len(ids)} matrículas")
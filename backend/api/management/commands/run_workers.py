@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.services import trabajos
+
+MANTENIMIENTO_CADA = 60  # segundos entre rescatar()/purgar() en el proceso padre
+
+
+def _vigilar_padre(parada, ppid):
+    while not parada.is_set():
+        time.sleep(5)
+        if os.getppid() != ppid:
+            parada.set()  # el padre murió sin avisar (SIGKILL): no quedar huérfanos
+
+
+def _worker(parada, burst, ppid):
+    # Sólo el padre atiende Ctrl-C/SIGTERM (también si llegan a todo el grupo) y avisa por `parada`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    threading.Thread(target=_vigilar_padre, args=(parada, ppid), daemon=True).start()
+    try:
+        trabajos.trabajar(parada, burst=burst)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta N procesos worker de la cola de trabajos (services/trabajos.py). "
+        "SIGTERM/Ctrl-C terminan el trabajo en curso y salen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=multiprocessing.cpu_count(),
+                            help="Procesos worker (por defecto, uno por CPU)")
+        parser.add_argument("--burst", action="store_true",
+                            help="Salir cuando no queden trabajos vencidos (cron, CI)")
+
+    def handle(self, *args, **opts):
+        n = opts["concurrency"]
+        if n < 1:
+            raise CommandError("--concurrency debe ser >= 1")
+        # fork: los hijos heredan Django ya configurado (spawn tendría que reimportar todo)
+        ctx = multiprocessing.get_context("fork")
+        parada = ctx.Event()
+        # El handler sólo marca; el bucle de abajo avisa a los hijos por `parada` (Event.set en un
+        # handler puede bloquearse si interrumpe una operación sobre el mismo Event)
+        detener = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: detener.append(True))
+
+        def lanzar():
+            # Que ningún hijo herede sockets del padre: ni su conexión ni el pool de psycopg
+            # (sus hilos no sobreviven al fork); cada proceso arma el suyo al conectarse
+            connections.close_all()
+            for conn in connections.all(initialized_only=True):
+                if getattr(conn, "pool", None) is not None:
+                    conn.close_pool()
+            p = ctx.Process(target=_worker, args=(parada, opts["burst"], os.getpid()), daemon=False)
+            p.start()
+            return p
+
+        procesos = [lanzar() for _ in range(n)]
+        self.stdout.write(f"{n} workers en marcha (pids {', '.join(str(p.pid) for p in procesos)})")
+        ultimo = 0.0
+        while not detener:
+            if time.monotonic() - ultimo >= MANTENIMIENTO_CADA:
+                rescatados, purgados = trabajos.rescatar(), trabajos.purgar()
+                if rescatados or purgados:
+                    self.stdout.write(f"{rescatados} trabajos rescatados, {purgados} purgados")
+                ultimo = time.monotonic()
+            for i, p in enumerate(procesos):
+                if p.is_alive():
+                    continue
+                if opts["burst"] and p.exitcode == 0:
+                    continue
+                self.stderr.write(f"Worker {p.pid} terminó (código {p.exitcode}); se reinicia")
+                procesos[i] = lanzar()
+            if opts["burst"] and not any(p.is_alive() for p in procesos):
+                break
+            time.sleep(1)
+
+        parada.set()
+        for p in procesos:
+            p.join()
+        connections.close_all()
+        self.stdout.write("Workers detenidos")
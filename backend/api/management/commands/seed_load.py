@@ -0,0 +1,333 @@
+import datetime
+import io
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from api.models.models import (
+    TipoDocumento, TipoActividad, Programa, PeriodoAcademico, Docente, Estudiante, Asignatura,
+    ResultadoDeAprendizaje, IndicadoresDeLogro, Actividad, RaActividad, RaActividadIndicador,
+    Matricula, NotasActividad,
+)
+from api.services import identidad, calificaciones, notificaciones, estructura, versiones
+
+TIPOS_ACTIVIDAD = ("Taller", "Quiz", "Parcial", "Proyecto", "Exposición")
+
+
+def _rango(valor):
+    """'3' -> (3, 3); '2-5' -> (2, 5)."""
+    try:
+        a, _, b = str(valor).partition("-")
+        lo, hi = int(a), int(b or a)
+    except ValueError:
+        raise CommandError(f"Rango inválido: {valor!r} (use N o N-M)")
+    if lo < 0 or hi < lo:
+        raise CommandError(f"Rango inválido: {valor!r}")
+    return lo, hi
+
+
+def _reparto(n):
+    """n porcentajes con 2 decimales que suman exactamente 100."""
+    base = (Decimal(100) / n).quantize(Decimal("0.01"))
+    return [base] * (n - 1) + [Decimal(100) - base * (n - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Genera un dataset sintético completo (programas, docentes, asignaturas, RA, indicadores, "
+            "actividades, matrículas y notas) para pruebas de carga")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--programas", type=int, default=2)
+        parser.add_argument("--estudiantes", type=int, default=1000, help="Estudiantes por programa")
+        parser.add_argument("--periodos", type=int, default=2)
+        parser.add_argument("--docentes", type=int, default=10, help="Docentes por programa")
+        parser.add_argument("--asignaturas", type=int, default=10, help="Asignaturas por programa")
+        parser.add_argument("--ras", default="2-4", help="RA por asignatura (N o N-M)")
+        parser.add_argument("--indicadores", default="1-3", help="Indicadores por RA (N o N-M)")
+        parser.add_argument("--actividades", default="2-5", help="Actividades por RA (N o N-M)")
+        parser.add_argument("--matriculas", default="4-6", help="Asignaturas por estudiante y periodo (N o N-M)")
+        parser.add_argument("--cobertura", type=float, default=0.85, help="Fracción de (matrícula, actividad) con nota")
+        parser.add_argument("--nota-media", type=float, default=3.6)
+        parser.add_argument("--nota-desviacion", type=float, default=0.8)
+        parser.add_argument("--tag", help="Prefijo de códigos/correos (por defecto uno derivado de la hora)")
+        parser.add_argument("--seed", type=int, default=None, help="Semilla del generador aleatorio")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--no-copy", action="store_true", help="Usar bulk_create aunque haya COPY disponible")
+        parser.add_argument("--fk-checks", action="store_true",
+                            help="No desactivar los triggers de FK durante la carga de matrículas y notas")
+        parser.add_argument("--recompute", action="store_true",
+                            help="Al final recalcular NotaRa/nota_final y el feed de notificaciones")
+
+    # --- utilidades ---
+
+    def _log(self, msg):
+        self.stdout.write(f"[{time.perf_counter() - self.t0:7.1f}s] {msg}")
+
+    def _bulk(self, model, objs):
+        """bulk_create por lotes; devuelve los objetos con PK (PostgreSQL hace RETURNING)."""
+        out = []
+        for i in range(0, len(objs), self.batch_size):
+            out += model.objects.bulk_create(objs[i:i + self.batch_size])
+        return out
+
+    def _copy_disponible(self):
+        if self.no_copy or connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cur:
+            return hasattr(cur.cursor, "copy_expert") or hasattr(cur.cursor, "copy")  # psycopg2 / psycopg 3
+
+    def _copy(self, table, columns, buf):
+        buf.seek(0)
+        sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        with connection.cursor() as cur:
+            if hasattr(cur.cursor, "copy_expert"):
+                cur.cursor.copy_expert(sql, buf)
+                return
+            with cur.cursor.copy(sql) as copy:
+                while data := buf.read(1 << 20):
+                    copy.write(data)
+
+    @contextmanager
+    def _sin_fk(self):
+        """
+        session_replication_role = replica: PostgreSQL omite los triggers de integridad
+        referencial (el chequeo fila a fila de las FK domina el tiempo de COPY). Los datos
+        generados son consistentes por construcción. Requiere superusuario; si no, se
+        carga con los chequeos normales.
+        """
+        activo = False
+        if not self.fk_checks and connection.vendor == "postgresql":
+            try:
+                with connection.cursor() as cur:
+                    cur.execute("SET session_replication_role = replica")
+                activo = True
+            except DatabaseError:
+                self._log("Sin permiso para session_replication_role; se mantienen los chequeos de FK")
+        try:
+            yield
+        finally:
+            if activo:
+                with connection.cursor() as cur:
+                    cur.execute("SET session_replication_role = DEFAULT")
+
+    # --- etapas ---
+
+    def handle(self, *args, **o):
+        for name in ("programas", "estudiantes", "periodos", "docentes", "asignaturas", "batch_size"):
+            if o[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} debe ser >= 1")
+        if not 0 <= o["cobertura"] <= 1:
+            raise CommandError("--cobertura debe estar entre 0 y 1")
+        self.t0 = time.perf_counter()
+        self.rng = np.random.default_rng(o["seed"])
+        self.batch_size = o["batch_size"]
+        self.no_copy = o["no_copy"]
+        self.fk_checks = o["fk_checks"]
+        self.tag = o["tag"] or np.base_repr(int(time.time()), 36)[-5:]
+        self.password = make_password("seed")  # un solo hash para todas las cuentas
+
+        ranges = {k: _rango(o[k]) for k in ("ras", "indicadores", "actividades", "matriculas")}
+        if ranges["ras"][0] < 1 or ranges["indicadores"][0] < 1 or ranges["actividades"][0] < 1:
+            raise CommandError("--ras, --indicadores y --actividades deben ser >= 1")
+
+        with transaction.atomic():
+            td, _ = TipoDocumento.objects.get_or_create(descripcion="CC")
+            tipos = [TipoActividad.objects.get_or_create(descripcion=d)[0].pk for d in TIPOS_ACTIVIDAD]
+            periodos = self._periodos(o["periodos"])
+            programas = self._bulk(Programa, [
+                Programa(nombre=f"Programa {self.tag}-{p}", codigo_programa=f"{self.tag}P{p:03d}")
+                for p in range(o["programas"])
+            ])
+            docentes = self._docentes(td, programas, o["docentes"])
+            asignaturas = self._asignaturas(programas, docentes, o["asignaturas"])
+            rels = self._estructura(asignaturas, tipos, ranges)
+        self._log(f"{len(programas)} programas, {len(asignaturas)} asignaturas, "
+                  f"{sum(len(r) for r in rels.values())} RA-actividades")
+
+        estudiantes = self._estudiantes(td, programas, o["estudiantes"])
+        with self._sin_fk():
+            mats = self._matriculas(estudiantes, asignaturas, periodos, ranges["matriculas"])
+            n_notas = self._notas(mats, rels, o["cobertura"], o["nota_media"], o["nota_desviacion"])
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cur:
+                cur.execute("ANALYZE")
+        self._invalidar(asignaturas)
+
+        if o["recompute"]:
+            ids = [m for ids in mats.values() for m in ids]
+            calificaciones.recompute_matriculas(ids)
+            self._log("NotaRa / nota_final recalculadas")
+            notificaciones.refresh_matriculas(ids)
+            self._log("Feed de notificaciones reconstruido")
+
+        self._log(f"Listo (tag {self.tag}): {sum(len(v) for v in mats.values())} matrículas, {n_notas} notas")
+
+    def _periodos(self, n):
+        hoy = datetime.date.today()
+        out = []
+        year, sem = hoy.year, 1 if hoy.month <= 6 else 2
+        for _ in range(n):
+            inicio = datetime.date(year, 1 if sem == 1 else 7, 1)
+            fin = datetime.date(year, 6, 30) if sem == 1 else datetime.date(year, 12, 15)
+            out.append(PeriodoAcademico.objects.get_or_create(
+                descripcion=f"{year}-{sem}", defaults={"fecha_inicio": inicio, "fecha_finalizacion": fin})[0])
+            year, sem = (year, 1) if sem == 2 else (year - 1, 2)
+        return out
+
+    def _docentes(self, td, programas, n):
+        objs = [
+            Docente(nombre=f"Docente{i}", apellido=f"P{p.pk}", codigo_docente=f"{self.tag}D{p.pk}-{i}",
+                    contrasenia_docente=self.password, correo=f"{self.tag.lower()}.d{p.pk}.{i}@seed.local",
+                    tipo_documento=td, num_documento=f"{self.tag}D{p.pk}-{i}")
+            for p in programas for i in range(n)
+        ]
+        docentes = self._bulk(Docente, objs)  # mismo orden que objs
+        identidad.sync_bulk("docente", docentes)
+        return {p.pk: docentes[j * n:(j + 1) * n] for j, p in enumerate(programas)}
+
+    def _asignaturas(self, programas, docentes, n):
+        objs = []
+        for p in programas:
+            for i in range(n):
+                objs.append(Asignatura(nombre=f"Asignatura {i} ({p.codigo_programa})",
+                                       codigo_asignatura=f"{p.codigo_programa}A{i:03d}",
+                                       docente=docentes[p.pk][i % len(docentes[p.pk])], programa=p))
+        return self._bulk(Asignatura, objs)
+
+    def _entre(self, rango):
+        return int(self.rng.integers(rango[0], rango[1] + 1))
+
+    def _estructura(self, asignaturas, tipos, ranges):
+        """RA, indicadores, actividades y relaciones. Devuelve {id_asignatura: [(id_ra_actividad, id_ind)]}."""
+        hoy = datetime.date.today()
+        ras = []
+        for a in asignaturas:
+            for pct in _reparto(self._entre(ranges["ras"])):
+                ras.append(ResultadoDeAprendizaje(asignatura=a, porcentaje_ra=pct, descripcion=f"RA {len(ras) + 1}"))
+        ras = self._bulk(ResultadoDeAprendizaje, ras)
+
+        inds = []
+        for ra in ras:
+            for k, pct in enumerate(_reparto(self._entre(ranges["indicadores"]))):
+                inds.append(IndicadoresDeLogro(ra=ra, porcentaje_ind=pct, descripcion=f"Indicador {k + 1}"))
+        inds = self._bulk(IndicadoresDeLogro, inds)
+        inds_por_ra = {}
+        for ind in inds:
+            inds_por_ra.setdefault(ind.ra_id, []).append(ind.pk)
+
+        acts, rel_ras = [], []
+        for ra in ras:
+            for k, pct in enumerate(_reparto(self._entre(ranges["actividades"]))):
+                # Cierres repartidos alrededor de hoy para que haya vencimientos próximos en el feed
+                cierre = hoy + datetime.timedelta(days=int(self.rng.integers(-90, 31)))
+                acts.append(Actividad(tipo_actividad_id=tipos[int(self.rng.integers(len(tipos)))],
+                                      nombre_actividad=f"Actividad {k + 1} RA {ra.pk}", porcentaje_actividad=pct,
+                                      fecha_creacion=min(cierre, hoy) - datetime.timedelta(days=30),
+                                      fecha_cierre=cierre))
+                rel_ras.append((ra, pct))
+        acts = self._bulk(Actividad, acts)
+        rels = self._bulk(RaActividad, [
+            RaActividad(actividad=act, ra=ra, porcentaje_ra_actividad=pct) for act, (ra, pct) in zip(acts, rel_ras)
+        ])
+
+        links, out = [], {}
+        for rel, (ra, _) in zip(rels, rel_ras):
+            ind = inds_por_ra[ra.pk][int(self.rng.integers(len(inds_por_ra[ra.pk])))]
+            links.append(RaActividadIndicador(ra_actividad=rel, indicador_id=ind))
+            out.setdefault(ra.asignatura_id, []).append((rel.pk, ind))
+        self._bulk(RaActividadIndicador, links)
+        return out
+
+    def _estudiantes(self, td, programas, n):
+        """{id_programa: [id_estudiante]}; el índice de login se llena con identidad.sync_bulk."""
+        out = {}
+        for p in programas:
+            ids = []
+            for i in range(0, n, self.batch_size):
+                lote = Estudiante.objects.bulk_create([
+                    Estudiante(nombre=f"Estudiante{k}", apellido=p.codigo_programa,
+                               codigo_estudiante=f"{self.tag}E{p.pk}-{k}", contrasena_estudiante=self.password,
+                               tipo_documento=td, num_documento=f"{self.tag}E{p.pk}-{k}",
+                               correo=f"{self.tag.lower()}.e{p.pk}.{k}@seed.local")
+                    for k in range(i, min(n, i + self.batch_size))
+                ])
+                identidad.sync_bulk("estudiante", lote)
+                ids += [e.pk for e in lote]
+            out[p.pk] = ids
+            self._log(f"{len(ids)} estudiantes en {p.codigo_programa}")
+        return out
+
+    def _matriculas(self, estudiantes, asignaturas, periodos, rango):
+        """{id_asignatura: [id_matricula]}"""
+        por_programa = {}
+        for a in asignaturas:
+            por_programa.setdefault(a.programa_id, []).append(a.pk)
+        out, buf = {}, []
+
+        def flush():
+            for m in Matricula.objects.bulk_create(buf):
+                out.setdefault(m.asignatura_id, []).append(m.pk)
+            buf.clear()
+
+        for id_prog, ids_est in estudiantes.items():
+            asigs = np.array(por_programa[id_prog])
+            for per in periodos:
+                for id_est in ids_est:
+                    k = min(self._entre(rango), len(asigs))
+                    for id_asig in self.rng.choice(asigs, size=k, replace=False):
+                        buf.append(Matricula(estudiante_id=id_est, periodo_id=per.pk, asignatura_id=int(id_asig)))
+                    if len(buf) >= self.batch_size:
+                        flush()
+        flush()
+        self._log(f"{sum(len(v) for v in out.values())} matrículas")
+        return out
+
+    def _notas(self, mats, rels, cobertura, media, desviacion):
+        """Producto matrícula x RA-actividad de cada asignatura, filtrado por cobertura; COPY si hay."""
+        usar_copy = self._copy_disponible()
+        columnas = ("id_matricula", "id_ra_actividad", "nota_ra_actividad", "id_ind")
+        total, pendientes, buf = 0, 0, io.StringIO()
+        for id_asig, ids_mat in mats.items():
+            pares = rels.get(id_asig)
+            if not pares:
+                continue
+            rel_ids = np.array([r for r, _ in pares], dtype=np.int64)
+            ind_ids = np.array([i for _, i in pares], dtype=np.int64)
+            for i in range(0, len(ids_mat), self.batch_size):
+                m = np.array(ids_mat[i:i + self.batch_size], dtype=np.int64)
+                mm = np.repeat(m, len(rel_ids))
+                rr = np.tile(rel_ids, len(m))
+                ii = np.tile(ind_ids, len(m))
+                keep = self.rng.random(len(mm)) < cobertura
+                mm, rr, ii = mm[keep], rr[keep], ii[keep]
+                notas = np.clip(np.round(self.rng.normal(media, desviacion, len(mm)), 1), 0, 5)
+                if usar_copy:
+                    np.savetxt(buf, np.column_stack((mm, rr, notas, ii)), fmt=("%d", "%d", "%.1f", "%d"), delimiter=",")
+                    pendientes += len(mm)
+                    if pendientes >= 200_000:
+                        self._copy(NotasActividad._meta.db_table, columnas, buf)
+                        buf, pendientes = io.StringIO(), 0
+                else:
+                    self._bulk(NotasActividad, [
+                        NotasActividad(matricula_id=int(a), ra_actividad_id=int(b),
+                                       nota_ra_actividad=Decimal(f"{c:.1f}"), indicador_id=int(d))
+                        for a, b, c, d in zip(mm, rr, notas, ii)
+                    ])
+                total += len(mm)
+        if pendientes:
+            self._copy(NotasActividad._meta.db_table, columnas, buf)
+        self._log(f"{total} notas ({'COPY' if usar_copy else 'bulk_create'})")
+        return total
+
+    def _invalidar(self, asignaturas):
+        """bulk_create no emite señales: invalida lo que las señales habrían invalidado."""
+        versiones.bump(versiones.PROGRAMAS, versiones.PERIODOS, versiones.TIPOS_ACTIVIDAD, versiones.TIPOS_DOCUMENTO)
+        for a in asignaturas:
+            estructura.invalidate_asignatura(a.codigo_asignatura, a.pk)
+        estructura.invalidate_tipos_actividad()
@@ -0,0 +1,379 @@
+"""
+Métricas por endpoint en formato de exposición de Prometheus.
+
+MetricsMiddleware mide cada request: latencia, número de consultas y tiempo en BD
+(un execute_wrapper instalado en cada conexión que suma en el _QueryStats del request
+actual, tomado de un ContextVar: así también se cuentan las consultas que una vista
+asíncrona corre en hilos de sync_to_async), tamaño de la respuesta y código de estado.
+El middleware funciona tanto bajo WSGI como bajo ASGI sin adaptar las vistas async.
+Todo se agrega en memoria por (ruta, método) usando el patrón de URL resuelto como
+etiqueta, no la URL concreta, para acotar la cardinalidad.
+
+Con varios workers (gunicorn/uwsgi) cada proceso vuelca periódicamente su estado a
+`METRICS_DIR/metrics-<pid>.json` (escritura atómica con os.replace) y /api/metrics
+suma los archivos de todos los procesos. Sin METRICS_DIR sólo se expone el proceso
+que atiende el scrape. Al leerlos se borran los de procesos que ya no existen o cuyo
+pid fue reutilizado (el archivo guarda el instante de arranque del proceso), como
+mark_process_dead de prometheus_client; también se puede llamar a mark_process_dead()
+desde el hook child_exit de gunicorn. METRICS_DIR debe ser local a la máquina.
+"""
+import contextlib
+import contextvars
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+ENABLED = getattr(settings, "METRICS_ENABLED", True)
+METRICS_DIR = getattr(settings, "METRICS_DIR", None)
+FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# nombre -> (tipo, ayuda, buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requests atendidos por ruta, método y estado.", None),
+    "http_request_duration_seconds": ("histogram", "Latencia de la vista (incluye el streaming).", LATENCY_BUCKETS),
+    "http_response_size_bytes": ("histogram", "Tamaño del cuerpo de la respuesta.", SIZE_BUCKETS),
+    "db_queries_per_request": ("histogram", "Consultas SQL ejecutadas por request.", QUERY_BUCKETS),
+    "db_query_duration_seconds_total": ("counter", "Tiempo acumulado en la base de datos.", None),
+    "structure_cache_hits_total": ("counter", "Aciertos de la caché de estructura (services/estructura.py).", None),
+    "structure_cache_misses_total": ("counter", "Fallos de la caché de estructura (services/estructura.py).", None),
+}
+
+_ROUTE_GROUP = re.compile(r"\(\?P<(\w+)>[^)]*\)|<\w+:(\w+)>")
+
+
+class _Registry:
+    """Contadores {(nombre, etiquetas): valor} e histogramas {(nombre, etiquetas): [buckets..., suma, conteo]}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        h = self.histograms.get(key)
+        if h is None:
+            h = self.histograms[key] = [0] * (len(buckets) + 2)
+        for i, le in enumerate(buckets):
+            if value <= le:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+    def record(self, route, method, status, duration, queries, db_time, size):
+        labels = (("route", route), ("method", method))
+        with self.lock:
+            self.inc("http_requests_total", labels + (("status", str(status)),))
+            self.observe("http_request_duration_seconds", labels, duration)
+            self.observe("db_queries_per_request", labels, queries)
+            self.inc("db_query_duration_seconds_total", labels, db_time)
+            if size is not None:
+                self.observe("http_response_size_bytes", labels, size)
+        if METRICS_DIR and time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            flush()
+
+    def snapshot(self):
+        with self.lock:
+            counters = [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()]
+            histograms = [[n, list(map(list, l)), list(h)] for (n, l), h in self.histograms.items()]
+        from ..services import estructura
+        for namespace, s in estructura.stats().items():
+            labels = [["namespace", namespace]]
+            counters.append(["structure_cache_hits_total", labels, s["hits"]])
+            counters.append(["structure_cache_misses_total", labels, s["misses"]])
+        return {"counters": counters, "histograms": histograms}
+
+
+registry = _Registry()
+
+
+class _QueryStats:
+    """
+    Consultas y tiempo en BD de un request (pueden llegar desde varios hilos). Si ya había
+    uno activo (p. ej. contar_consultas() alrededor de un request), también le suma a él.
+    """
+
+    def __init__(self, parent=None):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.time = 0.0
+        self.parent = parent
+
+    def add(self, duration):
+        with self.lock:
+            self.time += duration
+            self.count += 1
+        if self.parent is not None:
+            self.parent.add(duration)
+
+
+_current = contextvars.ContextVar("metrics_query_stats", default=None)
+
+
+@contextlib.contextmanager
+def contar_consultas():
+    """
+    Cuenta las consultas del bloque en todas las conexiones, también las de los hilos de
+    sync_to_async / concurrencia.gather (CaptureQueriesContext sólo ve la del hilo actual).
+    """
+    stats = _QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _track(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(time.perf_counter() - start)
+
+
+def _install(connection, **kwargs):
+    if _track not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track)
+
+
+connection_created.connect(_install)
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return "<unmatched>"
+    # Regex del router de DRF y conversores de path() quedan igual: /api/asignaturas/<codigo_asignatura>/...
+    route = _ROUTE_GROUP.sub(lambda m: f"<{m.group(1) or m.group(2)}>", match.route)
+    return "/" + route.replace("^", "").replace("$", "")
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        for conn in connections.all(initialized_only=True):
+            _install(conn)  # las conexiones abiertas antes de cargar el middleware
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not ENABLED:
+            return self.get_response(request)
+        stats = _QueryStats(parent=_current.get())
+        start = time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not ENABLED:
+            return await self.get_response(request)
+        stats = _QueryStats(parent=_current.get())
+        start = time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, start)
+
+    def _finish(self, request, response, stats, start):
+        if not response.streaming:
+            size = len(response.content)
+        elif getattr(response, "file_to_stream", None) is not None:
+            # FileResponse: no se envuelve para no perder wsgi.file_wrapper (sendfile)
+            size = int(response["Content-Length"]) if response.has_header("Content-Length") else None
+        else:
+            # El trabajo (y las consultas) ocurren al iterar: se mide al agotar el iterador
+            stream = self._astream if response.is_async else self._stream
+            response.streaming_content = stream(request, response, response.streaming_content, stats, start)
+            return response
+        registry.record(_route(request), request.method, response.status_code,
+                        time.perf_counter() - start, stats.count, stats.time, size)
+        return response
+
+    # El ContextVar se fija alrededor de cada paso del iterador y no entre yields: el
+    # servidor puede consumir cada chunk desde un contexto distinto.
+
+    def _stream(self, request, response, content, stats, start):
+        size = 0
+        content = iter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(content, "close"):
+                content.close()  # el cierre del cliente debe llegar al generador original
+            registry.record(_route(request), request.method, response.status_code,
+                            time.perf_counter() - start, stats.count, stats.time, size)
+
+    async def _astream(self, request, response, content, stats, start):
+        size = 0
+        content = aiter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = await anext(content)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(content, "aclose"):
+                await content.aclose()
+            registry.record(_route(request), request.method, response.status_code,
+                            time.perf_counter() - start, stats.count, stats.time, size)
+
+
+# --- Almacén compartido entre workers ---
+
+def _path(pid):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def _inicio(pid):
+    """Instante de arranque del proceso (ticks desde el boot, /proc/<pid>/stat) o None si no se puede leer."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as fh:
+            return int(fh.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _vivo(pid, inicio):
+    """¿Sigue vivo el proceso que escribió el archivo? Un pid reutilizado tiene otro instante de arranque."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    actual = _inicio(pid) if inicio is not None else None
+    return actual is None or actual == inicio
+
+
+def mark_process_dead(pid):
+    """Descarta las métricas de un worker que terminó (p. ej. desde child_exit de gunicorn)."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(_path(pid))
+
+
+def flush():
+    """Vuelca el estado de este proceso a su archivo (tmp + os.replace: los lectores nunca ven medio archivo)."""
+    registry.last_flush = time.monotonic()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    tmp = f"{_path(os.getpid())}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({**registry.snapshot(), "inicio": _inicio(os.getpid())}, fh)
+    os.replace(tmp, _path(os.getpid()))
+
+
+def _collect():
+    """Snapshots de todos los procesos vivos; el propio se toma en vivo."""
+    snapshots = [registry.snapshot()]
+    if METRICS_DIR:
+        own = _path(os.getpid())
+        for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+            if path == own:
+                continue
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+                with open(path, encoding="utf-8") as fh:
+                    snap = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            if not _vivo(pid, snap.get("inicio")):
+                mark_process_dead(pid)
+                continue
+            snapshots.append(snap)
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            acc = histograms.setdefault(key, [0] * len(values))
+            histograms[key] = [a + b for a, b in zip(acc, values)]
+    return counters, histograms
+
+
+# --- Exposición ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Texto en formato de exposición de Prometheus 0.0.4."""
+    counters, histograms = _collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {_num(value)}")
+            continue
+        for (n, labels), values in sorted(histograms.items()):
+            if n != name:
+                continue
+            for le, count in zip(buckets, values):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _num(le)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {_num(values[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_raactividadindicador'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('clave', models.CharField(max_length=100)),
+                ('kind', models.CharField(max_length=20)),
+                ('texto', models.TextField()),
+                ('vence', models.DateField(blank=True, null=True)),
+                ('leida', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('estudiante', models.ForeignKey(db_column='id_estudiante', on_delete=django.db.models.deletion.CASCADE, to='api.estudiante')),
+                ('matricula', models.ForeignKey(db_column='id_matricula', on_delete=django.db.models.deletion.CASCADE, to='api.matricula')),
+            ],
+            options={
+                'db_table': 'notificacion',
+                'indexes': [models.Index(fields=['estudiante', '-id'], name='ix_notificacion_est_id')],
+                'constraints': [models.UniqueConstraint(fields=('estudiante', 'clave'), name='uq_notificacion_clave')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_notificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotaRa',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nota', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('matricula', models.ForeignKey(db_column='id_matricula', on_delete=django.db.models.deletion.CASCADE, related_name='notas_ra', to='api.matricula')),
+                ('ra', models.ForeignKey(db_column='id_ra', on_delete=django.db.models.deletion.CASCADE, to='api.resultadodeaprendizaje')),
+            ],
+            options={
+                'db_table': 'nota_ra',
+                'constraints': [models.UniqueConstraint(fields=('matricula', 'ra'), name='uq_nota_ra'), models.CheckConstraint(condition=models.Q(('nota__isnull', True), models.Q(('nota__gte', 0), ('nota__lte', 5)), _connector='OR'), name='chk_nota_ra_parcial')],
+            },
+        ),
+    ]
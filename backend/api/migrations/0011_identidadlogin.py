@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    IdentidadLogin = apps.get_model("api", "IdentidadLogin")
+    rows = []
+    for rol, model, campo_codigo in (("docente", "Docente", "codigo_docente"), ("estudiante", "Estudiante", "codigo_estudiante")):
+        for pk, codigo, correo in apps.get_model("api", model).objects.values_list("pk", campo_codigo, "correo").iterator():
+            for tipo, valor in (("codigo", codigo), ("correo", correo)):
+                if valor:
+                    rows.append(IdentidadLogin(clave=valor.strip().lower(), tipo=tipo, rol=rol, id_usuario=pk))
+    IdentidadLogin.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_notara'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentidadLogin',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('clave', models.CharField(max_length=255)),
+                ('tipo', models.CharField(max_length=10)),
+                ('rol', models.CharField(max_length=20)),
+                ('id_usuario', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'identidad_login',
+                'indexes': [models.Index(fields=['clave', 'tipo'], name='ix_identidad_clave'), models.Index(fields=['rol', 'id_usuario'], name='ix_identidad_usuario')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
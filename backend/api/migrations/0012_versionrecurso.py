@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_identidadlogin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionRecurso',
+            fields=[
+                ('clave', models.CharField(max_length=150, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'version_recurso',
+            },
+        ),
+    ]
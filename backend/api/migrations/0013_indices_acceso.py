@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ir dentro de una transacción; así no se bloquean
+    # las escrituras sobre matricula / notas_actividad mientras se construyen los índices.
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_versionrecurso'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='actividad',
+            index=models.Index(condition=models.Q(('fecha_cierre__isnull', False)), fields=['fecha_cierre'], name='ix_actividad_cierre'),
+        ),
+        AddIndexConcurrently(
+            model_name='matricula',
+            index=models.Index(fields=['asignatura', 'estudiante', '-id_matricula'], name='ix_matricula_asig_est'),
+        ),
+        AddIndexConcurrently(
+            model_name='notasactividad',
+            index=models.Index(condition=models.Q(('indicador__isnull', False)), fields=['matricula', 'indicador'], include=('nota_ra_actividad',), name='ix_notas_mat_ind'),
+        ),
+        AddIndexConcurrently(
+            model_name='recurso',
+            index=models.Index(fields=['asignatura', '-fecha_subida'], name='ix_recurso_asig_fecha'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_indices_acceso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id_blob', models.BigAutoField(db_column='id_blob', primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('tamano', models.BigIntegerField()),
+                ('archivo', models.FileField(max_length=255, upload_to='')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recurso',
+            name='archivo',
+            field=models.FileField(max_length=255, upload_to='recursos/%Y/%m/%d'),
+        ),
+        migrations.AddField(
+            model_name='recurso',
+            name='blob',
+            field=models.ForeignKey(blank=True, db_column='id_blob', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='recursos', to='api.blob'),
+        ),
+        migrations.CreateModel(
+            name='SubidaRecurso',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamano', models.BigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('recibido', models.BigIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('asignatura', models.ForeignKey(db_column='id_asignatura', on_delete=django.db.models.deletion.CASCADE, to='api.asignatura')),
+            ],
+            options={
+                'db_table': 'subida_recurso',
+            },
+        ),
+    ]
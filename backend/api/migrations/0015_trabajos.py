@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_blobs_subidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tarea', models.CharField(max_length=100)),
+                ('args', models.JSONField(default=dict)),
+                ('estado', models.CharField(default='pendiente', max_length=10)),
+                ('intentos', models.IntegerField(default=0)),
+                ('max_intentos', models.IntegerField(default=5)),
+                ('ejecutar_en', models.DateTimeField()),
+                ('tomado_en', models.DateTimeField(blank=True, null=True)),
+                ('tomado_por', models.CharField(blank=True, max_length=100)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'trabajo',
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['ejecutar_en', 'id'], name='ix_trabajo_pendiente'), models.Index(condition=models.Q(('estado', 'en_curso')), fields=['tomado_en'], name='ix_trabajo_en_curso')],
+            },
+        ),
+    ]
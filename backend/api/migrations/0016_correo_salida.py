@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_trabajos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Correo',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('clave', models.CharField(max_length=150, unique=True)),
+                ('destinatario', models.EmailField(max_length=255)),
+                ('asunto', models.CharField(max_length=255)),
+                ('cuerpo', models.TextField()),
+                ('estado', models.CharField(default='pendiente', max_length=10)),
+                ('intentos', models.IntegerField(default=0)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'correo_salida',
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['id'], name='ix_correo_pendiente')],
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.db.models import Q
 
@@ -171,6 +173,10 @@ class Actividad(models.Model):
                 name="chk_act_fechas",
             ),
         ]
+        indexes = [
+            # Rango de vencimientos (feed de notificaciones); las actividades sin cierre no entran
+            models.Index(fields=["fecha_cierre"], condition=Q(fecha_cierre__isnull=False), name="ix_actividad_cierre"),
+        ]
 
     def __str__(self):
         return self.nombre_actividad
@@ -209,6 +215,10 @@ class Matricula(models.Model):
             ),
             models.UniqueConstraint(fields=["estudiante", "periodo", "asignatura"], name="uq_matricula"),
         ]
+        indexes = [
+            # Última matrícula de un estudiante en una asignatura (ORDER BY -id_matricula)
+            models.Index(fields=["asignatura", "estudiante", "-id_matricula"], name="ix_matricula_asig_est"),
+        ]
 
 
 class NotasActividad(models.Model):
@@ -229,22 +239,70 @@ class NotasActividad(models.Model):
                 name="chk_nota_ra",
             ),
         ]
+        indexes = [
+            # Promedios por (matrícula, indicador): parcial + INCLUDE para index-only scan
+            models.Index(fields=["matricula", "indicador"], include=["nota_ra_actividad"],
+                         condition=Q(indicador__isnull=False), name="ix_notas_mat_ind"),
+        ]
+
+
+class Blob(models.Model):
+    """
+    Contenido de un archivo direccionado por SHA-256 (ver services/almacen.py): un mismo
+    archivo subido a varios grupos se guarda una vez y lo referencian varios Recurso.
+    """
+    id_blob = models.BigAutoField(primary_key=True, db_column="id_blob")
+    sha256 = models.CharField(max_length=64, unique=True)
+    tamano = models.BigIntegerField()
+    archivo = models.FileField(max_length=255)  # blobs/ab/cd/<sha256><ext>
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "blob"
+
+    def __str__(self):
+        return self.sha256
 
 
 class Recurso(models.Model):
     id_recurso = models.BigAutoField(primary_key=True, db_column="id_recurso")
     asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, db_column="id_asignatura")
     titulo = models.CharField(max_length=200)
-    archivo = models.FileField(upload_to="recursos/%Y/%m/%d")
+    # Con blob, `archivo` apunta al archivo del blob; sin blob es un archivo propio (subidas antiguas)
+    archivo = models.FileField(upload_to="recursos/%Y/%m/%d", max_length=255)
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, db_column="id_blob",
+                             related_name="recursos")
     fecha_subida = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "recurso"
+        indexes = [
+            models.Index(fields=["asignatura", "-fecha_subida"], name="ix_recurso_asig_fecha"),
+        ]
 
     def __str__(self):
         return self.titulo
 
 
+class SubidaRecurso(models.Model):
+    """
+    Subida por partes en curso (iniciar / agregar parte / finalizar). `recibido` es el
+    offset confirmado; las partes se escriben en UPLOAD_TMP_DIR/<id>.part.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    asignatura = models.ForeignKey(Asignatura, on_delete=models.CASCADE, db_column="id_asignatura")
+    titulo = models.CharField(max_length=200)
+    nombre_archivo = models.CharField(max_length=255)
+    tamano = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)  # esperado, si el cliente lo envía
+    recibido = models.BigIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "subida_recurso"
+
+
 class RaActividadIndicador(models.Model):
     """
     Relación N a N entre una relación RA-Actividad y los Indicadores de Logro del mismo RA.
@@ -258,4 +316,148 @@ class RaActividadIndicador(models.Model):
         db_table = "ra_actividad_indicador"
         constraints = [
             models.UniqueConstraint(fields=["ra_actividad", "indicador"], name="uq_ra_actividad_indicador"),
-        ]
\ No newline at end of file
+        ]
+
+class Notificacion(models.Model):
+    """
+    Feed materializado de avisos por estudiante (actividades por vencer, promedio bajo).
+    Se mantiene desde señales sobre NotasActividad/Actividad/RaActividad/Matricula y
+    con el comando `rebuild_notificaciones`; `clave` identifica el aviso para deduplicar.
+    """
+    id = models.BigAutoField(primary_key=True)
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, db_column="id_estudiante")
+    matricula = models.ForeignKey(Matricula, on_delete=models.CASCADE, db_column="id_matricula")
+    clave = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20)
+    texto = models.TextField()
+    vence = models.DateField(blank=True, null=True)
+    leida = models.BooleanField(default=False)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "notificacion"
+        constraints = [
+            models.UniqueConstraint(fields=["estudiante", "clave"], name="uq_notificacion_clave"),
+        ]
+        indexes = [
+            models.Index(fields=["estudiante", "-id"], name="ix_notificacion_est_id"),
+        ]
+
+    def __str__(self):
+        return self.texto
+
+
+class NotaRa(models.Model):
+    """
+    Nota parcial de una matrícula en un RA (0-5), mantenida por services/calificaciones.py
+    junto con Matricula.nota_final para que leer notas sea una lectura de columna.
+    """
+    id = models.BigAutoField(primary_key=True)
+    matricula = models.ForeignKey(Matricula, on_delete=models.CASCADE, db_column="id_matricula", related_name="notas_ra")
+    ra = models.ForeignKey(ResultadoDeAprendizaje, on_delete=models.CASCADE, db_column="id_ra")
+    nota = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        db_table = "nota_ra"
+        constraints = [
+            models.UniqueConstraint(fields=["matricula", "ra"], name="uq_nota_ra"),
+            models.CheckConstraint(
+                check=Q(nota__isnull=True) | (Q(nota__gte=0) & Q(nota__lte=5)),
+                name="chk_nota_ra_parcial",
+            ),
+        ]
+
+
+class IdentidadLogin(models.Model):
+    """
+    Índice unificado de credenciales: código y correo normalizados de docentes y
+    estudiantes -> (rol, id). Permite resolver el login en una sola consulta indexada.
+    Se mantiene sincronizado con señales (ver services/identidad.py).
+    """
+    id = models.BigAutoField(primary_key=True)
+    clave = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=10)  # "codigo" | "correo"
+    rol = models.CharField(max_length=20)  # "docente" | "estudiante"
+    id_usuario = models.BigIntegerField()
+
+    class Meta:
+        db_table = "identidad_login"
+        indexes = [
+            models.Index(fields=["clave", "tipo"], name="ix_identidad_clave"),
+            models.Index(fields=["rol", "id_usuario"], name="ix_identidad_usuario"),
+        ]
+
+
+class VersionRecurso(models.Model):
+    """
+    Contador de versión por recurso de API (p. ej. "tipos-actividad", "asignatura:MAT101:ras").
+    Se incrementa en cada escritura (señales) y alimenta ETag/Last-Modified sin leer los datos.
+    """
+    clave = models.CharField(max_length=150, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField()
+
+    class Meta:
+        db_table = "version_recurso"
+
+
+class Trabajo(models.Model):
+    """
+    Cola de trabajos en segundo plano (services/trabajos.py, `manage.py run_workers`).
+    Los workers toman filas `pendiente` con SELECT ... FOR UPDATE SKIP LOCKED; un fallo
+    vuelve a `pendiente` con `ejecutar_en` desplazado (backoff) hasta agotar `max_intentos`.
+    """
+    PENDIENTE, EN_CURSO, HECHO, FALLIDO = "pendiente", "en_curso", "hecho", "fallido"
+
+    id = models.BigAutoField(primary_key=True)
+    tarea = models.CharField(max_length=100)
+    args = models.JSONField(default=dict)  # kwargs de la tarea
+    estado = models.CharField(max_length=10, default=PENDIENTE)
+    intentos = models.IntegerField(default=0)
+    max_intentos = models.IntegerField(default=5)
+    ejecutar_en = models.DateTimeField()
+    tomado_en = models.DateTimeField(blank=True, null=True)
+    tomado_por = models.CharField(max_length=100, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "trabajo"
+        indexes = [
+            # Lo único que consulta el polling de los workers: pendientes por orden de ejecución
+            models.Index(fields=["ejecutar_en", "id"], condition=Q(estado="pendiente"), name="ix_trabajo_pendiente"),
+            models.Index(fields=["tomado_en"], condition=Q(estado="en_curso"), name="ix_trabajo_en_curso"),
+        ]
+
+    def __str__(self):
+        return f"{self.tarea}#{self.id}"
+
+
+class Correo(models.Model):
+    """
+    Bandeja de salida de correos masivos (resúmenes de vencimientos, services/resumenes.py).
+    `clave` deduplica (un resumen por estudiante y día); las filas `pendiente` son lo que
+    falta enviar, así que una corrida interrumpida se retoma donde quedó.
+    """
+    PENDIENTE, ENVIADO, FALLIDO = "pendiente", "enviado", "fallido"
+
+    id = models.BigAutoField(primary_key=True)
+    clave = models.CharField(max_length=150, unique=True)
+    destinatario = models.EmailField(max_length=255)
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()
+    estado = models.CharField(max_length=10, default=PENDIENTE)
+    intentos = models.IntegerField(default=0)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "correo_salida"
+        indexes = [
+            models.Index(fields=["id"], condition=Q(estado="pendiente"), name="ix_correo_pendiente"),
+        ]
+
+    def __str__(self):
+        return self.clave
@@ -0,0 +1,56 @@
+"""
+Paginación keyset (por clave primaria) opcional.
+
+Sin `?page_size=` ni `?cursor=` la lista se devuelve completa, como siempre. Con
+cualquiera de los dos se devuelve una página: el cuerpo sigue siendo un arreglo
+(compatible con los clientes actuales) y el cursor siguiente viaja en las cabeceras
+`X-Next-Cursor` y `Link: <...>; rel="next"`. La consulta es
+`WHERE pk > cursor ORDER BY pk LIMIT n`, así que el costo es O(página) sin OFFSET.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        try:
+            size = int(params.get(self.page_size_query_param) or self.page_size)
+            cursor = params.get(self.cursor_query_param)
+            cursor = int(cursor) if cursor else None
+        except ValueError:
+            raise ValidationError({"detail": "cursor/page_size inválidos"})
+        size = max(1, min(size, self.max_page_size))
+
+        pk = queryset.model._meta.pk.name
+        queryset = queryset.order_by(pk)
+        if cursor is not None:
+            queryset = queryset.filter(**{f"{pk}__gt": cursor})
+        rows = list(queryset[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        self.request = request
+        self.next_cursor = self._key(rows[-1], pk) if has_next else None
+        return rows
+
+    @staticmethod
+    def _key(row, pk):
+        # Filas de values_list() (ValuesReadSerializer pone la PK primero) o instancias del modelo
+        return row[0] if isinstance(row, tuple) else getattr(row, pk)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        if self.next_cursor is not None:
+            headers["X-Next-Cursor"] = str(self.next_cursor)
+            url = replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+            headers["Link"] = f'<{url}>; rel="next"'
+        return Response(data, headers=headers)
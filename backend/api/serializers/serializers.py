@@ -1,40 +1,129 @@
+import datetime
+
+from django.db import models
 from rest_framework import serializers
 from ..models.models import (
     TipoDocumento, TipoActividad, Programa, Docente, Estudiante, Asignatura,
     Task, ResultadoDeAprendizaje, Matricula, Recurso
 )
 
-class TaskSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Acepta `fields=[...]` en el constructor y deja solo esos campos en la salida
+    (usado por ?fields= en las vistas de lista).
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+def _iso_datetime(v):
+    # Mismo formato que serializers.DateTimeField de DRF (UTC como "Z")
+    v = v.isoformat()
+    return v[:-6] + "Z" if v.endswith("+00:00") else v
+
+_CONVERTERS = (
+    (models.DecimalField, float),
+    (models.DateTimeField, _iso_datetime),
+    (models.DateField, datetime.date.isoformat),
+    (models.TimeField, datetime.time.isoformat),
+    (models.FileField, str),
+)
+
+def _converter(model_field):
+    for field_type, fn in _CONVERTERS:
+        if isinstance(model_field, field_type):
+            return fn
+    return None
+
+class ValuesReadSerializer:
+    """
+    Serializador de solo lectura para listados: lee tuplas con values_list() y las
+    convierte a dicts con conversores por campo precompilados (Decimal -> float,
+    fechas -> ISO), sin instanciar modelos ni campos de DRF por fila.
+
+    Toma los campos legibles (no write_only) del ModelSerializer equivalente, así la
+    salida coincide con la del serializer completo salvo Decimal, que sale como número.
+    La PK siempre es el primer valor de `lookups` (la usa KeysetPagination como cursor).
+
+    Los lectores se cachean por (serializer, conjunto de campos): el orden y las repeticiones
+    de ?fields= no cambian la salida, y la caché se vacía al llegar a CACHE_MAX entradas.
+    """
+    CACHE_MAX = 256
+    _cache = {}
+
+    @classmethod
+    def for_serializer(cls, serializer_class, fields=None):
+        key = (serializer_class, tuple(sorted(set(fields))) if fields else None)
+        reader = cls._cache.get(key)
+        if reader is None:
+            if len(cls._cache) >= cls.CACHE_MAX:
+                cls._cache.clear()
+            reader = cls._cache[key] = cls(serializer_class, fields)
+        return reader
+
+    def __init__(self, serializer_class, fields=None):
+        model = serializer_class.Meta.model
+        pk = model._meta.pk
+        readable = [name for name, f in serializer_class().fields.items() if not f.write_only]
+        names = [n for n in readable if not fields or n in fields]
+        model_fields = [model._meta.get_field(n) for n in names]
+
+        self.names = tuple(names)
+        self.lookups = tuple([pk.name] + [f.name for f in model_fields if f.name != pk.name])
+        # posición de cada campo de salida dentro de la tupla leída
+        index = {name: i for i, name in enumerate(self.lookups)}
+        self._plan = tuple((name, index[f.name], _converter(f)) for name, f in zip(names, model_fields))
+        self._plain = all(conv is None for _, _, conv in self._plan) and self.lookups == self.names
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def to_representation(self, rows):
+        if self._plain:
+            names = self.names
+            return [dict(zip(names, row)) for row in rows]
+        plan = self._plan
+        return [
+            {name: (conv(row[i]) if conv is not None and row[i] is not None else row[i]) for name, i, conv in plan}
+            for row in rows
+        ]
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = "__all__"
 
-class TipoDocumentoSerializer(serializers.ModelSerializer):
+class TipoDocumentoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoDocumento
         fields = "__all__"
 
-class TipoActividadSerializer(serializers.ModelSerializer):
+class TipoActividadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoActividad
         fields = "__all__"
 
-class ProgramaSerializer(serializers.ModelSerializer):
+class ProgramaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Programa
         fields = "__all__"
 
-class DocenteSerializer(serializers.ModelSerializer):
+class DocenteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Docente
         fields = "__all__"
+        extra_kwargs = {"contrasenia_docente": {"write_only": True}}
 
-class EstudianteSerializer(serializers.ModelSerializer):
+class EstudianteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Estudiante
         fields = "__all__"
+        extra_kwargs = {"contrasena_estudiante": {"write_only": True}}
 
-class AsignaturaSerializer(serializers.ModelSerializer):
+class AsignaturaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Asignatura
         fields = "__all__"
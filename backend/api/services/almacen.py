@@ -0,0 +1,253 @@
+"""
+Almacén de archivos direccionado por contenido y subidas reanudables por partes.
+
+Blob: cada contenido se guarda una sola vez en `blobs/ab/cd/<sha256><ext>` del storage
+por defecto y varios Recurso lo referencian; al borrar el último Recurso, liberar()
+elimina el blob (se llama desde las señales).
+
+Subidas por partes (protocolo tipo tus):
+  iniciar()    crea la SubidaRecurso con el tamaño total declarado;
+  escribir()   agrega una parte en el offset indicado, copiando del stream del request
+               al archivo parcial en bloques de READ_SIZE (nada se acumula en memoria) y
+               actualizando el SHA-256 a medida que llega;
+  finalizar()  verifica tamaño (y hash, si el cliente lo declaró), mueve el parcial al
+               blob (o lo descarta si el contenido ya existía) y crea el Recurso.
+
+El offset confirmado vive en la base (fila bloqueada con select_for_update mientras se
+escribe): si un proceso muere a mitad de una parte, el parcial se recorta a ese offset
+en la siguiente escritura. El estado del hash se guarda en memoria del proceso; si la
+parte siguiente llega a otro worker, éste vuelve a hashear el prefijo ya recibido una
+vez y sigue incrementalmente. UPLOAD_TMP_DIR debe estar en el mismo sistema de archivos
+que MEDIA_ROOT (finalizar mueve el archivo, no lo copia) y compartido entre workers.
+"""
+import datetime
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.models import Blob, Recurso, SubidaRecurso
+
+CHUNK_MAX = getattr(settings, "UPLOAD_CHUNK_MAX", 8 * 1024 * 1024)
+MAX_SIZE = getattr(settings, "UPLOAD_MAX_SIZE", 1024 * 1024 * 1024)
+SESSION_TTL = getattr(settings, "UPLOAD_SESSION_TTL", 24 * 60 * 60)
+READ_SIZE = 64 * 1024
+_HASHES_MAX = 1024
+
+
+class SubidaError(ValueError):
+    """Petición inválida para una subida; `status` es el código HTTP y `offset` el confirmado."""
+
+    def __init__(self, detail, status=400, offset=None):
+        super().__init__(detail)
+        self.status = status
+        self.offset = offset
+
+
+class _Parcial(File):
+    """Archivo local que FileSystemStorage puede mover en lugar de copiar (como TemporaryUploadedFile)."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+_lock = threading.Lock()
+_hashes = OrderedDict()  # id_subida -> (offset, sha256 parcial)
+
+
+def _tmp_dir():
+    return str(getattr(settings, "UPLOAD_TMP_DIR", os.path.join(settings.MEDIA_ROOT, "subidas")))
+
+
+def _parcial(id_subida):
+    return os.path.join(_tmp_dir(), f"{id_subida}.part")
+
+
+def _hash_archivo(path, limite):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while limite > 0:
+            data = fh.read(min(READ_SIZE, limite))
+            if not data:
+                break
+            h.update(data)
+            limite -= len(data)
+    return h
+
+
+def _hasher(subida):
+    """sha256 de los primeros `recibido` bytes: del caché del proceso o releyendo el parcial."""
+    with _lock:
+        hit = _hashes.get(subida.id)
+    if hit is not None and hit[0] == subida.recibido:
+        return hit[1].copy()
+    if subida.recibido == 0:
+        return hashlib.sha256()
+    return _hash_archivo(_parcial(subida.id), subida.recibido)
+
+
+def _recordar(id_subida, offset, h):
+    with _lock:
+        _hashes[id_subida] = (offset, h)
+        _hashes.move_to_end(id_subida)
+        while len(_hashes) > _HASHES_MAX:
+            _hashes.popitem(last=False)
+
+
+def _olvidar(id_subida):
+    with _lock:
+        _hashes.pop(id_subida, None)
+    try:
+        os.remove(_parcial(id_subida))
+    except FileNotFoundError:
+        pass
+
+
+def _blob(digest, tamano, contenido, nombre):
+    """Blob del contenido `digest` (bloqueado hasta el fin de la transacción); guarda el archivo si falta."""
+    ext = os.path.splitext(nombre)[1].lower()[:16]
+    blob, creado = Blob.objects.select_for_update().get_or_create(
+        sha256=digest, defaults={"tamano": tamano, "archivo": f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"})
+    # Un blob recién creado se guarda siempre: el archivo que ya exista con ese nombre puede ser
+    # el de un blob que liberar() acaba de borrar y cuyo on_commit todavía no lo eliminó.
+    # save() elige entonces otro nombre libre y la fila apunta a ése.
+    if creado or not default_storage.exists(blob.archivo.name):
+        nombre = default_storage.save(blob.archivo.name, contenido)
+        if nombre != blob.archivo.name:
+            blob.archivo.name = nombre
+            blob.save(update_fields=["archivo"])
+    return blob
+
+
+def _crear_recurso(asignatura_id, titulo, blob):
+    return Recurso.objects.create(asignatura_id=asignatura_id, titulo=titulo, archivo=blob.archivo.name, blob=blob)
+
+
+# --- Subida en una sola petición (multipart) ---
+
+def guardar(asignatura_id, titulo, archivo):
+    """Recurso para un UploadedFile, deduplicado por contenido."""
+    h = hashlib.sha256()
+    for chunk in archivo.chunks():
+        h.update(chunk)
+    archivo.seek(0)
+    with transaction.atomic():
+        return _crear_recurso(asignatura_id, titulo, _blob(h.hexdigest(), archivo.size, archivo, archivo.name))
+
+
+# --- Subida por partes ---
+
+def purgar(ttl=SESSION_TTL):
+    """Descarta las subidas sin actividad en `ttl` segundos (y sus parciales)."""
+    limite = timezone.now() - datetime.timedelta(seconds=ttl)
+    ids = list(SubidaRecurso.objects.filter(fecha_actualizacion__lt=limite).values_list("id", flat=True)[:500])
+    if ids:
+        SubidaRecurso.objects.filter(id__in=ids).delete()
+        for id_subida in ids:
+            _olvidar(id_subida)
+    return len(ids)
+
+
+def iniciar(asignatura_id, titulo, nombre_archivo, tamano, sha256=""):
+    try:
+        tamano = int(tamano)
+    except (TypeError, ValueError):
+        raise SubidaError("tamano requerido (bytes)")
+    if not (0 < tamano <= MAX_SIZE):
+        raise SubidaError(f"tamano debe estar entre 1 y {MAX_SIZE} bytes", status=413 if tamano > 0 else 400)
+    sha256 = (sha256 or "").lower()
+    if sha256 and (len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256)):
+        raise SubidaError("sha256 inválido")
+    purgar()
+    os.makedirs(_tmp_dir(), exist_ok=True)
+    return SubidaRecurso.objects.create(asignatura_id=asignatura_id, titulo=titulo[:200],
+                                        nombre_archivo=os.path.basename(nombre_archivo or "")[:255] or "archivo",
+                                        tamano=tamano, sha256=sha256)
+
+
+def _bloquear(id_subida):
+    subida = SubidaRecurso.objects.select_for_update().filter(pk=id_subida).first()
+    if subida is None:
+        raise SubidaError("Subida no existe o expiró", status=404)
+    return subida
+
+
+def escribir(id_subida, offset, stream, longitud):
+    """Agrega `longitud` bytes leídos de `stream` en `offset`; devuelve el nuevo offset confirmado."""
+    if longitud > CHUNK_MAX:
+        raise SubidaError(f"Cada parte admite hasta {CHUNK_MAX} bytes", status=413)
+    with transaction.atomic():
+        subida = _bloquear(id_subida)
+        path = _parcial(subida.id)
+        en_disco = os.path.getsize(path) if os.path.exists(path) else 0
+        # Si se perdió parte del parcial (disco temporal limpiado) se reanuda desde lo que hay
+        subida.recibido = min(subida.recibido, en_disco)
+        if offset != subida.recibido:
+            raise SubidaError("El offset no coincide con lo recibido", status=409, offset=subida.recibido)
+        if subida.recibido + longitud > subida.tamano:
+            raise SubidaError("La parte excede el tamaño declarado", status=400, offset=subida.recibido)
+
+        h = _hasher(subida)
+        escritos = 0
+        with open(path, "ab") as fh:
+            fh.truncate(subida.recibido)  # restos de una parte que no llegó a confirmarse
+            while escritos < longitud:
+                data = stream.read(min(READ_SIZE, longitud - escritos))
+                if not data:
+                    break
+                fh.write(data)
+                h.update(data)
+                escritos += len(data)
+        if escritos != longitud:
+            raise SubidaError("Cuerpo incompleto", status=400, offset=subida.recibido)
+        subida.recibido += escritos
+        subida.save(update_fields=["recibido", "fecha_actualizacion"])
+    _recordar(subida.id, subida.recibido, h)
+    return subida.recibido
+
+
+def finalizar(id_subida):
+    """Recurso creado con el contenido completo de la subida (deduplicado por SHA-256)."""
+    with transaction.atomic():
+        subida = _bloquear(id_subida)
+        if subida.recibido != subida.tamano:
+            raise SubidaError("La subida está incompleta", status=409, offset=subida.recibido)
+        path = _parcial(subida.id)
+        en_disco = os.path.getsize(path) if os.path.exists(path) else 0
+        if en_disco < subida.tamano:
+            raise SubidaError("Se perdió parte del archivo parcial", status=409, offset=en_disco)
+        if en_disco > subida.tamano:
+            os.truncate(path, subida.tamano)  # restos de una parte abortada
+        digest = _hasher(subida).hexdigest()
+        if subida.sha256 and subida.sha256 != digest:
+            raise SubidaError("El sha256 del contenido no coincide con el declarado")
+        with open(path, "rb") as fh:
+            blob = _blob(digest, subida.tamano, _Parcial(fh), subida.nombre_archivo)
+        recurso = _crear_recurso(subida.asignatura_id, subida.titulo, blob)
+        subida.delete()
+        transaction.on_commit(lambda: _olvidar(id_subida))
+    return recurso
+
+
+def cancelar(id_subida):
+    deleted, _ = SubidaRecurso.objects.filter(pk=id_subida).delete()
+    _olvidar(id_subida)
+    return bool(deleted)
+
+
+def liberar(blob_id):
+    """Borra el blob (fila y archivo) si ya ningún Recurso lo referencia."""
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None or Recurso.objects.filter(blob_id=blob_id).exists():
+            return False
+        name = blob.archivo.name
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(name))
+    return True
@@ -0,0 +1,168 @@
+"""
+Analítica de logro de RA (ResultadoDeAprendizaje) e indicadores por programa y periodo.
+
+La nota de cada estudiante en cada RA se lee de NotaRa, que mantiene el motor de notas
+(services/calificaciones.py), así que aquí no se repite la ponderación. Las notas por
+indicador se leen en una sola consulta directamente a arreglos NumPy
+(values_list(...).iterator() -> np.fromiter) y el cálculo es vectorizado: np.unique
+agrupa por (matrícula, indicador) y np.bincount hace sumas, conteos e histogramas.
+
+Los resultados se guardan en caché por (programa, periodo, versión): la versión es un
+contador de services/versiones.py que suben el motor de notas y las señales de estructura,
+así que una escritura de notas deja de servir el resultado anterior sin esperar al timeout.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from ..models.models import (
+    Asignatura, ResultadoDeAprendizaje, IndicadoresDeLogro, Matricula, NotasActividad, NotaRa, VersionRecurso,
+)
+from . import versiones
+
+NOTA_APROBATORIA = 3.0
+BINS = 5  # [0,1), [1,2), [2,3), [3,4), [4,5]
+CACHE_TIMEOUT = getattr(settings, "ANALYTICS_CACHE_TIMEOUT", 60 * 15)
+ITER_CHUNK_SIZE = 10000
+RECURSO = "atencion-ra"
+
+_DTYPE = np.dtype([("mat", np.int64), ("ind", np.int64), ("nota", np.float64)])
+_DTYPE_RA = np.dtype([("ra", np.int64), ("nota", np.float64)])
+
+
+def cache_key(id_programa, id_periodo=None, version=0):
+    return f"atencion_ra:{id_programa}:{id_periodo or 'all'}:v{version}"
+
+
+def version(id_programa):
+    return (VersionRecurso.objects.filter(clave=versiones.programa_key(id_programa, RECURSO))
+            .values_list("version", flat=True).first() or 0)
+
+
+def invalidate(*programa_ids):
+    """Sube la versión de los programas dados: las entradas de caché anteriores dejan de usarse."""
+    versiones.bump(*(versiones.programa_key(p, RECURSO) for p in sorted(set(programa_ids)) if p))
+
+
+def invalidate_matricula(id_mat):
+    invalidate(*Matricula.objects.filter(pk=id_mat).values_list("asignatura__programa_id", flat=True))
+
+
+def _filtro(qs, id_programa, id_periodo):
+    qs = qs.filter(matricula__asignatura__programa_id=id_programa)
+    return qs.filter(matricula__periodo_id=id_periodo) if id_periodo else qs
+
+
+def _load(id_programa, id_periodo):
+    qs = _filtro(NotasActividad.objects.filter(nota_ra_actividad__isnull=False), id_programa, id_periodo)
+    rows = qs.values_list("matricula_id", "indicador_id", "nota_ra_actividad").iterator(chunk_size=ITER_CHUNK_SIZE)
+    return np.fromiter(((m, i if i is not None else -1, n) for m, i, n in rows), dtype=_DTYPE)
+
+
+def _load_ras(id_programa, id_periodo):
+    qs = _filtro(NotaRa.objects.filter(nota__isnull=False), id_programa, id_periodo)
+    return np.fromiter(qs.values_list("ra_id", "nota").iterator(chunk_size=ITER_CHUNK_SIZE), dtype=_DTYPE_RA)
+
+
+def _group(*cols):
+    """Claves únicas de las columnas dadas e índice de grupo de cada fila."""
+    keys, inv = np.unique(np.stack(cols, axis=1), axis=0, return_inverse=True)
+    return keys, inv.ravel()
+
+
+def _stats(group_ids, valores):
+    """
+    Por grupo (ids densos 0..n-1): evaluados, promedio, tasa de aprobación e histograma.
+    Devuelve (uniq, n, promedio, tasa, hist) con uniq = valores originales del grupo.
+    """
+    uniq, inv = np.unique(group_ids, return_inverse=True)
+    inv = inv.ravel()
+    n = np.bincount(inv, minlength=len(uniq))
+    promedio = np.bincount(inv, weights=valores, minlength=len(uniq)) / n
+    tasa = np.bincount(inv, weights=(valores >= NOTA_APROBATORIA), minlength=len(uniq)) / n
+    bins = np.clip(np.floor(valores).astype(np.int64), 0, BINS - 1)
+    hist = np.bincount(inv * BINS + bins, minlength=len(uniq) * BINS).reshape(len(uniq), BINS)
+    return uniq, n, promedio, tasa, hist
+
+
+def _r(v):
+    return round(float(v), 3)
+
+
+def compute(id_programa, id_periodo=None):
+    data = _load(id_programa, id_periodo)
+    notas_ra = _load_ras(id_programa, id_periodo)
+
+    # Nota de cada estudiante en cada RA: la fila NotaRa del motor de notas
+    ra_stats = {}
+    if len(notas_ra):
+        uniq, n, prom, tasa, hist = _stats(notas_ra["ra"], notas_ra["nota"])
+        for k, id_ra in enumerate(uniq):
+            ra_stats[int(id_ra)] = (int(n[k]), _r(prom[k]), _r(tasa[k]), hist[k].tolist())
+
+    # Nota de cada estudiante en cada indicador: promedio simple (como el reporte de indicadores)
+    ind_stats = {}
+    con_ind = data[data["ind"] >= 0]
+    if len(con_ind):
+        keys, inv = _group(con_ind["mat"], con_ind["ind"])
+        suma = np.bincount(inv, weights=con_ind["nota"], minlength=len(keys))
+        cuenta = np.bincount(inv, minlength=len(keys))
+        uniq, n, prom, tasa, hist = _stats(keys[:, 1], suma / cuenta)
+        for k, id_ind in enumerate(uniq):
+            ind_stats[int(id_ind)] = (int(n[k]), _r(prom[k]), _r(tasa[k]), hist[k].tolist())
+
+    asigs = list(Asignatura.objects.filter(programa_id=id_programa).order_by("codigo_asignatura")
+                 .values_list("id_asignatura", "codigo_asignatura", "nombre"))
+    mats = Matricula.objects.filter(asignatura__programa_id=id_programa)
+    if id_periodo:
+        mats = mats.filter(periodo_id=id_periodo)
+    matriculados = dict(mats.values("asignatura_id").annotate(n=Count("id_matricula")).values_list("asignatura_id", "n"))
+
+    inds_por_ra = {}
+    for id_ind, id_ra, desc, pct in (IndicadoresDeLogro.objects
+                                     .filter(ra__asignatura__programa_id=id_programa)
+                                     .order_by("id_ind")
+                                     .values_list("id_ind", "ra_id", "descripcion", "porcentaje_ind")):
+        n, prom, tasa, hist = ind_stats.get(id_ind, (0, None, None, [0] * BINS))
+        inds_por_ra.setdefault(id_ra, []).append({
+            "id_ind": id_ind, "descripcion": desc, "porcentaje_ind": float(pct),
+            "evaluados": n, "promedio": prom, "tasa_aprobacion": tasa, "distribucion": hist,
+        })
+
+    ras_por_asig = {}
+    for id_ra, id_asig, desc, pct in (ResultadoDeAprendizaje.objects
+                                      .filter(asignatura__programa_id=id_programa)
+                                      .order_by("id_ra")
+                                      .values_list("id_ra", "asignatura_id", "descripcion", "porcentaje_ra")):
+        n, prom, tasa, hist = ra_stats.get(id_ra, (0, None, None, [0] * BINS))
+        ras_por_asig.setdefault(id_asig, []).append({
+            "id_ra": id_ra, "descripcion": desc, "porcentaje_ra": float(pct),
+            "evaluados": n, "promedio": prom, "tasa_aprobacion": tasa, "distribucion": hist,
+            "indicadores": inds_por_ra.get(id_ra, []),
+        })
+
+    return {
+        "id_programa": int(id_programa),
+        "id_periodo": int(id_periodo) if id_periodo else None,
+        "notas": int(len(data)),
+        "asignaturas": [{
+            "id_asignatura": id_asig,
+            "codigo_asignatura": codigo,
+            "nombre": nombre,
+            "matriculados": matriculados.get(id_asig, 0),
+            "ras": ras_por_asig.get(id_asig, []),
+        } for id_asig, codigo, nombre in asigs],
+    }
+
+
+def get(id_programa, id_periodo=None, refresh=False):
+    """Resultado cacheado por (programa, periodo, versión); refresh=True fuerza el recálculo."""
+    key = cache_key(id_programa, id_periodo, version(id_programa))
+    if not refresh:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    res = compute(id_programa, id_periodo)
+    cache.set(key, res, CACHE_TIMEOUT)
+    return res
@@ -0,0 +1,109 @@
+"""
+Motor de notas: mantiene NotaRa (nota parcial por RA) y Matricula.nota_final.
+
+Misma regla que el frontend: la nota de un RA es el promedio de las notas de sus
+actividades calificadas ponderado por porcentaje_ra_actividad; la nota final es el
+promedio de las notas de RA existentes ponderado por porcentaje_ra.
+
+- Cambio de una nota: recalcula solo el RA afectado de esa matrícula y luego la final
+  a partir de las filas NotaRa de la matrícula (`recompute_nota`).
+- Cambio de pesos o carga masiva: recálculo por conjuntos con una agregación agrupada
+  por (matrícula, RA) y escrituras en bloque (`recompute_matriculas`, `recompute_asignaturas`).
+
+Ambos caminos suben la versión de la analítica del programa (services/analitica.py).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from ..models.models import Matricula, NotasActividad, NotaRa, ResultadoDeAprendizaje
+from . import analitica
+
+BATCH_SIZE = 1000
+DOS_DECIMALES = Decimal("0.01")
+
+_PESO = "ra_actividad__porcentaje_ra_actividad"
+_PONDERADA = ExpressionWrapper(
+    F("nota_ra_actividad") * F(_PESO), output_field=DecimalField(max_digits=12, decimal_places=4)
+)
+
+
+def _q(v):
+    return v.quantize(DOS_DECIMALES) if v is not None else None
+
+
+def _promedio(pares):
+    """Promedio ponderado de [(valor, peso)]; None si no hay peso."""
+    num = sum((v * w for v, w in pares), Decimal(0))
+    den = sum((w for _, w in pares), Decimal(0))
+    return num / den if den > 0 else None
+
+
+def _nota_final(id_mat):
+    pares = list(NotaRa.objects
+                 .filter(matricula_id=id_mat, nota__isnull=False)
+                 .values_list("nota", "ra__porcentaje_ra"))
+    return _q(_promedio(pares))
+
+
+def recompute_nota(id_mat, id_ra):
+    """Camino incremental tras cambiar una NotasActividad de (matrícula, RA)."""
+    agg = (NotasActividad.objects
+           .filter(matricula_id=id_mat, ra_actividad__ra_id=id_ra, nota_ra_actividad__isnull=False)
+           .aggregate(num=Sum(_PONDERADA), den=Sum(_PESO)))
+    nota = _q(agg["num"] / agg["den"]) if agg["den"] else None
+    with transaction.atomic():
+        if nota is None:
+            NotaRa.objects.filter(matricula_id=id_mat, ra_id=id_ra).delete()
+        else:
+            NotaRa.objects.update_or_create(matricula_id=id_mat, ra_id=id_ra, defaults={"nota": nota})
+        Matricula.objects.filter(pk=id_mat).update(nota_final=_nota_final(id_mat))
+    analitica.invalidate_matricula(id_mat)
+
+
+def recompute_matriculas(mat_ids):
+    """Recálculo por conjuntos de NotaRa y nota_final para las matrículas dadas."""
+    mat_ids = sorted({int(m) for m in mat_ids})
+    programas = set()
+    for i in range(0, len(mat_ids), BATCH_SIZE):
+        chunk = mat_ids[i:i + BATCH_SIZE]
+        rows = (NotasActividad.objects
+                .filter(matricula_id__in=chunk, nota_ra_actividad__isnull=False)
+                .values("matricula_id", "ra_actividad__ra_id")
+                .annotate(num=Sum(_PONDERADA), den=Sum(_PESO))
+                .values_list("matricula_id", "ra_actividad__ra_id", "num", "den"))
+        por_ra = {(id_mat, id_ra): num / den for id_mat, id_ra, num, den in rows if den}
+        pesos = dict(ResultadoDeAprendizaje.objects
+                     .filter(id_ra__in={id_ra for _, id_ra in por_ra})
+                     .values_list("id_ra", "porcentaje_ra"))
+
+        finales = {id_mat: [] for id_mat in chunk}
+        for (id_mat, id_ra), nota in por_ra.items():
+            finales[id_mat].append((_q(nota), pesos[id_ra]))
+
+        with transaction.atomic():
+            # Borrar parciales que ya no tienen notas y hacer upsert del resto
+            existentes = NotaRa.objects.filter(matricula_id__in=chunk).values_list("id", "matricula_id", "ra_id")
+            sobrantes = [pk for pk, id_mat, id_ra in existentes if (id_mat, id_ra) not in por_ra]
+            if sobrantes:
+                NotaRa.objects.filter(id__in=sobrantes).delete()
+            NotaRa.objects.bulk_create(
+                [NotaRa(matricula_id=id_mat, ra_id=id_ra, nota=_q(nota)) for (id_mat, id_ra), nota in por_ra.items()],
+                update_conflicts=True, unique_fields=["matricula", "ra"], update_fields=["nota"],
+                batch_size=BATCH_SIZE,
+            )
+            Matricula.objects.bulk_update(
+                [Matricula(id_matricula=id_mat, nota_final=_q(_promedio(pares))) for id_mat, pares in finales.items()],
+                ["nota_final"], batch_size=BATCH_SIZE,
+            )
+        programas.update(Matricula.objects.filter(pk__in=chunk)
+                         .values_list("asignatura__programa_id", flat=True).distinct())
+    analitica.invalidate(*programas)
+
+
+def recompute_asignaturas(asig_ids):
+    """Recálculo completo de los cursos dados (p. ej. tras cambiar porcentaje_ra o porcentaje_ra_actividad)."""
+    recompute_matriculas(
+        Matricula.objects.filter(asignatura_id__in=list(asig_ids)).values_list("id_matricula", flat=True)
+    )
@@ -0,0 +1,47 @@
+"""
+Fan-out de consultas independientes desde las vistas asíncronas.
+
+El ORM asíncrono de Django (afirst, aget, async for...) corre cada consulta con
+sync_to_async(thread_sensitive=True): las de un mismo request pasan en fila por un único
+hilo, así que asyncio.gather sobre ellas libera el event loop (otros requests avanzan)
+pero no las solapa entre sí. gather() de este módulo ejecuta cada función en un hilo del
+pool con su propia conexión, de modo que agregados independientes corren a la vez en
+PostgreSQL y el request tarda lo que la consulta más lenta, no la suma.
+
+Los hilos son de un pool propio de DB_FANOUT_WORKERS (settings.py): eso acota las consultas
+en paralelo del proceso, y cada conexión se toma y devuelve al pool de conexiones de
+psycopg (DATABASES["default"]["OPTIONS"]["pool"]) en lugar de abrirse por llamada. Dentro
+de una transacción (ATOMIC_REQUESTS, TestCase) otra conexión no vería los cambios sin
+confirmar, así que ahí las funciones corren en orden en la conexión del request.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, "DB_FANOUT_WORKERS", 4), thread_name_prefix="db-fanout")
+
+
+def _aislada(fn):
+    def run():
+        # Lo mismo que request_started / request_finished para los hilos del pool
+        close_old_connections()
+        try:
+            return fn()
+        finally:
+            close_old_connections()
+    return run
+
+
+def _en_transaccion():
+    return connection.in_atomic_block
+
+
+async def gather(*fns):
+    """Resultados de las funciones síncronas `fns` (sin argumentos), en el mismo orden."""
+    if await sync_to_async(_en_transaccion)():
+        return [await sync_to_async(fn)() for fn in fns]
+    return await asyncio.gather(*(sync_to_async(_aislada(fn), thread_sensitive=False, executor=_executor)()
+                                  for fn in fns))
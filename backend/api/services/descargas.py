@@ -0,0 +1,327 @@
+"""
+Descarga de Recurso.archivo (/api/recursos/<id>/archivo) sin pasar por django.conf.urls.static,
+que sólo sirve MEDIA_ROOT con DEBUG.
+
+- ETag fuerte: el sha256 del blob; para archivos anteriores a los blobs (nunca se
+  reescriben), tamaño y mtime. If-None-Match responde 304 sin abrir el archivo.
+- Range: un rango `bytes=a-b`, `a-` o `-n` responde 206 (416 si no es satisfacible).
+  If-Range con otro validador ignora el Range. Con varios rangos se envía el archivo
+  entero (la RFC 9110 lo permite) en lugar de multipart/byteranges.
+- DOWNLOAD_OFFLOAD en settings ("x-accel-redirect" para nginx, "x-sendfile" para
+  Apache/lighttpd) deja el cuerpo al proxy: Django sólo arma los headers y el worker queda
+  libre en cuanto responde; el proxy atiende también los Range. Para nginx:
+
+      location /protected-media/ {   # DOWNLOAD_ACCEL_PREFIX
+          internal;
+          alias /ruta/a/backend/media/;   # MEDIA_ROOT
+      }
+
+  Sin offload se responde con FileResponse: bajo gunicorn usa wsgi.file_wrapper (sendfile,
+  el contenido no pasa por Python), también para los rangos, porque el archivo queda
+  posicionado en el inicio del rango y Content-Length acota lo que se envía.
+
+ZIP de todos los recursos de una asignatura (/api/asignaturas/<codigo>/recursos.zip): se
+arma al vuelo leyendo cada archivo del storage, sin temporales ni buffer del archivo
+completo. Las entradas van sin compresión (STORED): el material del curso (PDF, video,
+Office, imágenes) ya viene comprimido y, sobre todo, así el ZIP es determinista: su tamaño
+y cada byte se conocen antes de leer nada, lo que permite Content-Length, ETag y reanudar
+con Range desde cualquier offset. El ETag sale de la lista de recursos (nombre, contenido,
+fecha) sin leer archivos, así que el 304 es barato. Lo único caro, el CRC-32 de cada
+contenido, se calcula una vez por blob y se guarda en la caché junto con el manifiesto.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import struct
+import zlib
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header, http_date, parse_etags
+
+_RANGO = re.compile(r"bytes=(\d*)-(\d*)")
+READ_SIZE = 64 * 1024
+
+
+class _Tramo:
+    """`longitud` bytes de `fh` desde `inicio`; conserva fileno() para que sendfile siga disponible."""
+
+    def __init__(self, fh, inicio, longitud):
+        fh.seek(inicio)
+        self.fh = fh
+        self.restante = longitud
+
+    def read(self, n=-1):
+        n = self.restante if n is None or n < 0 else min(n, self.restante)
+        data = self.fh.read(n) if n else b""
+        self.restante -= len(data)
+        return data
+
+    def fileno(self):
+        return self.fh.fileno()
+
+    def close(self):
+        self.fh.close()
+
+
+def _ruta(archivo):
+    try:
+        return archivo.path
+    except NotImplementedError:
+        return None  # storage remoto: sin offload ni mtime
+
+
+def rango(header, tamano):
+    """(inicio, fin) inclusivos del Range; None si no aplica o no se entiende; False si es insatisfacible."""
+    m = _RANGO.fullmatch((header or "").strip())
+    if m is None or m.groups() == ("", ""):
+        return None
+    a, b = m.groups()
+    if not a:
+        n = int(b)
+        return (max(tamano - n, 0), tamano - 1) if n and tamano else False
+    inicio, fin = int(a), int(b) if b else None
+    if fin is not None and fin < inicio:
+        return None
+    if inicio >= tamano:
+        return False
+    return inicio, tamano - 1 if fin is None else min(fin, tamano - 1)
+
+
+def _rango_pedido(request, tamano, headers):
+    """rango() del request; None si If-Range no coincide con el ETag/Last-Modified de `headers`."""
+    r = rango(request.headers.get("Range"), tamano)
+    if_range = request.headers.get("If-Range")
+    if r is not None and if_range and if_range.strip() not in (headers["ETag"], headers["Last-Modified"]):
+        return None  # el cliente tiene otra versión: va el contenido completo
+    return r
+
+
+def _no_modificado(request, tag):
+    inm = request.headers.get("If-None-Match")
+    return bool(inm) and any(t in ("*", tag, "W/" + tag) for t in parse_etags(inm))
+
+
+def _nombre(recurso):
+    ext = os.path.splitext(recurso.archivo.name)[1]
+    titulo = (recurso.titulo or "").strip() or os.path.basename(recurso.archivo.name)
+    return titulo if not ext or titulo.lower().endswith(ext.lower()) else titulo + ext
+
+
+def responder(request, recurso, adjunto=False):
+    """Respuesta para GET/HEAD del archivo del recurso; FileNotFoundError si falta en el storage."""
+    archivo = recurso.archivo
+    path = _ruta(archivo)
+    if path is not None:
+        st = os.stat(path)
+        tamano, mtime = st.st_size, st.st_mtime_ns
+    else:
+        tamano, mtime = archivo.size, int(recurso.fecha_subida.timestamp() * 1e9)
+    tag = f'"{recurso.blob.sha256}"' if recurso.blob_id else f'"{tamano:x}-{mtime:x}"'
+    headers = {
+        "ETag": tag,
+        "Last-Modified": http_date(recurso.fecha_subida.timestamp()),
+        "Cache-Control": f"private, max-age={getattr(settings, 'DOWNLOAD_MAX_AGE', 24 * 60 * 60)}",
+        "Accept-Ranges": "bytes",
+    }
+
+    if _no_modificado(request, tag):
+        return HttpResponse(status=304, headers=headers)
+
+    ctype = mimetypes.guess_type(archivo.name)[0] or "application/octet-stream"
+    headers["Content-Disposition"] = content_disposition_header(adjunto, _nombre(recurso))
+    offload = getattr(settings, "DOWNLOAD_OFFLOAD", None)
+    if path is not None and offload == "x-accel-redirect":
+        prefix = getattr(settings, "DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+        headers["X-Accel-Redirect"] = quote(prefix.rstrip("/") + "/" + archivo.name)
+        return HttpResponse(content_type=ctype, headers=headers)
+    if path is not None and offload == "x-sendfile" and path.isascii():
+        headers["X-Sendfile"] = path
+        return HttpResponse(content_type=ctype, headers=headers)
+
+    r = _rango_pedido(request, tamano, headers)
+    if r is False:
+        headers["Content-Range"] = f"bytes */{tamano}"
+        return HttpResponse(status=416, headers=headers)
+    inicio, fin = r or (0, tamano - 1)
+    longitud = fin - inicio + 1
+    if r:
+        headers["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    if request.method == "HEAD":
+        resp = HttpResponse(content_type=ctype, status=206 if r else 200, headers=headers)
+    else:
+        fh = archivo.storage.open(archivo.name, "rb")
+        resp = FileResponse(_Tramo(fh, inicio, longitud) if r else fh, content_type=ctype, status=206 if r else 200)
+        for k, v in headers.items():
+            resp[k] = v
+    resp["Content-Length"] = str(longitud)
+    return resp
+
+
+# --- ZIP de los recursos de una asignatura ---
+
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_FIN = struct.Struct("<IHHHHIIH")
+_FIN64 = struct.Struct("<IQHHIIQQQQ")
+_LOCALIZADOR64 = struct.Struct("<IIQI")
+_MAX32 = 0xFFFFFFFF
+_UTF8 = 0x800  # bit 11: nombres en UTF-8
+_FORMATO = 1  # entra en el ETag: subirlo si cambia cómo se arma el ZIP
+
+
+def _fecha_dos(dt):
+    dt = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+    if dt.year < 1980:
+        return 0, (1 << 5) | 1
+    return (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2), ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day
+
+
+def _firma(recursos):
+    """(digest, entradas sin CRC) del ZIP; sólo consulta tamaños (stat), no lee contenido."""
+    entradas, usados = [], set()
+    for r in recursos:
+        if not r.archivo:
+            continue
+        if r.blob_id:
+            tamano, clave = r.blob.tamano, r.blob.sha256
+        else:
+            path = _ruta(r.archivo)
+            try:
+                st = os.stat(path) if path is not None else None
+                tamano = st.st_size if st else r.archivo.size
+            except FileNotFoundError:
+                continue
+            firma = f"{r.archivo.name}:{tamano}:{st.st_mtime_ns if st else r.fecha_subida.timestamp()}"
+            clave = hashlib.sha1(firma.encode()).hexdigest()
+        nombre = _nombre(r).replace("/", "_").replace("\\", "_")
+        base, ext = os.path.splitext(nombre)
+        n = 1
+        while nombre.lower() in usados:
+            n += 1
+            nombre = f"{base} ({n}){ext}"
+        usados.add(nombre.lower())
+        entradas.append({"nombre": nombre, "archivo": r.archivo.name, "tamano": tamano, "clave": clave,
+                         "fecha": _fecha_dos(r.fecha_subida)})
+    digest = hashlib.sha1(json.dumps([_FORMATO, entradas], sort_keys=True).encode()).hexdigest()
+    return digest, entradas
+
+
+def _crc(storage, nombre):
+    crc = 0
+    with storage.open(nombre, "rb") as fh:
+        while data := fh.read(READ_SIZE):
+            crc = zlib.crc32(data, crc)
+    return crc
+
+
+def _manifiesto(digest, entradas, storage):
+    """Entradas con su CRC-32: de la caché (manifiesto por firma, CRC por contenido) o leyendo el archivo."""
+    key = f"recursos_zip:{digest}"
+    cacheado = cache.get(key)
+    if cacheado is not None:
+        return cacheado
+    crcs = cache.get_many([f"crc32:{e['clave']}" for e in entradas])
+    nuevos = {}
+    for e in entradas:
+        ck = f"crc32:{e['clave']}"
+        if ck not in crcs:
+            crcs[ck] = nuevos[ck] = _crc(storage, e["archivo"])
+        e["crc"] = crcs[ck]
+    if nuevos:
+        cache.set_many(nuevos, None)  # el contenido de un blob no cambia
+    cache.set(key, entradas, getattr(settings, "ZIP_MANIFEST_TTL", 24 * 60 * 60))
+    return entradas
+
+
+def _partes(entradas):
+    """El ZIP como lista de bytes (headers) y (archivo, tamaño) (contenido), en orden."""
+    partes, central, offset = [], [], 0
+    for e in entradas:
+        nombre, tamano = e["nombre"].encode(), e["tamano"]
+        hora, dia = e["fecha"]
+        zip64 = tamano >= _MAX32
+        tam32 = _MAX32 if zip64 else tamano
+        version = 45 if zip64 else 20
+        extra = struct.pack("<HHQQ", 1, 16, tamano, tamano) if zip64 else b""
+        local = _LOCAL.pack(0x04034B50, version, _UTF8, 0, hora, dia, e["crc"], tam32, tam32,
+                            len(nombre), len(extra)) + nombre + extra
+        partes += [local, (e["archivo"], tamano)]
+        campos = ([tamano, tamano] if zip64 else []) + ([offset] if offset >= _MAX32 else [])
+        extra = struct.pack(f"<HH{len(campos)}Q", 1, 8 * len(campos), *campos) if campos else b""
+        version = 45 if campos else 20
+        central.append(_CENTRAL.pack(0x02014B50, (3 << 8) | version, version, _UTF8, 0, hora, dia, e["crc"], tam32, tam32,
+                                     len(nombre), len(extra), 0, 0, 0, 0o100644 << 16, min(offset, _MAX32)) + nombre + extra)
+        offset += len(local) + tamano
+    cd, n = b"".join(central), len(entradas)
+    fin = b""
+    if n >= 0xFFFF or offset >= _MAX32 or len(cd) >= _MAX32:
+        fin = (_FIN64.pack(0x06064B50, 44, 45, 45, 0, 0, n, n, len(cd), offset)
+               + _LOCALIZADOR64.pack(0x07064B50, 0, offset + len(cd), 1))
+    fin += _FIN.pack(0x06054B50, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF), min(len(cd), _MAX32), min(offset, _MAX32), 0)
+    partes.append(cd + fin)
+    return partes
+
+
+def _largo(parte):
+    return len(parte) if isinstance(parte, bytes) else parte[1]
+
+
+def _iter_zip(partes, storage, inicio, fin):
+    """Bytes [inicio, fin] del ZIP: los headers de memoria y el contenido del storage por bloques."""
+    pos = 0
+    for parte in partes:
+        a, b = max(inicio - pos, 0), min(fin + 1 - pos, _largo(parte))
+        pos += _largo(parte)
+        if a < b and isinstance(parte, bytes):
+            yield parte[a:b]
+        elif a < b:
+            with storage.open(parte[0], "rb") as fh:
+                fh.seek(a)
+                restante = b - a
+                while restante > 0:
+                    data = fh.read(min(READ_SIZE, restante))
+                    if not data:
+                        raise OSError(f"{parte[0]} cambió de tamaño durante la descarga")
+                    restante -= len(data)
+                    yield data
+        if pos > fin:
+            return
+
+
+def responder_zip(request, recursos, nombre):
+    """Respuesta GET/HEAD con el ZIP de `recursos` (ETag, If-None-Match y Range como responder())."""
+    recursos = list(recursos)
+    digest, entradas = _firma(recursos)
+    etag = f'"{digest}"'
+    fechas = [r.fecha_subida for r in recursos]
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(max(fechas).timestamp() if fechas else 0),
+        "Cache-Control": "private, no-cache",  # la lista cambia: siempre revalidar (304 barato)
+        "Accept-Ranges": "bytes",
+    }
+    if _no_modificado(request, etag):
+        return HttpResponse(status=304, headers=headers)
+
+    partes = _partes(_manifiesto(digest, entradas, default_storage))
+    total = sum(_largo(p) for p in partes)
+    headers["Content-Disposition"] = content_disposition_header(True, nombre)
+    r = _rango_pedido(request, total, headers)
+    if r is False:
+        headers["Content-Range"] = f"bytes */{total}"
+        return HttpResponse(status=416, headers=headers)
+    inicio, fin = r or (0, total - 1)
+    if r:
+        headers["Content-Range"] = f"bytes {inicio}-{fin}/{total}"
+    headers["Content-Length"] = str(fin - inicio + 1)
+    if request.method == "HEAD":
+        return HttpResponse(content_type="application/zip", status=206 if r else 200, headers=headers)
+    return StreamingHttpResponse(_iter_zip(partes, default_storage, inicio, fin), content_type="application/zip",
+                                 status=206 if r else 200, headers=headers)
@@ -0,0 +1,181 @@
+"""
+Caché de estructura de cursos sobre el framework de caché de Django.
+
+Guarda lo que las vistas resuelven una y otra vez y casi nunca cambia: el id de una
+asignatura por código, sus RA, los indicadores por RA / por asignatura y el árbol
+RA -> actividades -> indicadores. Las claves van por asignatura o por RA y se borran
+desde api/signals/signals.py (post_save / post_delete) cuando cambia el modelo
+correspondiente; el timeout es sólo una red de seguridad. Las escrituras masivas
+(bulk_create / update / SQL directo) no emiten señales: quien las haga debe llamar
+a las funciones invalidate_*.
+
+Con LocMemCache (desarrollo) la caché es por proceso; con varios workers hay que
+configurar un backend compartido (archivo / memcached / redis) para que la
+invalidación llegue a todos. Ver CACHES en backend/settings.py.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models.models import (
+    Asignatura, ResultadoDeAprendizaje, IndicadoresDeLogro, RaActividad, TipoActividad,
+)
+
+CACHE_TIMEOUT = getattr(settings, "STRUCTURE_CACHE_TIMEOUT", 60 * 60)
+PREFIX = "est"
+_MISSING = 0  # centinela para "no existe" (None es lo que devuelve cache.get en un fallo)
+
+_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+
+
+def _key(*parts):
+    return ":".join((PREFIX,) + tuple(str(p) for p in parts))
+
+
+def _cached(namespace, key, loader):
+    value = cache.get(key)
+    if value is not None:
+        with _lock:
+            _hits[namespace] += 1
+        return value
+    with _lock:
+        _misses[namespace] += 1
+    value = loader()
+    cache.set(key, value, CACHE_TIMEOUT)
+    return value
+
+
+def stats():
+    """Aciertos / fallos por espacio de nombres desde que arrancó el proceso."""
+    with _lock:
+        names = sorted(set(_hits) | set(_misses))
+        return {n: {"hits": _hits[n], "misses": _misses[n]} for n in names}
+
+
+def reset_stats():
+    with _lock:
+        _hits.clear()
+        _misses.clear()
+
+
+# --- Lecturas ---
+
+def asignatura_id(codigo):
+    """id_asignatura para un código, o None si no existe (también se cachea la ausencia)."""
+    def load():
+        aid = (Asignatura.objects.filter(codigo_asignatura=codigo)
+               .values_list("id_asignatura", flat=True).first())
+        if aid is not None:
+            cache.set(_key("asig-codigo", aid), codigo, CACHE_TIMEOUT)
+        return aid or _MISSING
+    return _cached("asignatura", _key("asig", codigo), load) or None
+
+
+def ras(id_asignatura):
+    """RA de la asignatura ordenados por id: [{id_ra, porcentaje_ra, descripcion}]."""
+    return _cached("ras", _key("ras", id_asignatura), lambda: [
+        {"id_ra": id_ra, "porcentaje_ra": float(pct), "descripcion": desc}
+        for id_ra, pct, desc in ResultadoDeAprendizaje.objects
+        .filter(asignatura_id=id_asignatura).order_by("id_ra")
+        .values_list("id_ra", "porcentaje_ra", "descripcion")
+    ])
+
+
+def _indicadores(qs):
+    return [
+        {"id_ind": id_ind, "ra_id": ra_id, "descripcion": desc, "porcentaje_ind": float(pct)}
+        for id_ind, ra_id, desc, pct in qs.order_by("id_ind")
+        .values_list("id_ind", "ra_id", "descripcion", "porcentaje_ind")
+    ]
+
+
+def indicadores_ra(ra_id):
+    return _cached("indicadores", _key("ind-ra", ra_id),
+                   lambda: _indicadores(IndicadoresDeLogro.objects.filter(ra_id=ra_id)))
+
+
+def indicadores_asignatura(id_asignatura):
+    return _cached("indicadores", _key("ind-asig", id_asignatura),
+                   lambda: _indicadores(IndicadoresDeLogro.objects.filter(ra__asignatura_id=id_asignatura)))
+
+
+def _tipos_actividad():
+    return _cached("tipos_actividad", _key("tipos-actividad"),
+                   lambda: dict(TipoActividad.objects.values_list("id_tipo_actividad", "descripcion")))
+
+
+def actividades_ra(ra_id):
+    """
+    Árbol RA -> actividades -> indicadores (sin notas). La descripción del tipo de
+    actividad se resuelve aparte para que un cambio en TipoActividad no obligue a
+    invalidar todos los árboles.
+    """
+    def load():
+        rels = (RaActividad.objects
+                .filter(ra_id=ra_id)
+                .select_related("actividad")
+                .prefetch_related("indicadores_rel__indicador"))
+        return [{
+            "id_actividad": rel.actividad.id_actividad,
+            "id_ra_actividad": rel.id_ra_actividad,
+            "nombre_actividad": rel.actividad.nombre_actividad,
+            "porcentaje_actividad": float(rel.actividad.porcentaje_actividad),
+            "porcentaje_ra_actividad": float(rel.porcentaje_ra_actividad),
+            "id_tipo_actividad": rel.actividad.tipo_actividad_id,
+            "fecha_cierre": rel.actividad.fecha_cierre,
+            "indicadores": [{
+                "id_ind": rir.indicador_id,
+                "descripcion": rir.indicador.descripcion,
+                "porcentaje_ind": float(rir.indicador.porcentaje_ind),
+            } for rir in rel.indicadores_rel.all()],
+        } for rel in rels]
+
+    rows = _cached("actividades", _key("act-ra", ra_id), load)
+    tipos = _tipos_actividad()
+    out = []
+    for row in rows:
+        row = dict(row)  # copia: el llamador la completa con las notas de la matrícula
+        indicadores = [dict(i) for i in row.pop("indicadores")]
+        fecha_cierre = row.pop("fecha_cierre")
+        row.update(tipo_actividad=tipos.get(row["id_tipo_actividad"]), fecha_cierre=fecha_cierre, indicadores=indicadores)
+        out.append(row)
+    return out
+
+
+# --- Invalidación (llamada desde las señales) ---
+
+def invalidate_asignatura(codigo=None, id_asignatura=None):
+    keys = []
+    if codigo:
+        keys.append(_key("asig", codigo))
+    if id_asignatura:
+        # El código anterior (si cambió) se recupera de la clave inversa
+        anterior = cache.get(_key("asig-codigo", id_asignatura))
+        if anterior and anterior != codigo:
+            keys.append(_key("asig", anterior))
+        keys += [_key("asig-codigo", id_asignatura), _key("ras", id_asignatura), _key("ind-asig", id_asignatura)]
+    cache.delete_many(keys)
+
+
+def invalidate_ras(id_asignatura):
+    cache.delete_many([_key("ras", id_asignatura), _key("ind-asig", id_asignatura)])
+
+
+def invalidate_ra(ra_id, id_asignatura=None):
+    keys = [_key("ind-ra", ra_id), _key("act-ra", ra_id)]
+    if id_asignatura:
+        keys.append(_key("ind-asig", id_asignatura))
+    cache.delete_many(keys)
+
+
+def invalidate_actividades(*ra_ids):
+    cache.delete_many([_key("act-ra", r) for r in ra_ids])
+
+
+def invalidate_tipos_actividad():
+    cache.delete(_key("tipos-actividad"))
+
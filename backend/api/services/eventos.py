@@ -0,0 +1,77 @@
+"""
+Pub/sub en memoria del proceso para el stream SSE de notificaciones (/api/notificaciones/stream).
+
+Cada conexión SSE abierta es una Suscripcion con su asyncio.Queue, registrada por
+estudiante. publicar() se llama desde código síncrono (señales, on_commit, hilos de
+sync_to_async) y entrega el evento en el event loop de cada suscriptor con
+call_soon_threadsafe. Los publicadores consultan suscritos() antes de calcular nada: en un
+worker sin streams abiertos publicar no cuesta consultas.
+
+El alcance es el proceso: con varios workers un cambio hecho en otro proceso no llega
+por aquí; el stream lo recoge en su resincronización periódica contra la tabla
+`notificacion` (SSE_RESYNC_INTERVAL en settings.py).
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+
+QUEUE_SIZE = getattr(settings, "SSE_QUEUE_SIZE", 100)
+
+_lock = threading.Lock()
+_subs = {}  # id_estudiante -> {Suscripcion}
+
+
+class Suscripcion:
+    def __init__(self, id_estudiante):
+        self.id_estudiante = id_estudiante
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.desbordada = False  # se perdieron eventos: el stream debe resincronizar
+
+    def _put(self, evento):
+        try:
+            self.queue.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    async def get(self, timeout):
+        """Siguiente evento, o None si pasan `timeout` segundos sin ninguno."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def suscribir(id_estudiante):
+    """Registra una suscripción en el event loop actual (llamar desde código async)."""
+    sub = Suscripcion(id_estudiante)
+    with _lock:
+        _subs.setdefault(id_estudiante, set()).add(sub)
+    return sub
+
+
+def cancelar(sub):
+    with _lock:
+        subs = _subs.get(sub.id_estudiante)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subs[sub.id_estudiante]
+
+
+def suscritos():
+    """Ids de estudiante con al menos un stream abierto en este proceso."""
+    with _lock:
+        return set(_subs)
+
+
+def publicar(id_estudiante, evento):
+    """Entrega `evento` (dict) a los streams del estudiante; seguro desde cualquier hilo."""
+    with _lock:
+        subs = list(_subs.get(id_estudiante, ()))
+    for sub in subs:
+        try:
+            sub.loop.call_soon_threadsafe(sub._put, evento)
+        except RuntimeError:
+            cancelar(sub)  # loop cerrado: la conexión ya no existe
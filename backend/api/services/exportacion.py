@@ -0,0 +1,51 @@
+"""
+Exportación de notas en CSV por streaming.
+
+Las filas salen de NotasActividad unido a Matricula/Estudiante/RaActividad mediante
+values_list(...).iterator(chunk_size=...), que en PostgreSQL usa un cursor del lado
+del servidor: la memoria es constante y el primer byte sale sin esperar la consulta
+completa. Las columnas coinciden con el formato largo de services/importacion.py,
+por lo que un archivo exportado puede reimportarse tal cual.
+"""
+import csv
+
+from ..models.models import NotasActividad
+
+ITER_CHUNK_SIZE = 2000
+
+HEADER = [
+    "codigo_asignatura", "periodo", "codigo_estudiante", "nombre", "apellido", "id_matricula",
+    "id_ra", "id_ra_actividad", "actividad", "porcentaje_ra_actividad", "nota", "id_ind", "retroalimentacion",
+]
+FIELDS = [
+    "matricula__asignatura__codigo_asignatura", "matricula__periodo__descripcion",
+    "matricula__estudiante__codigo_estudiante", "matricula__estudiante__nombre", "matricula__estudiante__apellido",
+    "matricula_id", "ra_actividad__ra_id", "ra_actividad_id", "ra_actividad__actividad__nombre_actividad",
+    "ra_actividad__porcentaje_ra_actividad", "nota_ra_actividad", "indicador_id", "retroalimentacion",
+]
+
+
+class _Echo:
+    """Pseudo-buffer: csv.writer escribe y el valor se devuelve para el StreamingHttpResponse."""
+
+    def write(self, value):
+        return value
+
+
+def notas_queryset(asignatura_id=None, programa_id=None, periodo_id=None):
+    qs = NotasActividad.objects.all()
+    if asignatura_id:
+        qs = qs.filter(matricula__asignatura_id=asignatura_id)
+    if programa_id:
+        qs = qs.filter(matricula__asignatura__programa_id=programa_id)
+    if periodo_id:
+        qs = qs.filter(matricula__periodo_id=periodo_id)
+    return qs.order_by("matricula_id", "ra_actividad_id")
+
+
+def iter_csv(qs, chunk_size=ITER_CHUNK_SIZE):
+    """Genera el CSV línea a línea (encabezado incluido)."""
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(HEADER)  # BOM para que Excel detecte UTF-8
+    for row in qs.values_list(*FIELDS).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
@@ -0,0 +1,91 @@
+"""
+Índice de identidades para login (tabla `identidad_login`).
+
+Cada Docente/Estudiante tiene dos filas (código y correo normalizados). login_view
+resuelve la cuenta con una sola consulta sobre este índice y luego verifica un hash.
+La clave no es única: dos cuentas cuyos códigos o correos sólo difieren en mayúsculas
+comparten fila normalizada, y resolve() desempata por el valor exacto o no resuelve.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from ..models.models import Docente, Estudiante, IdentidadLogin
+
+ROLES = ("docente", "estudiante")
+_MODELS = {"docente": Docente, "estudiante": Estudiante}
+_CAMPOS = {
+    "docente": ("codigo_docente", "correo"),
+    "estudiante": ("codigo_estudiante", "correo"),
+}
+
+
+def normalize(v):
+    return str(v).strip().lower() if v else ""
+
+
+def _rows(rol, u):
+    campo_codigo, campo_correo = _CAMPOS[rol]
+    out = []
+    for tipo, valor in (("codigo", getattr(u, campo_codigo)), ("correo", getattr(u, campo_correo))):
+        if valor:
+            out.append(IdentidadLogin(clave=normalize(valor), tipo=tipo, rol=rol, id_usuario=u.pk))
+    return out
+
+
+def sync_user(rol, u):
+    with transaction.atomic():
+        IdentidadLogin.objects.filter(rol=rol, id_usuario=u.pk).delete()
+        IdentidadLogin.objects.bulk_create(_rows(rol, u))
+
+
+def delete_user(rol, uid):
+    IdentidadLogin.objects.filter(rol=rol, id_usuario=uid).delete()
+
+
+def sync_bulk(rol, users):
+    """Para cargas masivas (bulk_create no dispara señales)."""
+    IdentidadLogin.objects.bulk_create([row for u in users for row in _rows(rol, u)], batch_size=2000)
+
+
+def _exacto(rol, tipo, valor, uids):
+    """Entre cuentas con la misma clave normalizada, la única cuyo valor guardado coincide tal cual."""
+    campo = _CAMPOS[rol][0 if tipo == "codigo" else 1]
+    ids = list(_MODELS[rol].objects.filter(pk__in=uids, **{campo: str(valor).strip()})
+               .values_list("pk", flat=True)[:2])
+    return ids[0] if len(ids) == 1 else None
+
+
+def resolve(codigo, email, roles=ROLES):
+    """
+    Candidatos [(rol, id_usuario)] en orden de prioridad: por rol, el código gana al correo
+    (mismo orden que la búsqueda anterior por modelos). Una sola consulta, más una de
+    desempate si la clave es ambigua; una clave ambigua sin coincidencia exacta no resuelve.
+    """
+    cond = Q()
+    if codigo:
+        cond |= Q(tipo="codigo", clave=normalize(codigo))
+    if email:
+        cond |= Q(tipo="correo", clave=normalize(email))
+    if not cond:
+        return []
+    found = {}
+    for rol, tipo, uid in (IdentidadLogin.objects
+                           .filter(cond, rol__in=list(roles))
+                           .values_list("rol", "tipo", "id_usuario")):
+        found.setdefault((rol, tipo), set()).add(uid)
+    out = []
+    for rol in roles:
+        for tipo, valor in (("codigo", codigo), ("correo", email)):
+            uids = found.get((rol, tipo))
+            uid = (next(iter(uids)) if len(uids) == 1 else _exacto(rol, tipo, valor, uids)) if uids else None
+            if uid:
+                out.append((rol, uid))
+                break
+    return out
+
+
+def rebuild():
+    with transaction.atomic():
+        IdentidadLogin.objects.all().delete()
+        sync_bulk("docente", Docente.objects.only("id_docente", "codigo_docente", "correo").iterator())
+        sync_bulk("estudiante", Estudiante.objects.only("id_estudiante", "codigo_estudiante", "correo").iterator())
@@ -0,0 +1,179 @@
+"""
+Importación de notas desde CSV/XLSX en streaming.
+
+El archivo se recorre fila a fila (csv.reader sobre el stream / openpyxl en modo
+read_only), los códigos de estudiante y nombres de actividad se resuelven con tablas
+en memoria construidas una sola vez por archivo, y las notas se escriben por bloques
+de tamaño fijo con services.notas.upsert_notas. La memoria queda acotada por el
+tamaño del bloque, no por el del archivo.
+
+Formatos aceptados (la primera fila es el encabezado):
+- Largo: codigo_estudiante, actividad, nota[, retroalimentacion][, id_ind]
+- Ancho: codigo_estudiante y una columna por actividad (nombre_actividad) con la nota.
+"""
+import csv
+import io
+
+from ..models.models import Matricula, RaActividad
+from .notas import upsert_notas, after_write
+
+CHUNK_SIZE = 5000
+MAX_ERRORS = 100
+
+COL_CODIGO = {"codigo_estudiante", "codigo", "code", "estudiante"}
+COL_ACTIVIDAD = {"actividad", "nombre_actividad"}
+COL_NOTA = {"nota", "calificacion"}
+COL_RETRO = {"retroalimentacion", "comentario"}
+COL_IND = {"id_ind", "indicador"}
+# Columnas informativas que se ignoran en formato ancho
+COL_INFO = {"nombre", "apellido", "nombres", "apellidos", "correo"}
+
+
+class ImportacionError(ValueError):
+    """Error de formato que invalida el archivo completo."""
+
+
+def _norm(v):
+    return str(v).strip().casefold() if v is not None else ""
+
+
+def _iter_csv(fileobj):
+    """fileobj: archivo binario con seek (upload de Django o open(..., "rb"))."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportacionError("Se requiere openpyxl para importar archivos .xlsx")
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            yield ["" if v is None else v for v in row]
+    finally:
+        wb.close()
+
+
+def iter_rows(fileobj, filename):
+    if str(filename).lower().endswith((".xlsx", ".xlsm")):
+        return _iter_xlsx(fileobj)
+    return _iter_csv(fileobj)
+
+
+def _lookups(asignatura, periodo_id):
+    """Tablas {codigo_estudiante: id_matricula} y {nombre_actividad: [id_ra_actividad, ...]}."""
+    mats = Matricula.objects.filter(asignatura=asignatura)
+    if periodo_id:
+        mats = mats.filter(periodo_id=periodo_id)
+    # Orden ascendente: si hay varias matrículas del mismo estudiante, gana la más reciente
+    por_codigo = {
+        _norm(codigo): id_mat
+        for codigo, id_mat in mats.order_by("id_matricula").values_list("estudiante__codigo_estudiante", "id_matricula")
+    }
+    por_actividad = {}
+    for nombre, id_rel in (RaActividad.objects
+                           .filter(ra__asignatura=asignatura)
+                           .order_by("id_ra_actividad")
+                           .values_list("actividad__nombre_actividad", "id_ra_actividad")):
+        por_actividad.setdefault(_norm(nombre), []).append(id_rel)
+    return por_codigo, por_actividad
+
+
+def _records(rows, por_actividad):
+    """Convierte las filas del archivo en (línea, codigo, nombre_actividad, nota, extras)."""
+    header = next(rows, None)
+    if not header:
+        raise ImportacionError("Archivo vacío")
+    cols = [_norm(h) for h in header]
+
+    def find(names):
+        return next((i for i, c in enumerate(cols) if c in names), None)
+
+    i_cod, i_act, i_nota = find(COL_CODIGO), find(COL_ACTIVIDAD), find(COL_NOTA)
+    i_retro, i_ind = find(COL_RETRO), find(COL_IND)
+    if i_cod is None:
+        raise ImportacionError("Falta la columna codigo_estudiante")
+
+    if i_act is not None:
+        if i_nota is None:
+            raise ImportacionError("Falta la columna nota")
+        for line, row in enumerate(rows, start=2):
+            if not any(str(v).strip() for v in row):
+                continue
+            extras = {}
+            if i_retro is not None:
+                extras["retroalimentacion"] = (str(row[i_retro]).strip() or None) if i_retro < len(row) else None
+            if i_ind is not None:
+                extras["id_ind"] = row[i_ind] if i_ind < len(row) else None
+            get = lambda i: row[i] if i < len(row) else ""
+            yield line, get(i_cod), get(i_act), get(i_nota), extras
+        return
+
+    act_cols = [(i, c) for i, c in enumerate(cols)
+                if i != i_cod and c and c not in COL_INFO and c in por_actividad]
+    if not act_cols:
+        raise ImportacionError("Ninguna columna coincide con una actividad del curso")
+    for line, row in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in row):
+            continue
+        for i, nombre in act_cols:
+            if i < len(row) and str(row[i]).strip() != "":
+                yield line, row[i_cod], nombre, row[i], {}
+
+
+def import_grades(fileobj, filename, asignatura, periodo_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Importa las notas del archivo para la asignatura (y periodo, si se indica).
+    Devuelve {"filas", "created", "updated", "duplicate", "error", "errores": [...]}.
+    """
+    por_codigo, por_actividad = _lookups(asignatura, periodo_id)
+    resumen = {"filas": 0, "created": 0, "updated": 0, "duplicate": 0, "error": 0}
+    errores = []
+    mat_ids = set()
+
+    def error(line, msg):
+        resumen["error"] += 1
+        if len(errores) < MAX_ERRORS:
+            errores.append({"linea": line, "error": msg})
+
+    def flush(chunk, lines):
+        for res in upsert_notas(chunk, hooks=False):
+            if res["status"] == "error":
+                error(lines[res["index"]], res["error"])
+            else:
+                resumen[res["status"]] += 1
+        mat_ids.update(r["id_matricula"] for r in chunk)
+
+    chunk, lines = [], []
+    for line, codigo, actividad, nota, extras in _records(iter(iter_rows(fileobj, filename)), por_actividad):
+        resumen["filas"] += 1
+        id_mat = por_codigo.get(_norm(codigo))
+        rels = por_actividad.get(_norm(actividad))
+        if not id_mat:
+            error(line, f"Estudiante {codigo} no matriculado")
+            continue
+        if not rels:
+            error(line, f"Actividad {actividad} no existe en el curso")
+            continue
+        for id_rel in rels:
+            chunk.append({"id_matricula": id_mat, "id_ra_actividad": id_rel, "nota": nota, **extras})
+            lines.append(line)
+        if len(chunk) >= chunk_size:
+            flush(chunk, lines)
+            chunk, lines = [], []
+    if chunk:
+        flush(chunk, lines)
+    if mat_ids:
+        after_write(mat_ids)
+    return {**resumen, "errores": errores}
@@ -0,0 +1,139 @@
+"""
+Carga masiva de notas (NotasActividad).
+
+Valida las filas contra la estructura del curso en forma de conjuntos (tres consultas
+en total, sin importar cuántas filas lleguen) y escribe con un INSERT ... ON CONFLICT
+DO UPDATE por bloque, todo dentro de una transacción.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from ..models.models import Matricula, RaActividad, IndicadoresDeLogro, NotasActividad
+from . import notificaciones, calificaciones
+
+CHUNK_SIZE = 1000
+NOTA_MIN, NOTA_MAX = Decimal("0"), Decimal("5")
+
+
+def _to_id(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_nota(v):
+    if v is None or v == "":
+        return None
+    try:
+        nota = Decimal(str(v).strip().replace(",", "."))
+    except InvalidOperation:
+        return None
+    if not nota.is_finite() or not (NOTA_MIN <= nota <= NOTA_MAX):
+        return None
+    return nota.quantize(Decimal("0.01"))
+
+
+def after_write(mat_ids):
+    """Hooks que las señales post_save no cubren porque bulk_create no las dispara."""
+    calificaciones.recompute_matriculas(mat_ids)
+    notificaciones.refresh_matriculas(mat_ids)
+    notificaciones.publicar_notas(mat_ids)
+
+
+def upsert_notas(rows, chunk_size=CHUNK_SIZE, hooks=True):
+    """
+    rows: iterable de dicts {id_matricula, id_ra_actividad, nota, retroalimentacion?, id_ind?}.
+    Devuelve una lista con un resultado por fila, en el mismo orden:
+    {"index", "status": "created" | "updated" | "duplicate" | "error", "id"?, "error"?}.
+    Si la misma pareja (matrícula, ra_actividad) aparece varias veces, gana la última.
+    retroalimentacion/id_ind solo se sobrescriben en las filas que traen la clave: las filas se
+    agrupan por las claves opcionales que traen y cada grupo va con su propio update_fields.
+    Con hooks=False el llamador se encarga de after_write (p. ej. una importación por bloques).
+    """
+    rows = list(rows)
+    results = [{"index": i} for i in range(len(rows))]
+    parsed = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[i].update(status="error", error="Fila inválida")
+            continue
+        id_mat, id_rel = _to_id(row.get("id_matricula")), _to_id(row.get("id_ra_actividad"))
+        nota = _to_nota(row.get("nota"))
+        id_ind = row.get("id_ind")
+        if not (id_mat and id_rel):
+            results[i].update(status="error", error="id_matricula e id_ra_actividad requeridos")
+        elif nota is None:
+            results[i].update(status="error", error=f"nota debe estar entre {NOTA_MIN} y {NOTA_MAX}")
+        elif id_ind not in (None, "") and not _to_id(id_ind):
+            results[i].update(status="error", error="id_ind inválido")
+        else:
+            campos = ("nota_ra_actividad",) + (("retroalimentacion",) if "retroalimentacion" in row else ()) \
+                + (("indicador",) if "id_ind" in row else ())
+            parsed.append((i, id_mat, id_rel, nota, row.get("retroalimentacion"),
+                           _to_id(id_ind) if id_ind not in (None, "") else None, campos))
+
+    mat_asig = dict(Matricula.objects
+                    .filter(id_matricula__in={p[1] for p in parsed})
+                    .values_list("id_matricula", "asignatura_id"))
+    rel_info = {id_rel: (id_asig, id_ra) for id_rel, id_asig, id_ra in RaActividad.objects
+                .filter(id_ra_actividad__in={p[2] for p in parsed})
+                .values_list("id_ra_actividad", "ra__asignatura_id", "ra_id")}
+    ind_ra = dict(IndicadoresDeLogro.objects
+                  .filter(id_ind__in={p[5] for p in parsed if p[5]})
+                  .values_list("id_ind", "ra_id"))
+
+    by_pair = {}
+    for i, id_mat, id_rel, nota, retro, id_ind, campos in parsed:
+        if id_mat not in mat_asig:
+            results[i].update(status="error", error="Matrícula no existe")
+        elif id_rel not in rel_info:
+            results[i].update(status="error", error="RaActividad no existe")
+        elif rel_info[id_rel][0] != mat_asig[id_mat]:
+            results[i].update(status="error", error="La actividad no pertenece a la asignatura de la matrícula")
+        elif id_ind and ind_ra.get(id_ind) != rel_info[id_rel][1]:
+            results[i].update(status="error", error="El indicador no pertenece al RA de la actividad")
+        else:
+            prev = by_pair.pop((id_mat, id_rel), None)
+            if prev is not None:
+                results[prev[0]].update(status="duplicate", error="Reemplazada por una fila posterior")
+            by_pair[(id_mat, id_rel)] = (i, NotasActividad(matricula_id=id_mat, ra_actividad_id=id_rel, nota_ra_actividad=nota,
+                                                           retroalimentacion=retro, indicador_id=id_ind), campos)
+
+    if not by_pair:
+        return results
+
+    # Un grupo por combinación de claves opcionales: una fila sin retroalimentacion/id_ind
+    # no debe pisar con NULL lo guardado sólo porque otra fila del mismo lote sí las trae
+    grupos = {}
+    for i, o, campos in by_pair.values():
+        grupos.setdefault(campos, []).append((i, o))
+
+    with transaction.atomic():
+        for update_fields, valid in grupos.items():
+            _upsert(valid, list(update_fields), chunk_size, results)
+        if hooks:
+            mat_ids = {o.matricula_id for _, o, _ in by_pair.values()}
+            transaction.on_commit(lambda: after_write(mat_ids))
+    return results
+
+
+def _upsert(valid, update_fields, chunk_size, results):
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        existing = set(NotasActividad.objects
+                       .filter(matricula_id__in={o.matricula_id for _, o in chunk},
+                               ra_actividad_id__in={o.ra_actividad_id for _, o in chunk})
+                       .values_list("matricula_id", "ra_actividad_id"))
+        NotasActividad.objects.bulk_create(
+            [o for _, o in chunk],
+            update_conflicts=True,
+            unique_fields=["matricula", "ra_actividad"],
+            update_fields=update_fields,
+        )
+        for i, o in chunk:
+            results[i].update(
+                status="updated" if (o.matricula_id, o.ra_actividad_id) in existing else "created",
+                id=o.id,
+            )
@@ -0,0 +1,157 @@
+"""
+Mantenimiento del feed materializado de notificaciones (tabla `notificacion`).
+
+Todo se calcula por lotes de matrículas con un número fijo de consultas por lote,
+de modo que tanto las señales (una matrícula) como el rebuild diario (todas) usan
+el mismo camino.
+
+Los avisos creados / actualizados / retirados y las notas nuevas se publican además en
+el pub/sub de services/eventos.py para los estudiantes con un stream SSE abierto en
+este proceso.
+"""
+import datetime
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Avg
+
+from ..models.models import Matricula, RaActividad, NotasActividad, Notificacion
+from . import eventos
+
+DIAS_AVISO = 7
+UMBRAL_PROMEDIO = 3.0
+BATCH_SIZE = 500
+
+
+def _desired(mat_ids, hoy):
+    """Calcula {(id_estudiante, clave): fila} para las matrículas dadas."""
+    limite = hoy + datetime.timedelta(days=DIAS_AVISO)
+    mats = {
+        id_mat: (id_est, id_asig, nombre)
+        for id_mat, id_est, id_asig, nombre in Matricula.objects
+        .filter(id_matricula__in=mat_ids)
+        .values_list("id_matricula", "estudiante_id", "asignatura_id", "asignatura__nombre")
+    }
+    if not mats:
+        return {}
+
+    rels_por_asig = {}
+    for id_asig, id_rel, id_act, nombre_act, cierre in (RaActividad.objects
+            .filter(ra__asignatura_id__in={a for _, a, _ in mats.values()},
+                    actividad__fecha_cierre__range=(hoy, limite))
+            .values_list("ra__asignatura_id", "id_ra_actividad", "actividad_id",
+                         "actividad__nombre_actividad", "actividad__fecha_cierre")):
+        rels_por_asig.setdefault(id_asig, []).append((id_rel, id_act, nombre_act, cierre))
+
+    calificadas = set(NotasActividad.objects
+                      .filter(matricula_id__in=mats.keys(), nota_ra_actividad__isnull=False,
+                              ra_actividad__actividad__fecha_cierre__range=(hoy, limite))
+                      .values_list("matricula_id", "ra_actividad_id"))
+
+    promedios = dict(NotasActividad.objects
+                     .filter(matricula_id__in=mats.keys(), nota_ra_actividad__isnull=False)
+                     .values("matricula_id")
+                     .annotate(v=Avg("nota_ra_actividad"))
+                     .values_list("matricula_id", "v"))
+
+    out = {}
+    for id_mat, (id_est, id_asig, nombre_asig) in mats.items():
+        for id_rel, id_act, nombre_act, cierre in rels_por_asig.get(id_asig, []):
+            if (id_mat, id_rel) in calificadas:
+                continue
+            clave = f"vence:{id_mat}:{id_act}"
+            out[(id_est, clave)] = Notificacion(
+                estudiante_id=id_est, matricula_id=id_mat, clave=clave, kind="warning", vence=cierre,
+                texto=f'Actividad "{nombre_act}" de {nombre_asig} vence {cierre.isoformat()}',
+            )
+        avg = promedios.get(id_mat)
+        if avg is not None and avg < UMBRAL_PROMEDIO:
+            clave = f"bajo:{id_mat}"
+            out[(id_est, clave)] = Notificacion(
+                estudiante_id=id_est, matricula_id=id_mat, clave=clave, kind="danger",
+                texto=f"Vas bajo en {nombre_asig}: promedio {avg:.2f}/5",
+            )
+    return out
+
+
+def fila(n):
+    """Un aviso con la forma de GET /api/notificaciones."""
+    return {"id": n.id, "kind": n.kind, "text": n.texto, "date": n.fecha_creacion, "read": n.leida}
+
+
+def _publicar_cambios(creadas, actualizadas, retiradas):
+    for n in creadas:
+        eventos.publicar(n.estudiante_id, {"tipo": "notificacion", "data": fila(n)})
+    for n in actualizadas:
+        eventos.publicar(n.estudiante_id, {"tipo": "actualizada", "data": fila(n)})
+    for id_est, ids in retiradas.items():
+        eventos.publicar(id_est, {"tipo": "retiradas", "data": {"ids": ids}})
+
+
+def publicar_notas(mat_ids):
+    """Evento "nota" para los estudiantes suscritos cuyas matrículas recibieron notas nuevas."""
+    suscritos = eventos.suscritos()
+    if not suscritos:
+        return
+    for id_mat, id_est, codigo, nombre in (Matricula.objects
+            .filter(id_matricula__in=list(mat_ids), estudiante_id__in=suscritos)
+            .values_list("id_matricula", "estudiante_id", "asignatura__codigo_asignatura", "asignatura__nombre")):
+        eventos.publicar(id_est, {"tipo": "nota", "data": {
+            "id_matricula": id_mat, "codigo_asignatura": codigo, "kind": "grade", "text": f"Nueva nota en {nombre}",
+        }})
+
+
+def refresh_matriculas(mat_ids, hoy=None):
+    """
+    Sincroniza el feed de las matrículas dadas: borra los avisos que ya no aplican, crea
+    los nuevos y actualiza en su lugar los que sólo cambiaron de texto o fecha (p. ej. el
+    promedio de "bajo"), así conservan su id y su estado de lectura.
+    """
+    mat_ids = list({int(m) for m in mat_ids})
+    hoy = hoy or datetime.date.today()
+    for i in range(0, len(mat_ids), BATCH_SIZE):
+        chunk = mat_ids[i:i + BATCH_SIZE]
+        desired = _desired(chunk, hoy)
+        with transaction.atomic():
+            stale, retiradas, actualizadas = [], {}, []
+            for n in (Notificacion.objects
+                      .filter(matricula_id__in=chunk)
+                      .only("id", "estudiante_id", "clave", "kind", "texto", "vence", "leida", "fecha_creacion")):
+                want = desired.pop((n.estudiante_id, n.clave), None)
+                if want is None:
+                    stale.append(n.id)
+                    retiradas.setdefault(n.estudiante_id, []).append(n.id)
+                elif (want.texto, want.vence) != (n.texto, n.vence):
+                    n.texto, n.vence = want.texto, want.vence
+                    actualizadas.append(n)
+            if stale:
+                Notificacion.objects.filter(id__in=stale).delete()
+            if actualizadas:
+                Notificacion.objects.bulk_update(actualizadas, ["texto", "vence"], batch_size=BATCH_SIZE)
+            creadas = []
+            if desired:
+                creadas = Notificacion.objects.bulk_create(desired.values(), batch_size=BATCH_SIZE)
+            suscritos = eventos.suscritos()
+            if suscritos:
+                creadas = [n for n in creadas if n.estudiante_id in suscritos]
+                actualizadas = [n for n in actualizadas if n.estudiante_id in suscritos]
+                retiradas = {e: ids for e, ids in retiradas.items() if e in suscritos}
+                if creadas or actualizadas or retiradas:
+                    transaction.on_commit(partial(_publicar_cambios, creadas, actualizadas, retiradas))
+
+
+def refresh_asignaturas(asig_ids, hoy=None):
+    """Recalcula el feed de todas las matrículas de las asignaturas dadas."""
+    refresh_matriculas(
+        Matricula.objects.filter(asignatura_id__in=list(asig_ids)).values_list("id_matricula", flat=True),
+        hoy=hoy,
+    )
+
+
+def rebuild_all(hoy=None):
+    """Rebuild completo (comando diario): purga avisos vencidos y recalcula todas las matrículas."""
+    hoy = hoy or datetime.date.today()
+    Notificacion.objects.filter(vence__lt=hoy).delete()
+    ids = list(Matricula.objects.order_by("id_matricula").values_list("id_matricula", flat=True))
+    refresh_matriculas(ids, hoy=hoy)
+    return len(ids)
@@ -0,0 +1,175 @@
+"""
+Resumen por correo de las actividades sin calificar que vencen pronto (uno por estudiante).
+
+generar() arma los correos del día con tres lecturas para todos los estudiantes:
+  1. las RaActividad cuya actividad cierra en [hoy, hoy + dias] (pocas filas);
+  2. las matrículas de periodos vigentes en esas asignaturas, con nombre y correo del
+     estudiante, ordenadas por estudiante y leídas con iterator();
+  3. los pares (matrícula, ra_actividad) ya calificados de esas actividades.
+Una actividad cuenta como pendiente con el mismo criterio del feed de notificaciones
+(services/notificaciones.py): alguna de sus RaActividad sin nota para la matrícula.
+Los correos van a la bandeja `correo_salida` con bulk_create por lotes de BATCH_SIZE
+estudiantes; `clave` (resumen + fecha + estudiante) es única, así que repetir generar() el
+mismo día no duplica nada.
+
+enviar_pendientes() vacía la bandeja con UNA conexión de get_connection() abierta para
+toda la corrida (el login/TLS de SMTP se paga una vez) y send_messages por lotes. Cada
+lote se toma con SELECT ... FOR UPDATE SKIP LOCKED y se marca `enviado` en la misma
+transacción: dos corridas simultáneas no se pisan y, si el proceso muere, lo no confirmado
+sigue `pendiente` para la próxima. Si send_messages falla a mitad de un lote no se sabe
+qué alcanzó a salir: el lote se reintenta de a un mensaje (los ya enviados de ese lote
+pueden llegar dos veces) y sólo los que fallan suman un intento.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models.models import Correo, Matricula, NotasActividad, RaActividad
+
+logger = logging.getLogger(__name__)
+
+DIAS = getattr(settings, "RESUMEN_DIAS", 3)
+LOTE = getattr(settings, "RESUMEN_LOTE", 100)
+MAX_INTENTOS = getattr(settings, "RESUMEN_MAX_INTENTOS", 3)
+BATCH_SIZE = 1000
+
+
+def _cuerpo(nombre, dias, items):
+    lineas = [f"- {cierre.isoformat()} · {asig}: {act}" for cierre, asig, act in sorted(items)]
+    return (
+        f"Hola {nombre},\n\n"
+        f"Tienes actividades sin calificar que cierran en los próximos {dias} días:\n\n"
+        + "\n".join(lineas)
+        + "\n\n— Universidad del Valle"
+    )
+
+
+def _pendientes(hoy, dias):
+    """Itera (id_estudiante, nombre, correo, [(cierre, asignatura, actividad), ...]) por estudiante."""
+    limite = hoy + datetime.timedelta(days=dias)
+    rels_por_asig = {}
+    for id_rel, id_asig, nombre_asig, id_act, nombre_act, cierre in (RaActividad.objects
+            .filter(actividad__fecha_cierre__range=(hoy, limite))
+            .values_list("id_ra_actividad", "ra__asignatura_id", "ra__asignatura__nombre", "actividad_id",
+                         "actividad__nombre_actividad", "actividad__fecha_cierre")):
+        rels_por_asig.setdefault(id_asig, []).append((id_rel, id_act, (cierre, nombre_asig, nombre_act)))
+    if not rels_por_asig:
+        return
+
+    calificadas = set(NotasActividad.objects
+                      .filter(ra_actividad_id__in=[r[0] for rels in rels_por_asig.values() for r in rels],
+                              nota_ra_actividad__isnull=False)
+                      .values_list("matricula_id", "ra_actividad_id"))
+
+    mats = (Matricula.objects
+            .filter(asignatura_id__in=rels_por_asig.keys(), periodo__fecha_inicio__lte=hoy,
+                    periodo__fecha_finalizacion__gte=hoy)
+            .exclude(estudiante__correo="")
+            .order_by("estudiante_id")
+            .values_list("id_matricula", "estudiante_id", "asignatura_id", "estudiante__nombre", "estudiante__correo"))
+    actual, items = None, {}
+    for id_mat, id_est, id_asig, nombre, correo in mats.iterator(chunk_size=BATCH_SIZE):
+        if actual is not None and actual[0] != id_est:
+            if items:
+                yield (*actual, list(items.values()))
+            items = {}
+        actual = (id_est, nombre, correo)
+        for id_rel, id_act, item in rels_por_asig[id_asig]:
+            if (id_mat, id_rel) not in calificadas:
+                items[(id_mat, id_act)] = item
+    if actual is not None and items:
+        yield (*actual, list(items.values()))
+
+
+def generar(dias=DIAS, hoy=None):
+    """Encola en `correo_salida` el resumen del día de cada estudiante con pendientes; devuelve cuántos."""
+    hoy = hoy or timezone.localdate()
+    asunto = f"Actividades por vencer en los próximos {dias} días"
+    n, lote = 0, []
+    for id_est, nombre, correo, items in _pendientes(hoy, dias):
+        lote.append((f"vencimientos:{hoy.isoformat()}:{id_est}", correo, nombre, items))
+        if len(lote) >= BATCH_SIZE:
+            n += _guardar(lote, asunto, dias)
+            lote = []
+    if lote:
+        n += _guardar(lote, asunto, dias)
+    return n
+
+
+def _guardar(lote, asunto, dias):
+    # ignore_conflicts no informa cuántas filas insertó: se descartan antes las claves existentes
+    # (y ignore_conflicts cubre a una corrida simultánea)
+    existentes = set(Correo.objects.filter(clave__in=[c for c, *_ in lote]).values_list("clave", flat=True))
+    nuevos = [Correo(clave=clave, destinatario=correo, asunto=asunto, cuerpo=_cuerpo(nombre, dias, items))
+              for clave, correo, nombre, items in lote if clave not in existentes]
+    Correo.objects.bulk_create(nuevos, ignore_conflicts=True)
+    return len(nuevos)
+
+
+def _enviar_lote(conexion, filas):
+    """(ids enviados, {id: error}) de un lote, por la conexión ya abierta."""
+    remitente = getattr(settings, "DEFAULT_FROM_EMAIL", None)
+    mensajes = [EmailMessage(f.asunto, f.cuerpo, remitente, [f.destinatario], connection=conexion) for f in filas]
+    try:
+        conexion.send_messages(mensajes)
+        return [f.id for f in filas], {}
+    except Exception:
+        logger.warning("Falló el envío de un lote de %s correos; se reintenta de a uno", len(filas), exc_info=True)
+    enviados, errores = [], {}
+    _reabrir(conexion)
+    for f, m in zip(filas, mensajes):
+        try:
+            conexion.send_messages([m])
+            enviados.append(f.id)
+        except Exception as e:
+            errores[f.id] = repr(e)
+            _reabrir(conexion)
+    return enviados, errores
+
+
+def _reabrir(conexion):
+    # Tras un error la conexión SMTP puede quedar inutilizable; open() propaga si el servidor no responde
+    conexion.close()
+    conexion.open()
+
+
+def enviar_pendientes(lote=LOTE, conexion=None):
+    """Envía la bandeja pendiente por una sola conexión; devuelve (enviados, con error)."""
+    total, con_error, ultimo = 0, 0, 0
+    conexion = conexion or get_connection()
+    with conexion:
+        while True:
+            with transaction.atomic():
+                # Avanza por id: lo que falla en esta corrida espera a la siguiente
+                filas = list(Correo.objects.select_for_update(skip_locked=True)
+                             .filter(estado=Correo.PENDIENTE, id__gt=ultimo).order_by("id")[:lote])
+                if not filas:
+                    break
+                ultimo = filas[-1].id
+                enviados, errores = _enviar_lote(conexion, filas)
+                ahora = timezone.now()
+                Correo.objects.filter(id__in=enviados).update(estado=Correo.ENVIADO, fecha_envio=ahora,
+                                                              intentos=F("intentos") + 1)
+                for f in filas:
+                    if f.id in errores:
+                        f.intentos += 1
+                        f.estado = Correo.FALLIDO if f.intentos >= MAX_INTENTOS else Correo.PENDIENTE
+                        f.ultimo_error = errores[f.id][:2000]
+                if errores:
+                    Correo.objects.bulk_update([f for f in filas if f.id in errores],
+                                               ["intentos", "estado", "ultimo_error"])
+            total += len(enviados)
+            con_error += len(errores)
+    return total, con_error
+
+
+def resumen_vencimientos(dias=DIAS, hoy=None):
+    """Pipeline completo (cron / cola de trabajos): genera los resúmenes del día y vacía la bandeja."""
+    creados = generar(dias, hoy)
+    enviados, con_error = enviar_pendientes()
+    return creados, enviados, con_error
@@ -0,0 +1,46 @@
+"""
+Tareas de la cola de trabajos (services/trabajos.py). Se importa en ApiConfig.ready().
+"""
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.mail import send_mail
+
+from ..models.models import Docente, Estudiante
+from . import resumenes, trabajos
+
+_MODELOS = {"docente": Docente, "estudiante": Estudiante}
+
+
+@trabajos.tarea("enviar_correo")
+def enviar_correo(asunto, mensaje, destinatarios):
+    # Sin fail_silently: un error de SMTP hace que el trabajo se reintente con backoff
+    send_mail(asunto, mensaje, getattr(settings, "DEFAULT_FROM_EMAIL", None), destinatarios)
+
+
+@trabajos.tarea("correo_recuperacion")
+def correo_recuperacion(rol, id, email):
+    """
+    Correo de password_forgot_view. El token se firma aquí y no en la vista: así nunca queda
+    guardado en `trabajo.args`, y su hora de validez corre desde el envío.
+    """
+    modelo = _MODELOS.get(rol)
+    if modelo is None or not modelo.objects.filter(pk=id, correo=email).exists():
+        return  # la cuenta se borró o cambió de correo desde la solicitud
+    token = signing.dumps({"kind": "pwdreset", "rol": rol, "id": id, "ts": datetime.datetime.utcnow().timestamp()})
+    front = getattr(settings, "FRONTEND_URL", "http://localhost:5173")
+    mensaje = (
+        "Hola,\n\n"
+        "Recibimos una solicitud para restablecer tu contraseña.\n"
+        f"Usa el siguiente enlace (válido por 1 hora):\n{front}/reset?token={token}\n\n"
+        "Si no fuiste tú, puedes ignorar este mensaje.\n"
+        "— Universidad del Valle"
+    )
+    send_mail("Recuperación de contraseña", mensaje, getattr(settings, "DEFAULT_FROM_EMAIL", None), [email])
+
+
+@trabajos.tarea("resumen_vencimientos")
+def resumen_vencimientos(dias=None):
+    # Idempotente por día: lo ya generado/enviado no se repite si el trabajo se reintenta
+    resumenes.resumen_vencimientos(dias or resumenes.DIAS)
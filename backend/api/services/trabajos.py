@@ -0,0 +1,162 @@
+"""
+Cola de trabajos en segundo plano sobre la tabla `trabajo` (sin broker aparte).
+
+    @trabajos.tarea("enviar_correo")
+    def enviar_correo(asunto, mensaje, destinatarios): ...
+
+    trabajos.encolar("enviar_correo", asunto=..., mensaje=..., destinatarios=[...])
+
+encolar() sólo inserta una fila: dentro de una transacción el trabajo se ve cuando ésta
+confirma (nunca corre sobre datos que terminaron en rollback). Los argumentos deben ser
+serializables a JSON. `manage.py run_workers --concurrency N` levanta N procesos que
+ejecutan trabajar():
+
+- tomar() reclama pendientes vencidos con SELECT ... FOR UPDATE SKIP LOCKED y los marca
+  `en_curso` en una transacción corta: varios workers no se bloquean ni toman el mismo.
+- La tarea corre fuera de esa transacción. Si falla, vuelve a `pendiente` con backoff
+  exponencial (JOBS_BACKOFF_BASE * 2^(intento-1), tope JOBS_BACKOFF_MAX, +-10% de jitter);
+  al agotar max_intentos queda `fallido` con el traceback en `ultimo_error`.
+- Si un worker muere a mitad de una tarea, rescatar() la devuelve a la cola cuando pasa
+  JOBS_LEASE desde que se tomó. Por eso las tareas deben ser idempotentes y durar menos
+  que JOBS_LEASE.
+
+Las tareas se registran al importar su módulo; api/services/tareas.py se importa en
+ApiConfig.ready(), así que existen en cualquier proceso de Django.
+"""
+import datetime
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models.models import Trabajo
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = getattr(settings, "JOBS_POLL_INTERVAL", 1.0)
+LEASE = getattr(settings, "JOBS_LEASE", 15 * 60)
+BACKOFF_BASE = getattr(settings, "JOBS_BACKOFF_BASE", 10)
+BACKOFF_MAX = getattr(settings, "JOBS_BACKOFF_MAX", 60 * 60)
+KEEP_DONE = getattr(settings, "JOBS_KEEP_DONE", 7 * 24 * 60 * 60)
+
+_TAREAS = {}
+
+
+def tarea(nombre):
+    """Registra la función decorada como la tarea `nombre`."""
+    def decorator(fn):
+        _TAREAS[nombre] = fn
+        return fn
+    return decorator
+
+
+def encolar(nombre, *, ejecutar_en=None, max_intentos=5, **kwargs):
+    if nombre not in _TAREAS:
+        raise ValueError(f"Tarea no registrada: {nombre}")
+    t = Trabajo.objects.create(tarea=nombre, args=kwargs, max_intentos=max_intentos,
+                               ejecutar_en=ejecutar_en or timezone.now())
+    if getattr(settings, "JOBS_EAGER", False):
+        transaction.on_commit(lambda: _ejecutar_ya(t.id))
+    return t
+
+
+def _ejecutar_ya(id_trabajo):
+    """JOBS_EAGER (desarrollo sin workers): corre el trabajo en el proceso que lo encoló."""
+    for t in tomar("eager", ids=[id_trabajo]):
+        ejecutar(t)
+
+
+def tomar(worker, limite=1, ids=None):
+    """Reclama hasta `limite` trabajos vencidos (los bloqueados por otro worker se saltan)."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        qs = Trabajo.objects.select_for_update(skip_locked=True).filter(estado=Trabajo.PENDIENTE)
+        qs = qs.filter(id__in=ids) if ids is not None else qs.filter(ejecutar_en__lte=ahora)
+        tomados = list(qs.order_by("ejecutar_en", "id")[:limite if ids is None else len(ids)])
+        if tomados:
+            Trabajo.objects.filter(id__in=[t.id for t in tomados]).update(
+                estado=Trabajo.EN_CURSO, tomado_en=ahora, tomado_por=worker[:100], intentos=F("intentos") + 1)
+    for t in tomados:
+        t.estado, t.tomado_en, t.tomado_por, t.intentos = Trabajo.EN_CURSO, ahora, worker[:100], t.intentos + 1
+    return tomados
+
+
+def backoff(intento):
+    espera = min(BACKOFF_BASE * 2 ** (intento - 1), BACKOFF_MAX)
+    return espera * random.uniform(0.9, 1.1)
+
+
+def ejecutar(t):
+    """Corre un trabajo ya tomado y registra el resultado; devuelve True si terminó bien."""
+    fn = _TAREAS.get(t.tarea)
+    try:
+        if fn is None:
+            raise LookupError(f"Tarea no registrada: {t.tarea}")
+        fn(**t.args)
+    except Exception:
+        error = traceback.format_exc()
+        reintentar = fn is not None and t.intentos < t.max_intentos
+        logger.warning("Trabajo %s falló (intento %s/%s)", t, t.intentos, t.max_intentos, exc_info=True)
+        cambios = {"estado": Trabajo.PENDIENTE if reintentar else Trabajo.FALLIDO, "ultimo_error": error[-10000:],
+                   "tomado_en": None, "tomado_por": ""}
+        if reintentar:
+            cambios["ejecutar_en"] = timezone.now() + datetime.timedelta(seconds=backoff(t.intentos))
+        else:
+            cambios["fecha_fin"] = timezone.now()
+        _propio(t).update(**cambios)
+        return False
+    _propio(t).update(estado=Trabajo.HECHO, fecha_fin=timezone.now())
+    return True
+
+
+def _propio(t):
+    # Si el lease venció y otro worker lo retomó, el resultado de esta ejecución ya no cuenta
+    return Trabajo.objects.filter(id=t.id, estado=Trabajo.EN_CURSO, tomado_en=t.tomado_en)
+
+
+def rescatar(lease=LEASE):
+    """Devuelve a la cola los trabajos `en_curso` tomados hace más de `lease` segundos (worker caído)."""
+    limite = timezone.now() - datetime.timedelta(seconds=lease)
+    return Trabajo.objects.filter(estado=Trabajo.EN_CURSO, tomado_en__lt=limite).update(
+        estado=Trabajo.PENDIENTE, ejecutar_en=timezone.now(), tomado_en=None, tomado_por="",
+        ultimo_error="Lease vencido: el worker no terminó el trabajo")
+
+
+def purgar(keep=KEEP_DONE):
+    """Borra los trabajos terminados hace más de `keep` segundos (los fallidos se conservan)."""
+    limite = timezone.now() - datetime.timedelta(seconds=keep)
+    return Trabajo.objects.filter(estado=Trabajo.HECHO, fecha_fin__lt=limite).delete()[0]
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def trabajar(parada=None, burst=False, worker=None):
+    """
+    Bucle de un worker: toma y ejecuta trabajos hasta que `parada` (threading/multiprocessing
+    Event; se consulta entre trabajos y cada POLL_INTERVAL) se activa. Con burst=True termina en cuanto no quedan trabajos vencidos.
+    Devuelve cuántos trabajos ejecutó.
+    """
+    worker = worker or worker_id()
+    hechos = 0
+    while parada is None or not parada.is_set():
+        close_old_connections()  # como entre requests: respeta CONN_MAX_AGE y descarta conexiones rotas
+        tomados = tomar(worker)
+        for t in tomados:
+            ejecutar(t)
+            hechos += 1
+        if not tomados:
+            if burst:
+                break
+            # sleep y no parada.wait(): un waiter de multiprocessing.Event que muere (SIGKILL)
+            # deja colgado el set() posterior del padre
+            time.sleep(POLL_INTERVAL)
+    return hechos
@@ -0,0 +1,88 @@
+"""
+Versionado de recursos para GET condicional (ETag / Last-Modified / 304).
+
+Las señales llaman a bump() en cada escritura; las vistas decoradas con conditional()
+calculan ETag y Last-Modified con una sola consulta a `version_recurso` (por PK) y
+Django responde 304 sin ejecutar la vista cuando el cliente ya tiene la versión actual.
+"""
+import hashlib
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from ..models.models import VersionRecurso
+
+TIPOS_DOCUMENTO = "tipos-documento"
+TIPOS_ACTIVIDAD = "tipos-actividad"
+PROGRAMAS = "programas"
+PERIODOS = "periodos"
+
+
+def asignatura_key(id_asignatura, recurso):
+    # Por PK y no por código: renombrar un curso o reutilizar su código no comparte contador
+    return f"asignatura:{id_asignatura}:{recurso}"
+
+
+def programa_key(id_programa, recurso):
+    return f"programa:{id_programa}:{recurso}"
+
+
+def ra_key(id_ra, recurso):
+    return f"ra:{id_ra}:{recurso}"
+
+
+def bump(*claves):
+    now = timezone.now()
+    for clave in claves:
+        if VersionRecurso.objects.filter(clave=clave).update(version=F("version") + 1, actualizado=now):
+            continue
+        try:
+            with transaction.atomic():
+                VersionRecurso.objects.create(clave=clave, version=1, actualizado=now)
+        except IntegrityError:
+            VersionRecurso.objects.filter(clave=clave).update(version=F("version") + 1, actualizado=now)
+
+
+def _state(request, keys_fn, args, kwargs):
+    """(etag, last_modified) memorizado en el request: condition() pide ambos por separado."""
+    state = getattr(request, "_version_state", None)
+    if state is None:
+        claves = sorted(keys_fn(request, *args, **kwargs))
+        rows = dict((c, (v, t)) for c, v, t in VersionRecurso.objects
+                    .filter(clave__in=claves)
+                    .values_list("clave", "version", "actualizado"))
+        firma = "|".join(f"{c}={rows.get(c, (0, None))[0]}" for c in claves)
+        # La query string (p. ej. ?fields=) cambia la representación, así que entra en el ETag
+        firma += "?" + request.META.get("QUERY_STRING", "")
+        etag = hashlib.sha1(firma.encode()).hexdigest()[:20]
+        fechas = [t for _, t in rows.values() if t is not None]
+        state = (etag, max(fechas) if fechas else None)
+        request._version_state = state
+    return state
+
+
+def conditional(keys_fn):
+    """
+    Decorador para vistas GET: keys_fn(request, *args, **kwargs) -> claves de versión de
+    las que depende la respuesta. Sirve para vistas función y, con method_decorator, para
+    acciones de ViewSet.
+    """
+    def decorator(view):
+        wrapped = condition(
+            etag_func=lambda request, *a, **kw: _state(request, keys_fn, a, kw)[0],
+            last_modified_func=lambda request, *a, **kw: _state(request, keys_fn, a, kw)[1],
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = wrapped(request, *args, **kwargs)
+            if response.status_code == 200:
+                # Siempre revalidar: el navegador/proxy guarda la copia pero pregunta con If-None-Match
+                patch_cache_control(response, no_cache=True)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,269 @@
+"""
+Señales del app `api`. Se conectan en ApiConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from ..authentication.authentication import invalidate_user
+from ..models.models import (
+    Docente, Estudiante, Actividad, RaActividad, ResultadoDeAprendizaje, Matricula, NotasActividad, Notificacion,
+    TipoDocumento, TipoActividad, Programa, PeriodoAcademico, Asignatura, IndicadoresDeLogro, RaActividadIndicador,
+    Recurso,
+)
+from ..services import notificaciones, calificaciones, identidad, versiones, estructura, almacen, analitica
+
+
+def _on_commit(fn, *args):
+    transaction.on_commit(lambda: fn(*args))
+
+
+# --- Feed de notificaciones ---
+
+@receiver(post_save, sender=NotasActividad, dispatch_uid="notif_nota_save")
+@receiver(post_delete, sender=NotasActividad, dispatch_uid="notif_nota_delete")
+def _notif_nota(sender, instance, **kwargs):
+    _on_commit(notificaciones.refresh_matriculas, [instance.matricula_id])
+
+
+@receiver(post_save, sender=NotasActividad, dispatch_uid="evento_nota_save")
+def _evento_nota(sender, instance, **kwargs):
+    if instance.nota_ra_actividad is not None:
+        _on_commit(notificaciones.publicar_notas, [instance.matricula_id])
+
+
+@receiver(post_save, sender=Actividad, dispatch_uid="notif_actividad_save")
+def _notif_actividad(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "fecha_cierre" not in update_fields):
+        return  # una actividad nueva aún no está ligada a ningún RA
+    asig_ids = set(RaActividad.objects.filter(actividad=instance).values_list("ra__asignatura_id", flat=True))
+    if asig_ids:
+        _on_commit(notificaciones.refresh_asignaturas, asig_ids)
+
+
+@receiver(post_save, sender=RaActividad, dispatch_uid="notif_ra_actividad_save")
+@receiver(post_delete, sender=RaActividad, dispatch_uid="notif_ra_actividad_delete")
+def _notif_ra_actividad(sender, instance, **kwargs):
+    asig_id = (ResultadoDeAprendizaje.objects
+               .filter(pk=instance.ra_id)
+               .values_list("asignatura_id", flat=True)
+               .first())
+    if asig_id:
+        _on_commit(notificaciones.refresh_asignaturas, [asig_id])
+    else:
+        # Borrado en cascada del RA: ya no hay curso que recalcular, solo limpiar avisos de la actividad
+        Notificacion.objects.filter(clave__startswith="vence:", clave__endswith=f":{instance.actividad_id}").delete()
+
+
+@receiver(post_save, sender=Matricula, dispatch_uid="notif_matricula_save")
+def _notif_matricula(sender, instance, created, **kwargs):
+    if created:
+        _on_commit(notificaciones.refresh_matriculas, [instance.id_matricula])
+
+
+# --- Motor de notas (NotaRa / Matricula.nota_final) ---
+
+@receiver(post_save, sender=NotasActividad, dispatch_uid="grades_nota_save")
+@receiver(post_delete, sender=NotasActividad, dispatch_uid="grades_nota_delete")
+def _grades_nota(sender, instance, **kwargs):
+    id_ra = RaActividad.objects.filter(pk=instance.ra_actividad_id).values_list("ra_id", flat=True).first()
+    if id_ra:
+        _on_commit(calificaciones.recompute_nota, instance.matricula_id, id_ra)
+
+
+@receiver(post_save, sender=ResultadoDeAprendizaje, dispatch_uid="grades_ra_save")
+@receiver(post_delete, sender=ResultadoDeAprendizaje, dispatch_uid="grades_ra_delete")
+def _grades_ra(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "porcentaje_ra" not in update_fields):
+        return  # un RA nuevo no tiene notas todavía
+    _on_commit(calificaciones.recompute_asignaturas, [instance.asignatura_id])
+
+
+@receiver(post_save, sender=RaActividad, dispatch_uid="grades_ra_actividad_save")
+@receiver(post_delete, sender=RaActividad, dispatch_uid="grades_ra_actividad_delete")
+def _grades_ra_actividad(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "porcentaje_ra_actividad" not in update_fields):
+        return  # una relación nueva no tiene notas todavía
+    asig_id = (ResultadoDeAprendizaje.objects
+               .filter(pk=instance.ra_id)
+               .values_list("asignatura_id", flat=True)
+               .first())
+    if asig_id:
+        _on_commit(calificaciones.recompute_asignaturas, [asig_id])
+
+
+# --- Caché de autenticación (perfil / contraseña) ---
+
+@receiver(post_save, sender=Docente, dispatch_uid="auth_docente_save")
+@receiver(post_delete, sender=Docente, dispatch_uid="auth_docente_delete")
+def _auth_docente(sender, instance, **kwargs):
+    invalidate_user("docente", instance.pk)
+
+
+@receiver(post_save, sender=Docente, dispatch_uid="identidad_docente_save")
+def _identidad_docente(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"codigo_docente", "correo"} & set(update_fields):
+        identidad.sync_user("docente", instance)
+
+
+@receiver(post_delete, sender=Docente, dispatch_uid="identidad_docente_delete")
+def _identidad_docente_delete(sender, instance, **kwargs):
+    identidad.delete_user("docente", instance.pk)
+
+
+@receiver(post_save, sender=Estudiante, dispatch_uid="auth_estudiante_save")
+@receiver(post_delete, sender=Estudiante, dispatch_uid="auth_estudiante_delete")
+def _auth_estudiante(sender, instance, **kwargs):
+    invalidate_user("estudiante", instance.pk)
+
+
+@receiver(post_save, sender=Estudiante, dispatch_uid="identidad_estudiante_save")
+def _identidad_estudiante(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"codigo_estudiante", "correo"} & set(update_fields):
+        identidad.sync_user("estudiante", instance)
+
+
+@receiver(post_delete, sender=Estudiante, dispatch_uid="identidad_estudiante_delete")
+def _identidad_estudiante_delete(sender, instance, **kwargs):
+    identidad.delete_user("estudiante", instance.pk)
+
+
+# --- Versiones de recursos (GET condicional) ---
+
+@receiver(post_save, sender=TipoDocumento, dispatch_uid="ver_tipo_documento_save")
+@receiver(post_delete, sender=TipoDocumento, dispatch_uid="ver_tipo_documento_delete")
+def _ver_tipo_documento(sender, instance, **kwargs):
+    versiones.bump(versiones.TIPOS_DOCUMENTO)
+
+
+@receiver(post_save, sender=TipoActividad, dispatch_uid="ver_tipo_actividad_save")
+@receiver(post_delete, sender=TipoActividad, dispatch_uid="ver_tipo_actividad_delete")
+def _ver_tipo_actividad(sender, instance, **kwargs):
+    versiones.bump(versiones.TIPOS_ACTIVIDAD)
+
+
+@receiver(post_save, sender=Programa, dispatch_uid="ver_programa_save")
+@receiver(post_delete, sender=Programa, dispatch_uid="ver_programa_delete")
+def _ver_programa(sender, instance, **kwargs):
+    versiones.bump(versiones.PROGRAMAS)
+
+
+@receiver(post_save, sender=PeriodoAcademico, dispatch_uid="ver_periodo_save")
+@receiver(post_delete, sender=PeriodoAcademico, dispatch_uid="ver_periodo_delete")
+def _ver_periodo(sender, instance, **kwargs):
+    versiones.bump(versiones.PERIODOS)
+
+
+@receiver(post_save, sender=Matricula, dispatch_uid="ver_matricula_save")
+@receiver(post_delete, sender=Matricula, dispatch_uid="ver_matricula_delete")
+def _ver_matricula(sender, instance, created=True, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not {"periodo", "asignatura"} & set(update_fields):
+        return
+    versiones.bump(versiones.asignatura_key(instance.asignatura_id, "periodos"))
+
+
+@receiver(post_save, sender=ResultadoDeAprendizaje, dispatch_uid="ver_ra_save")
+@receiver(post_delete, sender=ResultadoDeAprendizaje, dispatch_uid="ver_ra_delete")
+def _ver_ra(sender, instance, **kwargs):
+    versiones.bump(versiones.asignatura_key(instance.asignatura_id, "ras"))
+
+
+@receiver(post_save, sender=IndicadoresDeLogro, dispatch_uid="ver_indicador_save")
+@receiver(post_delete, sender=IndicadoresDeLogro, dispatch_uid="ver_indicador_delete")
+def _ver_indicador(sender, instance, **kwargs):
+    versiones.bump(versiones.ra_key(instance.ra_id, "indicadores"))
+
+
+
+# --- Analítica de atención de RA (las notas las cubre services/calificaciones.py) ---
+
+def _programa_asignatura(id_asignatura):
+    return Asignatura.objects.filter(pk=id_asignatura).values_list("programa_id", flat=True).first()
+
+
+@receiver(post_save, sender=Asignatura, dispatch_uid="ana_asignatura_save")
+@receiver(post_delete, sender=Asignatura, dispatch_uid="ana_asignatura_delete")
+def _ana_asignatura(sender, instance, **kwargs):
+    analitica.invalidate(instance.programa_id)
+
+
+@receiver(post_save, sender=Matricula, dispatch_uid="ana_matricula_save")
+@receiver(post_delete, sender=Matricula, dispatch_uid="ana_matricula_delete")
+@receiver(post_save, sender=ResultadoDeAprendizaje, dispatch_uid="ana_ra_save")
+@receiver(post_delete, sender=ResultadoDeAprendizaje, dispatch_uid="ana_ra_delete")
+def _ana_curso(sender, instance, **kwargs):
+    analitica.invalidate(_programa_asignatura(instance.asignatura_id))
+
+
+@receiver(post_save, sender=IndicadoresDeLogro, dispatch_uid="ana_indicador_save")
+@receiver(post_delete, sender=IndicadoresDeLogro, dispatch_uid="ana_indicador_delete")
+def _ana_indicador(sender, instance, **kwargs):
+    analitica.invalidate(*ResultadoDeAprendizaje.objects.filter(pk=instance.ra_id)
+                         .values_list("asignatura__programa_id", flat=True))
+
+
+# --- Caché de estructura (services/estructura.py) ---
+
+def _invalidar(fn, *args):
+    # Ahora y otra vez al confirmar: una lectura concurrente pudo recargar la versión previa
+    fn(*args)
+    _on_commit(fn, *args)
+
+
+@receiver(post_save, sender=Asignatura, dispatch_uid="est_asignatura_save")
+@receiver(post_delete, sender=Asignatura, dispatch_uid="est_asignatura_delete")
+def _est_asignatura(sender, instance, **kwargs):
+    _invalidar(estructura.invalidate_asignatura, instance.codigo_asignatura, instance.pk)
+
+
+@receiver(post_save, sender=ResultadoDeAprendizaje, dispatch_uid="est_ra_save")
+@receiver(post_delete, sender=ResultadoDeAprendizaje, dispatch_uid="est_ra_delete")
+def _est_ra(sender, instance, **kwargs):
+    _invalidar(estructura.invalidate_ras, instance.asignatura_id)
+    _invalidar(estructura.invalidate_ra, instance.pk)
+
+
+@receiver(post_save, sender=IndicadoresDeLogro, dispatch_uid="est_indicador_save")
+@receiver(post_delete, sender=IndicadoresDeLogro, dispatch_uid="est_indicador_delete")
+def _est_indicador(sender, instance, **kwargs):
+    id_asignatura = (ResultadoDeAprendizaje.objects.filter(pk=instance.ra_id)
+                     .values_list("asignatura_id", flat=True).first())
+    _invalidar(estructura.invalidate_ra, instance.ra_id, id_asignatura)
+
+
+@receiver(post_save, sender=Actividad, dispatch_uid="est_actividad_save")
+def _est_actividad(sender, instance, created, **kwargs):
+    if created:
+        return  # sin RaActividad todavía; la relación invalida al crearse
+    ra_ids = list(RaActividad.objects.filter(actividad_id=instance.pk).values_list("ra_id", flat=True))
+    if ra_ids:
+        _invalidar(estructura.invalidate_actividades, *ra_ids)
+
+
+@receiver(post_save, sender=RaActividad, dispatch_uid="est_ra_actividad_save")
+@receiver(post_delete, sender=RaActividad, dispatch_uid="est_ra_actividad_delete")
+def _est_ra_actividad(sender, instance, **kwargs):
+    _invalidar(estructura.invalidate_actividades, instance.ra_id)
+
+
+@receiver(post_save, sender=RaActividadIndicador, dispatch_uid="est_ra_act_ind_save")
+@receiver(post_delete, sender=RaActividadIndicador, dispatch_uid="est_ra_act_ind_delete")
+def _est_ra_actividad_indicador(sender, instance, **kwargs):
+    # En un borrado en cascada la RaActividad puede no existir ya: su propia señal invalida
+    ra_id = RaActividad.objects.filter(pk=instance.ra_actividad_id).values_list("ra_id", flat=True).first()
+    if ra_id:
+        _invalidar(estructura.invalidate_actividades, ra_id)
+
+
+@receiver(post_save, sender=TipoActividad, dispatch_uid="est_tipo_actividad_save")
+@receiver(post_delete, sender=TipoActividad, dispatch_uid="est_tipo_actividad_delete")
+def _est_tipo_actividad(sender, instance, **kwargs):
+    _invalidar(estructura.invalidate_tipos_actividad)
+
+
+# --- Almacén de archivos (blobs compartidos entre Recurso) ---
+
+@receiver(post_delete, sender=Recurso, dispatch_uid="almacen_recurso_delete")
+def _almacen_recurso(sender, instance, **kwargs):
+    if instance.blob_id:
+        _on_commit(almacen.liberar, instance.blob_id)
@@ -1,3 +1,1554 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import smtplib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, F
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models.models import (
+    TipoDocumento, TipoActividad, Docente, Estudiante, Programa, PeriodoAcademico, Asignatura,
+    ResultadoDeAprendizaje, IndicadoresDeLogro, Actividad, RaActividad, RaActividadIndicador,
+    Matricula, NotasActividad, NotaRa, Notificacion, Recurso, Blob, SubidaRecurso, Trabajo, Correo,
+)
+from .authentication import authentication
+from .bench import bench
+from .metrics import metrics
+from .services import almacen, analitica, concurrencia, eventos, notificaciones, resumenes, trabajos
+from .serializers.serializers import (
+    AsignaturaSerializer, DocenteSerializer, EstudianteSerializer, ProgramaSerializer, ResultadoDeAprendizajeSerializer,
+    ValuesReadSerializer,
+)
+from .views.views import _indicator_averages
+
+# Tablas que crecen con los datos; un Seq Scan sobre ellas es una regresión de índices
+TABLAS_GRANDES = {
+    "matricula", "notas_actividad", "actividad", "ra_actividad", "ra_actividad_indicador",
+    "recurso", "notificacion", "nota_ra", "estudiante",
+}
+
+
+def _seq_scans(plan):
+    """Relaciones grandes leídas con Seq Scan en un plan EXPLAIN (FORMAT JSON)."""
+    out = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in TABLAS_GRANDES:
+        out.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        out += _seq_scans(child)
+    return out
+
+
+def _indices(plan):
+    out = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        out |= _indices(child)
+    return out
+
+
+def _crear_curso(obj, n_estudiantes=2):
+    """
+    Curso mínimo en `obj` (la clase en setUpTestData o la instancia en setUp): asignatura BD1
+    con RA1 (60%) y RA2 (40%), un indicador por RA, Parcial -> RA1 y Taller -> RA2, y
+    `n_estudiantes` matriculados en un periodo vigente.
+    """
+    hoy = datetime.date.today()
+    obj.td = TipoDocumento.objects.create(descripcion="CC")
+    ta = TipoActividad.objects.create(descripcion="Taller")
+    obj.docente = Docente.objects.create(nombre="D", apellido="D", codigo_docente="D1", contrasenia_docente="x",
+                                         correo="d1@test.co", tipo_documento=obj.td, num_documento="d1")
+    obj.programa = Programa.objects.create(nombre="Sistemas", codigo_programa="P1")
+    obj.periodo = PeriodoAcademico.objects.create(descripcion="vigente", fecha_inicio=hoy - datetime.timedelta(days=30),
+                                                  fecha_finalizacion=hoy + datetime.timedelta(days=60))
+    obj.asignatura = Asignatura.objects.create(nombre="Bases", codigo_asignatura="BD1", docente=obj.docente,
+                                               programa=obj.programa)
+    obj.ras = [ResultadoDeAprendizaje.objects.create(asignatura=obj.asignatura, porcentaje_ra=pct, descripcion=f"RA{i + 1}")
+               for i, pct in enumerate((60, 40))]
+    obj.inds = [IndicadoresDeLogro.objects.create(ra=ra, porcentaje_ind=100, descripcion=f"I{i + 1}")
+                for i, ra in enumerate(obj.ras)]
+    obj.rels = []
+    for nombre, ra in (("Parcial", obj.ras[0]), ("Taller", obj.ras[1])):
+        act = Actividad.objects.create(tipo_actividad=ta, nombre_actividad=nombre, porcentaje_actividad=50,
+                                       fecha_creacion=hoy, fecha_cierre=hoy + datetime.timedelta(days=3))
+        obj.rels.append(RaActividad.objects.create(actividad=act, ra=ra, porcentaje_ra_actividad=100))
+    obj.estudiantes, obj.matriculas = [], []
+    for k in range(n_estudiantes):
+        e = Estudiante.objects.create(nombre=f"E{k}", apellido="E", codigo_estudiante=f"E{k}", contrasena_estudiante="x",
+                                      tipo_documento=obj.td, num_documento=f"e{k}", correo=f"e{k}@test.co")
+        obj.estudiantes.append(e)
+        obj.matriculas.append(Matricula.objects.create(estudiante=e, periodo=obj.periodo, asignatura=obj.asignatura))
+
+
+class GradebookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_consultas_constantes(self):
+        with self.assertNumQueries(7):
+            self.client.get("/api/asignaturas/BD1/gradebook/")
+        # Más estudiantes, actividades y notas no cambian el número de consultas
+        for k in range(2, 6):
+            e = Estudiante.objects.create(nombre=f"E{k}", apellido="E", codigo_estudiante=f"E{k}", contrasena_estudiante="x",
+                                          tipo_documento=self.td, num_documento=f"e{k}", correo=f"e{k}@test.co")
+            mat = Matricula.objects.create(estudiante=e, periodo=self.periodo, asignatura=self.asignatura)
+            for rel in self.rels:
+                NotasActividad.objects.create(matricula=mat, ra_actividad=rel, nota_ra_actividad=Decimal("3"))
+        act = Actividad.objects.create(tipo_actividad=self.rels[0].actividad.tipo_actividad, nombre_actividad="Quiz",
+                                       porcentaje_actividad=10, fecha_creacion=datetime.date.today())
+        RaActividadIndicador.objects.create(
+            ra_actividad=RaActividad.objects.create(actividad=act, ra=self.ras[1], porcentaje_ra_actividad=50),
+            indicador=self.inds[1])
+        cache.clear()
+        with self.assertNumQueries(7):
+            data = self.client.get("/api/asignaturas/BD1/gradebook/").json()
+        self.assertEqual(len(data["estudiantes"]), 6)
+        self.assertEqual(len(data["notas"]), 4)
+
+    def test_forma_de_la_matriz(self):
+        m0, m1 = self.matriculas
+        r1, r2 = self.rels
+        with self.captureOnCommitCallbacks(execute=True):
+            NotasActividad.objects.create(matricula=m0, ra_actividad=r1, nota_ra_actividad=Decimal("4.5"),
+                                          retroalimentacion="Bien", indicador=self.inds[0])
+            NotasActividad.objects.create(matricula=m0, ra_actividad=r2, nota_ra_actividad=None)
+        data = self.client.get("/api/asignaturas/BD1/gradebook/").json()
+
+        self.assertEqual(data["codigo_asignatura"], "BD1")
+        self.assertIsNone(data["id_periodo"])
+        self.assertEqual([(ra["id_ra"], ra["porcentaje_ra"], [a["id_ra_actividad"] for a in ra["actividades"]])
+                          for ra in data["ras"]],
+                         [(self.ras[0].pk, 60.0, [r1.pk]), (self.ras[1].pk, 40.0, [r2.pk])])
+        self.assertEqual([(e["id_matricula"], e["nota_final"]) for e in data["estudiantes"]],
+                         [(m0.pk, 4.5), (m1.pk, None)])
+        # Celda calificada, celda sin nota (null) y matrícula sin filas (ausente)
+        self.assertEqual(data["notas"], {str(m0.pk): {
+            str(r1.pk): {"nota": 4.5, "retroalimentacion": "Bien", "id_ind": self.inds[0].pk},
+            str(r2.pk): {"nota": None, "retroalimentacion": None, "id_ind": None},
+        }})
+        self.assertEqual(data["notas_ra"], {str(m0.pk): {str(self.ras[0].pk): 4.5}})
+
+        periodo = self.client.get(f"/api/asignaturas/BD1/gradebook/?id_periodo={self.periodo.pk}").json()
+        self.assertEqual(periodo["id_periodo"], self.periodo.pk)
+        self.assertEqual(periodo["notas"], data["notas"])
+
+
+class BulkGradeUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+
+    def bulk(self, rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/notas/bulk", rows, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_crea_actualiza_y_reporta_por_fila(self):
+        m0, m1 = self.matriculas
+        r1, r2 = self.rels
+        data = self.bulk([
+            {"id_matricula": m0.pk, "id_ra_actividad": r1.pk, "nota": "4,5"},
+            {"id_matricula": m0.pk, "id_ra_actividad": r1.pk, "nota": 3},
+            {"id_matricula": m1.pk, "id_ra_actividad": r1.pk, "nota": 7},
+            {"id_matricula": m1.pk, "id_ra_actividad": r2.pk, "nota": 4, "id_ind": self.inds[0].pk},
+            {"id_matricula": 999999, "id_ra_actividad": r1.pk, "nota": 4},
+            "no es un objeto",
+        ])
+        self.assertEqual([r["status"] for r in data["resultados"]],
+                         ["duplicate", "created", "error", "error", "error", "error"])
+        self.assertEqual(data["resumen"], {"created": 1, "updated": 0, "duplicate": 1, "error": 4})
+        self.assertEqual(NotasActividad.objects.get(matricula=m0).nota_ra_actividad, Decimal("3.00"))
+
+        data = self.bulk({"notas": [{"id_matricula": m0.pk, "id_ra_actividad": r1.pk, "nota": 2}]})
+        self.assertEqual(data["resultados"][0]["status"], "updated")
+        self.assertEqual(self.client.post("/api/notas/bulk", [], content_type="application/json").status_code, 400)
+
+    def test_lote_mixto_no_borra_campos_omitidos(self):
+        m0, m1 = self.matriculas
+        r1 = self.rels[0]
+        self.bulk([
+            {"id_matricula": m0.pk, "id_ra_actividad": r1.pk, "nota": 4, "retroalimentacion": "ok", "id_ind": self.inds[0].pk},
+            {"id_matricula": m1.pk, "id_ra_actividad": r1.pk, "nota": 3, "retroalimentacion": "revisar"},
+        ])
+        # m0 omite retroalimentacion e id_ind; m1 los trae y se actualizan sólo los suyos
+        self.bulk([
+            {"id_matricula": m0.pk, "id_ra_actividad": r1.pk, "nota": 5},
+            {"id_matricula": m1.pk, "id_ra_actividad": r1.pk, "nota": 2, "retroalimentacion": None,
+             "id_ind": self.inds[0].pk},
+        ])
+        n0 = NotasActividad.objects.get(matricula=m0)
+        n1 = NotasActividad.objects.get(matricula=m1)
+        self.assertEqual((n0.nota_ra_actividad, n0.retroalimentacion, n0.indicador_id),
+                         (Decimal("5.00"), "ok", self.inds[0].pk))
+        self.assertEqual((n1.nota_ra_actividad, n1.retroalimentacion, n1.indicador_id),
+                         (Decimal("2.00"), None, self.inds[0].pk))
+
+
+class ImportGradesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+
+    def importar(self, nombre, contenido):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/asignaturas/BD1/importar-notas/",
+                                    {"file": SimpleUploadedFile(nombre, contenido)})
+
+    def nota(self, matricula, rel):
+        return NotasActividad.objects.get(matricula=matricula, ra_actividad=rel)
+
+    def test_csv_largo_por_bloques_con_errores_por_linea(self):
+        contenido = "\n".join([
+            "codigo_estudiante;actividad;nota;retroalimentacion",
+            "E0;Parcial;4,2;bien",
+            "e1;parcial;3;",
+            "ZZ;Parcial;3;x",
+            "E0;Nope;3;x",
+            "E1;Taller;9;x",
+        ]).encode()
+        with tempfile.NamedTemporaryFile(suffix=".csv") as tf:
+            tf.write(contenido)
+            tf.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command("import_grades", tf.name, "--asignatura", "BD1", "--chunk-size", "1", stdout=out, stderr=err)
+        self.assertIn("5 filas: 2 creadas, 0 actualizadas, 0 duplicadas, 3 con error", out.getvalue())
+        self.assertEqual([line.split(":")[0] for line in err.getvalue().splitlines()],
+                         ["línea 4", "línea 5", "línea 6"])
+        n = self.nota(self.matriculas[0], self.rels[0])
+        self.assertEqual((n.nota_ra_actividad, n.retroalimentacion), (Decimal("4.20"), "bien"))
+        self.assertIsNone(self.nota(self.matriculas[1], self.rels[0]).retroalimentacion)
+
+    def test_xlsx_ancho(self):
+        import openpyxl
+        NotasActividad.objects.create(matricula=self.matriculas[0], ra_actividad=self.rels[0],
+                                      nota_ra_actividad=Decimal("2"), retroalimentacion="previa")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["codigo", "nombre", "Parcial", "Taller", "Otra"])
+        ws.append(["E0", "x", 1.5, None, 3])
+        ws.append(["E1", "y", 2, 3, 3])
+        buf = io.BytesIO()
+        wb.save(buf)
+        response = self.importar("notas.xlsx", buf.getvalue())
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual({k: data[k] for k in ("filas", "created", "updated", "error")},
+                         {"filas": 3, "created": 2, "updated": 1, "error": 0})
+        # Formato ancho sin retroalimentación: la existente se conserva
+        n = self.nota(self.matriculas[0], self.rels[0])
+        self.assertEqual((n.nota_ra_actividad, n.retroalimentacion), (Decimal("1.50"), "previa"))
+        self.assertFalse(NotasActividad.objects.filter(matricula=self.matriculas[0], ra_actividad=self.rels[1]).exists())
+
+    def test_archivo_invalido(self):
+        self.assertEqual(self.client.post("/api/asignaturas/BD1/importar-notas/").status_code, 400)
+        response = self.importar("notas.csv", b"nombre;nota\nx;3\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("codigo_estudiante", response.json()["detail"])
+
+
+class GradeEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=1)
+        # Segunda actividad de RA1 con el cuádruple de peso que el Parcial
+        act = Actividad.objects.create(tipo_actividad=cls.rels[0].actividad.tipo_actividad, nombre_actividad="Final",
+                                       porcentaje_actividad=50, fecha_creacion=datetime.date.today())
+        cls.rels.append(RaActividad.objects.create(actividad=act, ra=cls.ras[0], porcentaje_ra_actividad=100))
+        RaActividad.objects.filter(pk=cls.rels[0].pk).update(porcentaje_ra_actividad=25)
+
+    def calificar(self, rel, nota):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotasActividad.objects.update_or_create(matricula=self.matriculas[0], ra_actividad=rel,
+                                                    defaults={"nota_ra_actividad": Decimal(nota)})
+
+    def estado(self):
+        m = Matricula.objects.get(pk=self.matriculas[0].pk)
+        return m.nota_final, dict(NotaRa.objects.filter(matricula=m).values_list("ra_id", "nota"))
+
+    def test_nota_ra_y_final_ponderadas(self):
+        ra1, ra2 = (ra.pk for ra in self.ras)
+        self.calificar(self.rels[0], "2")
+        self.assertEqual(self.estado(), (Decimal("2.00"), {ra1: Decimal("2.00")}))  # sólo cuentan RAs con nota
+        self.calificar(self.rels[2], "4")
+        self.assertEqual(self.estado(), (Decimal("3.60"), {ra1: Decimal("3.60")}))
+        self.calificar(self.rels[1], "1")
+        self.assertEqual(self.estado(), (Decimal("2.56"), {ra1: Decimal("3.60"), ra2: Decimal("1.00")}))
+
+        # Cambio de pesos: recálculo del curso completo
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ras[1].porcentaje_ra = 90
+            self.ras[1].save(update_fields=["porcentaje_ra"])
+        self.assertEqual(self.estado()[0], Decimal("2.04"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotasActividad.objects.get(ra_actividad=self.rels[1]).delete()
+        self.assertEqual(self.estado(), (Decimal("3.60"), {ra1: Decimal("3.60")}))
+
+        data = self.client.get("/api/asignaturas/BD1/gradebook/").json()
+        self.assertEqual(data["notas_ra"], {str(self.matriculas[0].pk): {str(ra1): 3.6}})
+        self.assertEqual(data["estudiantes"][0]["nota_final"], 3.6)
+
+    def test_recalculo_masivo_coincide_con_el_incremental(self):
+        self.calificar(self.rels[0], "2")
+        self.calificar(self.rels[1], "5")
+        esperado = self.estado()
+        NotaRa.objects.all().delete()
+        Matricula.objects.update(nota_final=None)
+        call_command("recompute_grades", "--asignatura", "BD1", stdout=io.StringIO())
+        self.assertEqual(self.estado(), esperado)
+
+
+class AnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+
+    def setUp(self):
+        cache.clear()  # el rollback reinicia los contadores de versión, no la caché
+
+    def calificar(self, mat, rel, nota, ind=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotasActividad.objects.update_or_create(matricula=mat, ra_actividad=rel,
+                                                    defaults={"nota_ra_actividad": Decimal(nota), "indicador": ind})
+
+    def logro(self, data):
+        return {ra["descripcion"]: (ra["evaluados"], ra["promedio"], ra["tasa_aprobacion"], ra["indicadores"])
+                for ra in data["asignaturas"][0]["ras"]}
+
+    def test_logro_de_ra_sale_de_nota_ra(self):
+        m0, m1 = self.matriculas
+        self.calificar(m0, self.rels[0], "4", self.inds[0])
+        self.calificar(m1, self.rels[0], "2")
+        self.calificar(m0, self.rels[1], "2.5")
+        data = self.client.get(f"/api/programas/{self.programa.pk}/atencion-ra").json()
+        ras = self.logro(data)
+        self.assertEqual(ras["RA1"][:3], (2, 3.0, 0.5))
+        self.assertEqual(ras["RA2"][:3], (1, 2.5, 0.0))
+        self.assertEqual([(i["evaluados"], i["promedio"]) for i in ras["RA1"][3]], [(1, 4.0)])
+        self.assertEqual(data["asignaturas"][0]["matriculados"], 2)
+
+        # La nota de RA es la que guarda el motor de notas, no una ponderación propia
+        NotaRa.objects.filter(matricula=m1, ra=self.ras[0]).update(nota=Decimal("5"))
+        self.assertEqual(self.logro(analitica.compute(self.programa.pk))["RA1"][:3], (2, 4.5, 1.0))
+
+    def test_escribir_notas_invalida_la_cache(self):
+        m0, m1 = self.matriculas
+        self.calificar(m0, self.rels[0], "4")
+        url = f"/api/programas/{self.programa.pk}/atencion-ra"
+        self.assertEqual(self.logro(self.client.get(url).json())["RA1"][:2], (1, 4.0))
+        with self.assertNumQueries(2):  # programa + versión: la respuesta sale de caché
+            self.client.get(url)
+
+        self.calificar(m1, self.rels[0], "2")
+        self.assertEqual(self.logro(self.client.get(url).json())["RA1"][:2], (2, 3.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/notas/bulk", [{"id_matricula": m1.pk, "id_ra_actividad": self.rels[0].pk, "nota": 5}],
+                             content_type="application/json")
+        self.assertEqual(self.logro(self.client.get(url).json())["RA1"][:2], (2, 4.5))
+
+        # Cambios de estructura también: un RA nuevo aparece sin esperar al timeout
+        ResultadoDeAprendizaje.objects.create(asignatura=self.asignatura, porcentaje_ra=0, descripcion="RA3")
+        self.assertIn("RA3", self.logro(self.client.get(url).json()))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=5)
+
+    def test_paginas_por_cursor(self):
+        self.assertEqual(len(self.client.get("/api/estudiantes/").json()), 5)  # sin parámetros: lista completa
+        ids, cursor, paginas = [], None, 0
+        while True:
+            params = {"page_size": 2, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/api/estudiantes/", params)
+            ids += [e["id_estudiante"] for e in response.json()]
+            paginas += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                self.assertFalse(response.has_header("Link"))
+                break
+            self.assertIn(f"cursor={cursor}", response["Link"])
+        self.assertEqual(paginas, 3)
+        self.assertEqual(ids, sorted(e.pk for e in self.estudiantes))
+        self.assertEqual(self.client.get("/api/estudiantes/", {"cursor": "x"}).status_code, 400)
+
+    def test_fields_recorta_salida_y_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/estudiantes/", {"page_size": 1, "fields": "codigo_estudiante,nombre,bogus"})
+        self.assertEqual(response.json(), [{"codigo_estudiante": "E0", "nombre": "E0"}])
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("correo", sql)
+        self.assertIn("LIMIT 2", sql)
+        self.assertEqual(self.client.get("/api/asignaturas/BD1/", {"fields": "nombre"}).json(), {"nombre": "Bases"})
+
+
+class ValuesReadSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+
+    def test_misma_salida_que_el_model_serializer(self):
+        for url, serializer in (("/api/estudiantes/", EstudianteSerializer), ("/api/docentes/", DocenteSerializer),
+                                ("/api/asignaturas/", AsignaturaSerializer), ("/api/programas/", ProgramaSerializer)):
+            with self.subTest(url=url):
+                model = serializer.Meta.model
+                esperado = json.loads(JSONRenderer().render(serializer(model.objects.order_by("pk"), many=True).data))
+                self.assertEqual(self.client.get(url).json(), esperado)
+        # Los campos write_only (contraseñas) no salen ni se leen
+        reader = ValuesReadSerializer.for_serializer(EstudianteSerializer)
+        self.assertNotIn("contrasena_estudiante", reader.lookups)
+        self.assertNotIn("contrasena_estudiante", self.client.get("/api/estudiantes/").json()[0])
+        self.assertNotIn("contrasenia_docente", self.client.get("/api/docentes/").json()[0])
+
+    def test_decimal_sale_como_numero(self):
+        reader = ValuesReadSerializer.for_serializer(ResultadoDeAprendizajeSerializer)
+        filas = reader.to_representation(reader.rows(ResultadoDeAprendizaje.objects.order_by("pk")))
+        esperado = ResultadoDeAprendizajeSerializer(ResultadoDeAprendizaje.objects.order_by("pk"), many=True).data
+        self.assertEqual(esperado[0]["porcentaje_ra"], "60.00")
+        self.assertEqual(filas, [{**e, "porcentaje_ra": float(e["porcentaje_ra"])} for e in esperado])
+
+    def test_lectores_por_conjunto_de_campos(self):
+        ValuesReadSerializer._cache.clear()
+        for fields in ("nombre,correo", "correo,nombre", "correo,nombre,nombre,correo,bogus"):
+            self.assertEqual(self.client.get("/api/estudiantes/", {"fields": fields}).json()[0],
+                             {"nombre": "E0", "correo": "e0@test.co"})
+        self.assertEqual(len(ValuesReadSerializer._cache), 1)
+        with mock.patch.object(ValuesReadSerializer, "CACHE_MAX", 2):
+            for fields in (["nombre"], ["correo"], ["apellido"]):
+                ValuesReadSerializer.for_serializer(EstudianteSerializer, fields)
+            self.assertLessEqual(len(ValuesReadSerializer._cache), 2)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=1)
+
+    def assertRevalida(self, url, escribir, consultas=1):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+        with self.assertNumQueries(consultas):  # version_recurso (y el alcance); la vista no se ejecuta
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        escribir()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        # Otra representación (?fields=) no comparte ETag
+        self.assertEqual(self.client.get(url, {"fields": "descripcion"}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_catalogos(self):
+        self.assertRevalida("/api/tipos-documento/", lambda: TipoDocumento.objects.create(descripcion="TI"))
+        self.assertRevalida("/api/programas/", lambda: Programa.objects.create(nombre="Civil", codigo_programa="P2"))
+        response = self.client.get("/api/programas/")
+        self.assertIsNotNone(response.get("Last-Modified"))
+
+    def test_recursos_de_curso(self):
+        ra = self.ras[0]
+        self.assertRevalida("/api/asignaturas/BD1/ras/", lambda: ra.save(), consultas=2)
+        self.assertRevalida(f"/api/ras/{ra.pk}/indicadores/", lambda: self.inds[0].save())
+        # Cambios en otro RA no invalidan los indicadores de este
+        etag = self.client.get(f"/api/ras/{ra.pk}/indicadores/")["ETag"]
+        self.inds[1].save()
+        self.assertEqual(self.client.get(f"/api/ras/{ra.pk}/indicadores/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_codigo_reutilizado_no_reusa_el_etag(self):
+        etags = {r: self.client.get(f"/api/asignaturas/BD1/{r}/")["ETag"] for r in ("ras", "periodos")}
+        self.asignatura.codigo_asignatura = "BD9"
+        self.asignatura.save()
+        Asignatura.objects.create(nombre="Otra", codigo_asignatura="BD1", docente=self.docente, programa=self.programa)
+        for recurso, etag in etags.items():
+            response = self.client.get(f"/api/asignaturas/BD1/{recurso}/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual((response.status_code, response.json()), (200, []), recurso)
+            # El curso renombrado conserva su contador
+            self.assertEqual(self.client.get(f"/api/asignaturas/BD9/{recurso}/", HTTP_IF_NONE_MATCH=etag).status_code,
+                             304, recurso)
+
+    def test_ras_respeta_el_alcance_del_viewset(self):
+        otro = Docente.objects.create(nombre="O", apellido="O", codigo_docente="D2", contrasenia_docente="x",
+                                      correo="d2@test.co", tipo_documento=self.td, num_documento="d2")
+        url = "/api/asignaturas/BD1/ras/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, {"id_docente": otro.pk}).status_code, 404)
+        self.assertEqual(self.client.get(url, {"id_docente": self.docente.pk}).status_code, 200)
+        # Con token: sólo cursos propios (docente) o matriculados (estudiante), también con ETag válido
+        for rol, pk, esperado in (("docente", otro.pk, 404), ("docente", self.docente.pk, 304),
+                                  ("estudiante", self.estudiantes[0].pk, 304)):
+            auth = {"HTTP_AUTHORIZATION": f"Bearer {signing.dumps({'rol': rol, 'id': pk})}"}
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **auth).status_code, esperado, rol)
+
+
+class StructureCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=1)
+        RaActividadIndicador.objects.create(ra_actividad=cls.rels[0], indicador=cls.inds[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def actividades(self):
+        return self.client.get(f"/api/ras/{self.ras[0].pk}/actividades/").json()
+
+    def test_segunda_lectura_sin_consultas_de_estructura(self):
+        # Consultas restantes: asignatura con alcance, version_recurso (GET condicional) o datos por
+        # matrícula, nunca estructura
+        for url, consultas in ((f"/api/ras/{self.ras[0].pk}/actividades/", 0),
+                               (f"/api/ras/{self.ras[0].pk}/indicadores/", 1),
+                               ("/api/asignaturas/BD1/ras/", 2),
+                               ("/api/asignaturas/BD1/indicadores", 2)):
+            primera = self.client.get(url)
+            with self.assertNumQueries(consultas):
+                segunda = self.client.get(url)
+            self.assertEqual(segunda.json(), primera.json(), url)
+        self.assertEqual(self.client.get("/api/asignaturas/NOPE/ras/").status_code, 404)
+
+    def test_senales_invalidan(self):
+        self.assertEqual(self.actividades()[0]["indicadores"][0]["descripcion"], "I1")
+        self.inds[0].descripcion = "Cambio"
+        self.inds[0].save()
+        self.assertEqual(self.actividades()[0]["indicadores"][0]["descripcion"], "Cambio")
+        self.assertEqual(self.client.get(f"/api/ras/{self.ras[0].pk}/indicadores/").json()[0]["descripcion"], "Cambio")
+
+        act = self.rels[0].actividad
+        act.nombre_actividad = "Parcial 2"
+        act.save()
+        self.assertEqual(self.actividades()[0]["nombre_actividad"], "Parcial 2")
+        act.tipo_actividad.descripcion = "Examen"
+        act.tipo_actividad.save()
+        self.assertEqual(self.actividades()[0]["tipo_actividad"], "Examen")
+
+        self.ras[0].descripcion = "Nuevo RA1"
+        self.ras[0].save()
+        self.assertEqual(self.client.get("/api/asignaturas/BD1/ras/").json()[0]["descripcion"], "Nuevo RA1")
+
+        # Renombrar la asignatura libera el código anterior
+        self.asignatura.codigo_asignatura = "BD2"
+        self.asignatura.save()
+        self.assertEqual(self.client.get("/api/asignaturas/BD1/ras/").status_code, 404)
+        self.assertEqual(self.client.get("/api/asignaturas/BD2/ras/").status_code, 200)
+
+
+class GradeExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls)
+        NotasActividad.objects.create(matricula=cls.matriculas[0], ra_actividad=cls.rels[0],
+                                      nota_ra_actividad=Decimal("4.5"), retroalimentacion="bien")
+        NotasActividad.objects.create(matricula=cls.matriculas[1], ra_actividad=cls.rels[1], nota_ra_actividad=3)
+
+    def get(self, url, rol="docente", pk=None, **params):
+        headers = {"Authorization": f"Bearer {signing.dumps({'rol': rol, 'id': pk or self.docente.pk})}"} if rol else {}
+        return self.client.get(url, params, headers=headers)
+
+    def filas(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        texto = b"".join(response.streaming_content).decode("utf-8-sig")
+        return list(csv.DictReader(io.StringIO(texto)))
+
+    def test_exporta_asignatura_y_programa(self):
+        filas = self.filas(self.get("/api/asignaturas/BD1/export.csv"))
+        self.assertEqual([(f["codigo_estudiante"], f["actividad"], f["nota"], f["retroalimentacion"]) for f in filas],
+                         [("E0", "Parcial", "4.50", "bien"), ("E1", "Taller", "3.00", "")])
+        self.assertEqual(len(self.filas(self.get(f"/api/programas/{self.programa.pk}/export.csv"))), 2)
+        self.assertEqual(self.get("/api/asignaturas/NOPE/export.csv").status_code, 404)
+
+    def test_solo_docentes(self):
+        for url in ("/api/asignaturas/BD1/export.csv", f"/api/programas/{self.programa.pk}/export.csv"):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url, rol=None).status_code, 401)
+                self.assertEqual(self.get(url, rol="docente", pk=999999).status_code, 401)
+                self.assertEqual(self.get(url, rol="estudiante", pk=self.estudiantes[0].pk).status_code, 403)
+
+    def test_periodo_que_no_resuelve_no_exporta_todo(self):
+        url = "/api/asignaturas/BD1/export.csv"
+        self.assertEqual(len(self.filas(self.get(url, periodo="vigente"))), 2)
+        self.assertEqual(self.filas(self.get(url, id_periodo=self.periodo.pk + 1)), [])
+        self.assertEqual(self.get(url, periodo="2020-9").status_code, 404)
+        self.assertEqual(self.get(url, id_periodo="uno").status_code, 400)
+        # Mismo criterio en las demás vistas filtradas por periodo
+        for otra in ("/api/asignaturas/BD1/gradebook/", "/api/asignaturas/BD1/estudiantes/",
+                     "/api/asignaturas/BD1/indicadores", f"/api/programas/{self.programa.pk}/atencion-ra"):
+            with self.subTest(url=otra):
+                self.assertEqual(self.client.get(otra, {"periodo": "2020-9"}).status_code, 404)
+                self.assertEqual(self.client.get(otra, {"periodo": "vigente"}).status_code, 200)
+
+
+class NotificationFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=1)
+
+    def calificar(self, rel, nota):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotasActividad.objects.update_or_create(matricula=self.matriculas[0], ra_actividad=rel,
+                                                    defaults={"nota_ra_actividad": Decimal(nota)})
+
+    def feed(self):
+        return {n.clave.split(":")[0]: n for n in Notificacion.objects.filter(estudiante=self.estudiantes[0])}
+
+    def test_promedio_bajo_se_actualiza_en_su_lugar(self):
+        notificaciones.refresh_matriculas([self.matriculas[0].pk])
+        self.assertEqual(Notificacion.objects.filter(clave__startswith="vence:").count(), 2)
+
+        self.calificar(self.rels[0], "2.0")
+        bajo = self.feed()["bajo"]
+        self.assertIn("promedio 2.00/5", bajo.texto)
+        self.assertEqual(Notificacion.objects.filter(clave__startswith="vence:").count(), 1)  # el Parcial ya tiene nota
+        Notificacion.objects.filter(pk=bajo.pk).update(leida=True)
+
+        # Otra nota cambia el promedio: mismo aviso (id y lectura) con el texto nuevo
+        self.calificar(self.rels[1], "2.5")
+        actual = self.feed()["bajo"]
+        self.assertEqual((actual.pk, actual.leida), (bajo.pk, True))
+        self.assertIn("promedio 2.25/5", actual.texto)
+
+        self.calificar(self.rels[1], "4.5")
+        self.assertEqual(self.feed(), {})
+
+
+class AuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _crear_curso(cls, n_estudiantes=1)
+
+    def setUp(self):
+        cache.clear()
+        authentication._users.clear()
+        authentication._tokens.clear()
+
+    def login(self, **data):
+        return self.client.post("/api/auth/login", data, content_type="application/json")
+
+    def test_login_por_codigo_o_correo(self):
+        response = self.login(codigo="e0", password="x")  # código normalizado en el índice de identidad
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["rol"], "estudiante")
+        # El texto plano heredado se re-hashea al acertar
+        self.assertTrue(Estudiante.objects.get().contrasena_estudiante.startswith("pbkdf2_"))
+        self.assertEqual(self.login(email=" E0@TEST.CO ", password="x").status_code, 200)
+        self.assertEqual(self.login(email="e0@test.co", password="otra").status_code, 401)
+        self.assertEqual(self.login(codigo="D1", password="x", rol="estudiante").status_code, 401)
+        self.assertEqual(self.login(codigo="D1", password="x").json()["user"]["rol"], "docente")
+
+    def test_claves_que_solo_difieren_en_mayusculas(self):
+        # Cuentas heredadas distintas para la búsqueda sensible a mayúsculas de antes
+        otra = Estudiante.objects.create(nombre="Otra", apellido="E", codigo_estudiante="e0", contrasena_estudiante="y",
+                                         tipo_documento=self.td, num_documento="e0b", correo="E0@test.co")
+        self.assertEqual(self.login(codigo="E0", password="x").json()["user"]["id"], self.estudiantes[0].pk)
+        self.assertEqual(self.login(codigo=" e0 ", password="y").json()["user"]["id"], otra.pk)
+        self.assertEqual(self.login(email="E0@test.co", password="y").json()["user"]["id"], otra.pk)
+        # Sin coincidencia exacta no se adivina cuál de las dos es
+        self.assertEqual(self.login(email="E0@TEST.CO", password="y").status_code, 401)
+        self.assertEqual(self.login(email="E0@TEST.CO", password="x").status_code, 401)
+
+    def test_token_resuelto_desde_cache(self):
+        token = self.login(codigo="E0", password="x").json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        self.assertEqual(self.client.get("/api/auth/me", headers=headers).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/auth/me", headers=headers).json()["user"]["nombre"], "E0")
+        # Guardar el perfil invalida ambos niveles de caché
+        e = Estudiante.objects.get()
+        e.nombre = "Eva"
+        e.save(update_fields=["nombre"])
+        self.assertEqual(self.client.get("/api/auth/me", headers=headers).json()["user"]["nombre"], "Eva")
+        self.assertEqual(self.client.get("/api/auth/me", headers={"Authorization": "Bearer x"}).status_code, 401)
+
+    def test_login_no_usa_hash_cacheado(self):
+        self.assertIsNotNone(authentication.get_user("estudiante", self.estudiantes[0].pk))  # LRU con el hash "x"
+        # Cambio hecho por otro worker: la LRU de este proceso no se entera
+        Estudiante.objects.update(contrasena_estudiante=make_password("nueva-clave"))
+        self.assertEqual(self.login(codigo="E0", password="x").status_code, 401)
+        self.assertEqual(self.login(codigo="E0", password="nueva-clave").status_code, 200)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "EXPLAIN de PostgreSQL")
+class ExplainIndexTests(TestCase):
+    """
+    Los planes se piden con enable_seqscan = off: PostgreSQL sólo elige un Seq Scan si
+    ningún índice sirve para la consulta, así el resultado no depende del tamaño del dataset.
+    """
+    N_ASIGNATURAS = 20
+    N_ESTUDIANTES = 600
+    MATRICULAS_POR_ESTUDIANTE = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = datetime.date.today()
+        td = TipoDocumento.objects.create(descripcion="CC")
+        ta = TipoActividad.objects.create(descripcion="Taller")
+        doc = Docente.objects.create(nombre="D", apellido="D", codigo_docente="D1", contrasenia_docente="x",
+                                     correo="d1@test.co", tipo_documento=td, num_documento="d1")
+        prog = Programa.objects.create(nombre="Sistemas", codigo_programa="P1")
+        cls.periodo = PeriodoAcademico.objects.create(descripcion="2025-1", fecha_inicio=datetime.date(2025, 1, 1),
+                                                      fecha_finalizacion=datetime.date(2025, 6, 30))
+        asigs = Asignatura.objects.bulk_create([
+            Asignatura(nombre=f"A{i}", codigo_asignatura=f"A{i}", docente=doc, programa=prog)
+            for i in range(cls.N_ASIGNATURAS)
+        ])
+        ras = ResultadoDeAprendizaje.objects.bulk_create([
+            ResultadoDeAprendizaje(asignatura=a, porcentaje_ra=50, descripcion=f"RA{j}") for a in asigs for j in range(2)
+        ])
+        inds = IndicadoresDeLogro.objects.bulk_create([IndicadoresDeLogro(ra=ra, porcentaje_ind=100) for ra in ras])
+        acts = Actividad.objects.bulk_create([
+            Actividad(tipo_actividad=ta, nombre_actividad=f"Act{k}", porcentaje_actividad=10, fecha_creacion=hoy,
+                      fecha_cierre=(hoy + datetime.timedelta(days=k % 30)) if k % 3 else None)
+            for k in range(len(ras) * 3)
+        ])
+        rels = RaActividad.objects.bulk_create([
+            RaActividad(actividad=acts[i * 3 + j], ra=ra, porcentaje_ra_actividad=Decimal("33.33"))
+            for i, ra in enumerate(ras) for j in range(3)
+        ])
+        ind_por_ra = {ind.ra_id: ind for ind in inds}
+        RaActividadIndicador.objects.bulk_create([
+            RaActividadIndicador(ra_actividad=rel, indicador=ind_por_ra[rel.ra_id]) for rel in rels
+        ])
+        ests = Estudiante.objects.bulk_create([
+            Estudiante(nombre=f"E{k}", apellido="E", codigo_estudiante=f"E{k}", contrasena_estudiante="x",
+                       tipo_documento=td, num_documento=f"e{k}", correo=f"e{k}@test.co")
+            for k in range(cls.N_ESTUDIANTES)
+        ])
+        mats = Matricula.objects.bulk_create([
+            Matricula(estudiante=e, periodo=cls.periodo, asignatura=asigs[(k + m) % len(asigs)])
+            for k, e in enumerate(ests) for m in range(cls.MATRICULAS_POR_ESTUDIANTE)
+        ])
+        rels_por_asig = {}
+        for rel in rels:
+            rels_por_asig.setdefault(rel.ra.asignatura_id, []).append(rel)
+        NotasActividad.objects.bulk_create([
+            NotasActividad(matricula=mat, ra_actividad=rel, nota_ra_actividad=Decimal("3.5"),
+                           indicador=ind_por_ra[rel.ra_id] if n % 2 else None)
+            for mat in mats for n, rel in enumerate(rels_por_asig[mat.asignatura_id])
+        ], batch_size=5000)
+        Recurso.objects.bulk_create([
+            Recurso(asignatura=a, titulo=f"R{r}", archivo=f"recursos/r{r}.pdf") for a in asigs for r in range(20)
+        ])
+        with connection.cursor() as cur:
+            cur.execute("ANALYZE")
+
+        cls.asignatura = asigs[0]
+        cls.ra = ras[0]
+        cls.matricula = mats[0]
+        cls.estudiante = ests[0]
+
+    def setUp(self):
+        cache.clear()  # la caché de estructura ocultaría las consultas
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+    def explain_qs(self, qs):
+        sql, params = qs.query.sql_with_params()
+        return self.explain(sql, params)
+
+    def assertNoSeqScan(self, fn):
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(_seq_scans(self.explain(sql)), [], sql)
+
+    # --- Rutas de acceso con índice propio ---
+
+    def test_indices_creados(self):
+        with connection.cursor() as cur:
+            cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+            nombres = {r[0] for r in cur.fetchall()}
+        esperados = {"ix_matricula_asig_est", "ix_notas_mat_ind", "ix_actividad_cierre", "ix_recurso_asig_fecha"}
+        self.assertEqual(esperados - nombres, set())
+
+    def test_ultima_matricula_usa_indice_compuesto(self):
+        plan = self.explain_qs(Matricula.objects
+                               .filter(asignatura=self.asignatura, estudiante=self.estudiante)
+                               .order_by("-id_matricula")[:1])
+        self.assertEqual(_seq_scans(plan), [])
+        self.assertIn("ix_matricula_asig_est", _indices(plan))
+
+    def test_notas_por_matricula_e_indicador(self):
+        # Con pocas notas por matrícula el planificador puede preferir el índice de la FK; ambos valen
+        qs = (NotasActividad.objects.filter(matricula=self.matricula, indicador__isnull=False)
+              .values_list("matricula_id", "indicador_id", "nota_ra_actividad"))
+        self.assertEqual(_seq_scans(self.explain_qs(qs)), [])
+
+    def test_rango_de_cierre_usa_indice(self):
+        hoy = datetime.date.today()
+        plan = self.explain_qs(Actividad.objects.filter(fecha_cierre__range=(hoy, hoy + datetime.timedelta(days=7))))
+        self.assertEqual(_seq_scans(plan), [])
+        self.assertIn("ix_actividad_cierre", _indices(plan))
+
+    def test_recursos_de_asignatura(self):
+        plan = self.explain_qs(Recurso.objects.filter(asignatura=self.asignatura).order_by("-fecha_subida"))
+        self.assertEqual(_seq_scans(plan), [])
+
+    # --- Consultas reales de las vistas ---
+
+    def test_vistas_de_asignatura(self):
+        codigo = self.asignatura.codigo_asignatura
+        for url in (
+            f"/api/asignaturas/{codigo}/gradebook/",
+            f"/api/asignaturas/{codigo}/estudiantes/",
+            f"/api/asignaturas/{codigo}/periodos/",
+            f"/api/asignaturas/{codigo}/recursos/",
+            f"/api/asignaturas/{codigo}/indicadores",
+            f"/api/asignaturas/{codigo}/estudiante/{self.estudiante.pk}/indicadores",
+            f"/api/ras/{self.ra.pk}/actividades/?id_matricula={self.matricula.pk}",
+        ):
+            with self.subTest(url=url):
+                self.assertNoSeqScan(lambda: self.assertEqual(self.client.get(url).status_code, 200))
+
+    def test_feed_de_notificaciones(self):
+        self.assertNoSeqScan(lambda: notificaciones.refresh_matriculas([self.matricula.pk]))
+        token = signing.dumps({"rol": "estudiante", "id": self.estudiante.pk})
+        self.assertNoSeqScan(lambda: self.assertEqual(
+            self.client.get("/api/notificaciones", HTTP_AUTHORIZATION=f"Bearer {token}").status_code, 200))
+
+    def test_promedios_de_curso(self):
+        self.assertNoSeqScan(lambda: list(_indicator_averages(
+            NotasActividad.objects.filter(matricula__asignatura=self.asignatura)).items()))
+
+
+class AsyncViewTests(TransactionTestCase):
+    """
+    Vistas async bajo el handler ASGI de Django (AsyncClient). TransactionTestCase: el
+    fan-out de concurrencia.gather usa otras conexiones, que no verían la transacción de
+    un TestCase.
+    """
+    def setUp(self):
+        cache.clear()
+        hoy = datetime.date.today()
+        td = TipoDocumento.objects.create(descripcion="CC")
+        ta = TipoActividad.objects.create(descripcion="Taller")
+        self.docente = Docente.objects.create(nombre="D", apellido="D", codigo_docente="D1", contrasenia_docente="x",
+                                              correo="d1@test.co", tipo_documento=td, num_documento="d1")
+        prog = Programa.objects.create(nombre="Sistemas", codigo_programa="P1")
+        periodo = PeriodoAcademico.objects.create(descripcion="2025-1", fecha_inicio=datetime.date(2025, 1, 1),
+                                                  fecha_finalizacion=datetime.date(2025, 6, 30))
+        self.asignatura = Asignatura.objects.create(nombre="Bases", codigo_asignatura="BD1", docente=self.docente,
+                                                    programa=prog)
+        ra = ResultadoDeAprendizaje.objects.create(asignatura=self.asignatura, porcentaje_ra=100, descripcion="RA1")
+        self.inds = [IndicadoresDeLogro.objects.create(ra=ra, porcentaje_ind=50, descripcion=f"I{i}") for i in range(2)]
+        act = Actividad.objects.create(tipo_actividad=ta, nombre_actividad="Parcial", porcentaje_actividad=100,
+                                       fecha_creacion=hoy, fecha_cierre=hoy + datetime.timedelta(days=3))
+        rel = RaActividad.objects.create(actividad=act, ra=ra, porcentaje_ra_actividad=100)
+        self.estudiantes, self.matriculas = [], []
+        for k, nota in enumerate(("4.0", "2.0")):
+            e = Estudiante.objects.create(nombre=f"E{k}", apellido="E", codigo_estudiante=f"E{k}", contrasena_estudiante="x",
+                                          tipo_documento=td, num_documento=f"e{k}", correo=f"e{k}@test.co")
+            m = Matricula.objects.create(estudiante=e, periodo=periodo, asignatura=self.asignatura)
+            NotasActividad.objects.create(matricula=m, ra_actividad=rel, indicador=self.inds[0],
+                                          nota_ra_actividad=Decimal(nota))
+            self.estudiantes.append(e)
+            self.matriculas.append(m)
+
+    def _auth(self, rol, pk):
+        return {"Authorization": f"Bearer {signing.dumps({'rol': rol, 'id': pk})}"}
+
+    async def test_middleware_no_adapta_las_vistas_async(self):
+        # Un middleware sólo síncrono obligaría a Django a correr la vista async dentro de un hilo
+        client = AsyncClient()
+        with self.settings(DEBUG=True), self.assertNoLogs("django.request", level="DEBUG"):
+            response = await client.get(f"/api/asignaturas/{self.asignatura.codigo_asignatura}/indicadores")
+        self.assertEqual(response.status_code, 200)
+
+    async def test_reporte_de_curso(self):
+        codigo = self.asignatura.codigo_asignatura
+        response = await self.async_client.get(f"/api/asignaturas/{codigo}/indicadores")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([i["id_ind"] for i in data["indicadores"]], [i.pk for i in self.inds])
+        por_est = {e["id_estudiante"]: e["indicadores"] for e in data["estudiantes"]}
+        self.assertEqual(por_est[self.estudiantes[0].pk][str(self.inds[0].pk)], {"avg_nota": 4.0, "avg_pct": 80.0})
+        self.assertEqual(por_est[self.estudiantes[1].pk][str(self.inds[1].pk)], {"avg_nota": None, "avg_pct": None})
+
+        response = await self.async_client.get(f"/api/asignaturas/{codigo}/estudiante/{self.estudiantes[1].pk}/indicadores")
+        self.assertEqual([r["avg_nota"] for r in response.json()], [2.0, None])
+        response = await self.async_client.get("/api/asignaturas/NOEXISTE/indicadores")
+        self.assertEqual(response.status_code, 404)
+
+    def test_promedios_coinciden_con_la_agregacion_por_indicador(self):
+        # Más notas por indicador, una sin indicador y una matrícula en otro periodo
+        ra = self.inds[0].ra
+        ta = TipoActividad.objects.first()
+        rels = [RaActividad.objects.create(
+            actividad=Actividad.objects.create(tipo_actividad=ta, nombre_actividad=f"Q{k}", porcentaje_actividad=10,
+                                               fecha_creacion=datetime.date.today()),
+            ra=ra, porcentaje_ra_actividad=10) for k in range(3)]
+        m0, m1 = self.matriculas
+        for mat, rel, ind, nota in ((m0, rels[0], self.inds[0], "3.5"), (m0, rels[1], self.inds[1], "1.25"),
+                                    (m0, rels[2], self.inds[1], "4.1"), (m1, rels[0], None, "5"),
+                                    (m1, rels[1], self.inds[1], None)):
+            NotasActividad.objects.create(matricula=mat, ra_actividad=rel, indicador=ind,
+                                          nota_ra_actividad=Decimal(nota) if nota else None)
+        otro = PeriodoAcademico.objects.create(descripcion="2025-2", fecha_inicio=datetime.date(2025, 7, 1),
+                                               fecha_finalizacion=datetime.date(2025, 12, 15))
+        m2 = Matricula.objects.create(estudiante=self.estudiantes[1], periodo=otro, asignatura=self.asignatura)
+        NotasActividad.objects.create(matricula=m2, ra_actividad=rels[0], indicador=self.inds[0],
+                                      nota_ra_actividad=Decimal("1"))
+
+        def esperado(mat):
+            # Lo que calculaba la vista original: un Avg por indicador
+            out = {}
+            for ind in self.inds:
+                v = NotasActividad.objects.filter(matricula=mat, indicador=ind).aggregate(v=Avg("nota_ra_actividad"))["v"]
+                out[str(ind.pk)] = {"avg_nota": float(v) if v is not None else None,
+                                    "avg_pct": float(v * 20) if v is not None else None}
+            return out
+
+        codigo = self.asignatura.codigo_asignatura
+        data = self.client.get(f"/api/asignaturas/{codigo}/indicadores?id_periodo={m0.periodo_id}").json()
+        self.assertEqual({e["id_matricula"]: e["indicadores"] for e in data["estudiantes"]},
+                         {m.pk: esperado(m) for m in (m0, m1)})
+        data = self.client.get(f"/api/asignaturas/{codigo}/indicadores").json()
+        self.assertEqual({e["id_matricula"]: e["indicadores"] for e in data["estudiantes"]},
+                         {m.pk: esperado(m) for m in (m0, m1, m2)})
+
+        # Vista por estudiante: la matrícula más reciente, con los mismos promedios
+        for est, mat in ((self.estudiantes[0], m0), (self.estudiantes[1], m2)):
+            filas = self.client.get(f"/api/asignaturas/{codigo}/estudiante/{est.pk}/indicadores").json()
+            self.assertEqual({str(f["id_ind"]): {"avg_nota": f["avg_nota"], "avg_pct": f["avg_pct"]} for f in filas},
+                             esperado(mat))
+
+    async def test_perfil_y_notificaciones(self):
+        est = self.estudiantes[0]
+        self.assertEqual((await self.async_client.get("/api/auth/profile")).status_code, 401)
+
+        response = await self.async_client.get("/api/auth/profile", headers=self._auth("estudiante", est.pk))
+        self.assertEqual(response.json()["cursos"][0]["codigo"], self.asignatura.codigo_asignatura)
+        response = await self.async_client.patch("/api/auth/profile", {"jornada": "Nocturna"},
+                                                 content_type="application/json", headers=self._auth("estudiante", est.pk))
+        self.assertEqual(response.json()["details"]["jornada"], "Nocturna")
+        self.assertEqual((await Estudiante.objects.aget(pk=est.pk)).jornada, "Nocturna")
+
+        response = await self.async_client.get("/api/notificaciones", headers=self._auth("estudiante", self.estudiantes[1].pk))
+        self.assertEqual([n["kind"] for n in response.json()], ["danger"])  # promedio 2.0
+        response = await self.async_client.get("/api/notificaciones", headers=self._auth("docente", self.docente.pk))
+        self.assertEqual(response.json(), [])
+
+    async def test_dashboards_concurrentes(self):
+        codigo = self.asignatura.codigo_asignatura
+        urls = [f"/api/asignaturas/{codigo}/indicadores", "/api/notificaciones", "/api/auth/profile"] * 10
+        responses = await asyncio.gather(*(
+            AsyncClient().get(url, headers=self._auth("estudiante", self.estudiantes[0].pk)) for url in urls))
+        self.assertEqual({r.status_code for r in responses}, {200})
+
+    async def test_consultas_del_fan_out_en_metricas(self):
+        key = ("db_queries_per_request", (("route", "/api/asignaturas/<codigo_asignatura>/indicadores"), ("method", "GET")))
+        antes = metrics.registry.histograms.get(key, [0, 0])[-2]
+        await self.async_client.get(f"/api/asignaturas/{self.asignatura.codigo_asignatura}/indicadores")
+        # asignatura, indicadores, promedios y matrículas: todas desde hilos de sync_to_async
+        self.assertGreaterEqual(metrics.registry.histograms[key][-2] - antes, 4)
+
+    def test_bench_cuenta_las_consultas_del_fan_out(self):
+        # CaptureQueriesContext no ve los hilos de gather: las rutas async medían q=0
+        for plantilla, minimo in (("api/asignaturas/<codigo_asignatura>/indicadores", 2), ("api/auth/profile", 1)):
+            with self.subTest(plantilla=plantilla):
+                m = bench.run(repeat=2, warmup=1, filtro=plantilla)[plantilla]
+                self.assertEqual(m["status"], 200)
+                self.assertGreaterEqual(m["queries"], minimo)
+
+    def test_bench_con_host_permitido_y_cache_propia(self):
+        cache.set("compartida", 1)
+        with self.settings(ALLOWED_HOSTS=[".ra.example.edu"]):
+            m = bench.run(repeat=1, warmup=1, filtro="api/auth/profile")["api/auth/profile"]
+        self.assertEqual(m["status"], 200)
+        self.assertEqual(cache.get("compartida"), 1)  # la pasada en frío no vacía la caché del despliegue
+
+        # Las rutas con error no se registran como mediciones
+        ctx = {**bench.contexto(), "token": "invalido", "token_docente": None}
+        with self.assertRaisesMessage(bench.BenchError, "api/auth/profile (401)"):
+            bench.run(repeat=1, warmup=1, filtro="api/auth/profile", ctx=ctx)
+
+    async def test_stream_de_notificaciones(self):
+        est, mat = self.estudiantes[0], self.matriculas[0]
+        response = await self.async_client.get("/api/notificaciones/stream", headers=self._auth("estudiante", est.pk))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+
+        async def siguiente():
+            return (await asyncio.wait_for(anext(stream), 5)).decode()
+
+        self.assertTrue((await siguiente()).startswith("retry:"))
+        self.assertEqual(eventos.suscritos(), {est.pk})
+
+        # Bajar el promedio a 1.0: aviso "danger" nuevo y evento de nota
+        nota = await NotasActividad.objects.aget(matricula=mat)
+        nota.nota_ra_actividad = Decimal("1.0")
+        await nota.asave()
+        aviso = await Notificacion.objects.aget(estudiante=est, kind="danger")
+        cabecera, data = (await siguiente()).rsplit("\ndata: ", 1)
+        self.assertEqual(cabecera, f"id: {aviso.pk}\nevent: notificacion")
+        self.assertEqual({k: v for k, v in json.loads(data).items() if k != "date"},
+                         {"id": aviso.pk, "kind": "danger", "text": aviso.texto, "read": False})
+        self.assertTrue((await siguiente()).startswith("event: nota\n"))
+
+        async def desconectar():
+            # Como el handler ASGI ante http.disconnect: cancela la tarea que espera el siguiente evento
+            espera = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0.05)
+            espera.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await espera
+
+        await desconectar()
+        self.assertEqual(eventos.suscritos(), set())
+
+        # Al reconectar con Last-Event-ID se reenvía lo que faltó; ?token= sólo acepta el token de stream
+        response = await self.async_client.post("/api/notificaciones/stream/token", headers=self._auth("estudiante", est.pk))
+        token = response.json()["token"]
+        response = await self.async_client.get(
+            "/api/notificaciones/stream", {"token": token}, headers={"Last-Event-ID": str(aviso.pk - 1)})
+        stream = aiter(response.streaming_content)
+        await siguiente()
+        self.assertTrue((await siguiente()).startswith(f"id: {aviso.pk}\n"))
+        await desconectar()
+
+    async def test_stream_requiere_estudiante(self):
+        self.assertEqual((await self.async_client.get("/api/notificaciones/stream")).status_code, 401)
+        response = await self.async_client.get("/api/notificaciones/stream", headers=self._auth("docente", self.docente.pk))
+        self.assertEqual(response.status_code, 403)
+        # El token de sesión no vale en la query (queda en logs de acceso)
+        sesion = self._auth("estudiante", self.estudiantes[0].pk)["Authorization"].split()[1]
+        response = await self.async_client.get("/api/notificaciones/stream", {"token": sesion})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((await self.async_client.post("/api/notificaciones/stream/token")).status_code, 401)
+
+    def test_stream_bajo_wsgi(self):
+        # El Client de pruebas pasa por el handler WSGI: el generador async nunca se enviaría
+        response = self.client.get("/api/notificaciones/stream", headers=self._auth("estudiante", self.estudiantes[0].pk))
+        self.assertEqual(response.status_code, 501)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "pg_sleep de PostgreSQL")
+    async def test_gather_solapa_las_consultas(self):
+        def dormir(valor):
+            with connection.cursor() as cur:
+                cur.execute("SELECT pg_sleep(0.3), %s", [valor])
+                return cur.fetchone()[1]
+
+        t0 = time.perf_counter()
+        resultados = await concurrencia.gather(*(lambda v=v: dormir(v) for v in range(4)))
+        self.assertEqual(resultados, [0, 1, 2, 3])
+        self.assertLess(time.perf_counter() - t0, 0.9)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        with metrics.registry.lock:
+            metrics.registry.counters.clear()
+            metrics.registry.histograms.clear()
+
+    def scrape(self, token="secreto"):
+        with self.settings(METRICS_TOKEN="secreto"):
+            return self.client.get("/api/metrics", headers={"Authorization": f"Bearer {token}"} if token else {})
+
+    def test_exposicion_prometheus(self):
+        self.client.get("/api/tipos-documento/")
+        self.client.get("/api/tipos-documento/")
+        self.client.get("/api/asignaturas/NOPE/ras/")
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        lines = response.content.decode().splitlines()
+        self.assertIn("# TYPE http_requests_total counter", lines)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", lines)
+        # La etiqueta es el patrón de la ruta, no la URL concreta
+        self.assertIn('http_requests_total{route="/api/tipos-documento/",method="GET",status="200"} 2', lines)
+        self.assertIn('http_requests_total{route="/api/asignaturas/<codigo_asignatura>/ras/",method="GET",status="404"} 1',
+                      lines)
+        prefijo = 'http_request_duration_seconds_bucket{route="/api/tipos-documento/",method="GET",le='
+        buckets = [int(l.rsplit(" ", 1)[1]) for l in lines if l.startswith(prefijo)]
+        self.assertEqual(len(buckets), len(metrics.LATENCY_BUCKETS) + 1)
+        self.assertEqual(buckets, sorted(buckets))  # acumulados
+        self.assertEqual(buckets[-1], 2)
+        self.assertIn('http_request_duration_seconds_count{route="/api/tipos-documento/",method="GET"} 2', lines)
+
+    def test_requiere_token(self):
+        self.assertEqual(self.client.get("/api/metrics").status_code, 403)
+        self.assertEqual(self.scrape(token=None).status_code, 401)
+        self.assertEqual(self.scrape(token="otro").status_code, 401)
+
+    def test_descarta_archivos_de_procesos_terminados(self):
+        terminado = subprocess.Popen([sys.executable, "-c", "pass"])
+        terminado.wait()
+        etiquetas = [["route", "/x"], ["method", "GET"], ["status", "200"]]
+        with tempfile.TemporaryDirectory() as d, mock.patch.object(metrics, "METRICS_DIR", d):
+            # pid 1 sigue vivo; el padre "reutiliza" un pid de otro arranque; el hijo ya terminó
+            for pid, inicio in ((1, metrics._inicio(1)), (os.getppid(), -1), (terminado.pid, None)):
+                with open(os.path.join(d, f"metrics-{pid}.json"), "w", encoding="utf-8") as fh:
+                    json.dump({"counters": [["http_requests_total", etiquetas, 5]], "histograms": [], "inicio": inicio}, fh)
+            counters, _ = metrics._collect()
+            self.assertEqual(counters[("http_requests_total", tuple(map(tuple, etiquetas)))], 5)
+            self.assertEqual(os.listdir(d), ["metrics-1.json"])
+
+            metrics.flush()
+            with open(os.path.join(d, f"metrics-{os.getpid()}.json"), encoding="utf-8") as fh:
+                self.assertEqual(json.load(fh)["inicio"], metrics._inicio(os.getpid()))
+            metrics.mark_process_dead(os.getpid())
+            self.assertEqual(os.listdir(d), ["metrics-1.json"])
+
+
+class ChunkedUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        td = TipoDocumento.objects.create(descripcion="CC")
+        doc = Docente.objects.create(nombre="D", apellido="D", codigo_docente="D1", contrasenia_docente="x",
+                                     correo="d1@test.co", tipo_documento=td, num_documento="d1")
+        prog = Programa.objects.create(nombre="Sistemas", codigo_programa="P1")
+        cls.asigs = [Asignatura.objects.create(nombre=f"A{i}", codigo_asignatura=f"A{i}", docente=doc, programa=prog)
+                     for i in range(2)]
+
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=self.media, UPLOAD_TMP_DIR=os.path.join(self.media, "subidas"))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.contenido = os.urandom(250_000)
+
+    def iniciar(self, codigo="A0", **extra):
+        response = self.client.post(f"/api/asignaturas/{codigo}/recursos/subidas/",
+                                    {"titulo": "Syllabus", "nombre": "syllabus.pdf", "tamano": len(self.contenido), **extra},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["id"]
+
+    def parte(self, id_subida, offset, data):
+        return self.client.patch(f"/api/recursos/subidas/{id_subida}", data, content_type="application/offset+octet-stream",
+                                 headers={"Upload-Offset": str(offset)})
+
+    def subir(self, partes=3, **extra):
+        id_subida = self.iniciar(**extra)
+        paso = -(-len(self.contenido) // partes)
+        for offset in range(0, len(self.contenido), paso):
+            self.assertEqual(self.parte(id_subida, offset, self.contenido[offset:offset + paso]).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            return id_subida, self.client.post(f"/api/recursos/subidas/{id_subida}/finalizar")
+
+    def test_subida_por_partes(self):
+        id_subida = self.iniciar()
+        self.assertEqual(self.parte(id_subida, 0, self.contenido[:100_000]).json(), {"offset": 100_000})
+        # Reintento con un offset viejo: 409 con el offset confirmado para reanudar
+        response = self.parte(id_subida, 0, self.contenido[:100_000])
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (409, "100000"))
+        self.assertEqual(self.client.get(f"/api/recursos/subidas/{id_subida}").json()["offset"], 100_000)
+        self.assertEqual(self.client.post(f"/api/recursos/subidas/{id_subida}/finalizar").status_code, 409)
+
+        almacen._hashes.clear()  # la parte siguiente llega a otro worker: se rehashea el prefijo
+        self.assertEqual(self.parte(id_subida, 100_000, self.contenido[100_000:]).json(), {"offset": len(self.contenido)})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/recursos/subidas/{id_subida}/finalizar")
+        self.assertEqual(response.status_code, 201)
+
+        rec = Recurso.objects.select_related("blob").get(pk=response.json()["id_recurso"])
+        self.assertEqual(rec.blob.sha256, hashlib.sha256(self.contenido).hexdigest())
+        self.assertEqual(rec.archivo.name, rec.blob.archivo.name)
+        with rec.archivo.open("rb") as fh:
+            self.assertEqual(fh.read(), self.contenido)
+        self.assertFalse(SubidaRecurso.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, "subidas")), [])
+
+    def test_contenido_repetido_se_guarda_una_vez(self):
+        self.subir()
+        response = self.client.post("/api/asignaturas/A1/recursos/", {
+            "titulo": "Syllabus", "file": SimpleUploadedFile("otro-nombre.pdf", self.contenido)})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Recurso.objects.count(), 2)
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(len(os.listdir(os.path.dirname(Blob.objects.get().archivo.path))), 1)
+
+    def test_sha256_declarado(self):
+        _, response = self.subir(sha256="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Recurso.objects.exists())
+        _, response = self.subir(sha256=hashlib.sha256(self.contenido).hexdigest())
+        self.assertEqual(response.status_code, 201)
+
+    def test_blob_se_libera_con_el_ultimo_recurso(self):
+        self.subir()
+        self.subir()
+        blob = Blob.objects.get()
+        path = blob.archivo.path
+        with self.captureOnCommitCallbacks(execute=True):
+            Recurso.objects.first().delete()
+        self.assertTrue(Blob.objects.exists() and os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            Recurso.objects.get().delete()
+        self.assertFalse(Blob.objects.exists() or os.path.exists(path))
+
+    def test_blob_recreado_mientras_se_libera(self):
+        self.subir()
+        viejo = Blob.objects.get().archivo.path
+        with self.captureOnCommitCallbacks() as liberar:
+            Recurso.objects.get().delete()
+        # liberar() borra la fila pero el archivo sólo al confirmar; entretanto llega el mismo contenido
+        with self.captureOnCommitCallbacks() as borrar_archivo:
+            for fn in liberar:
+                fn()
+        self.assertFalse(Blob.objects.exists())
+        _, response = self.subir()
+        self.assertEqual(response.status_code, 201)
+        for fn in borrar_archivo:
+            fn()
+        self.assertFalse(os.path.exists(viejo))
+        rec = Recurso.objects.select_related("blob").get()
+        with rec.blob.archivo.open("rb") as fh:
+            self.assertEqual(fh.read(), self.contenido)
+        self.assertEqual(rec.archivo.name, rec.blob.archivo.name)
+
+    def test_limites(self):
+        id_subida = self.iniciar()
+        self.assertEqual(self.parte(id_subida, 0, self.contenido + b"x").status_code, 400)
+        self.assertEqual(self.parte(id_subida, "x", b"a").status_code, 400)
+        response = self.client.post("/api/asignaturas/A0/recursos/subidas/", {"tamano": 0}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.delete(f"/api/recursos/subidas/{id_subida}").status_code, 204)
+        self.assertEqual(self.client.get(f"/api/recursos/subidas/{id_subida}").status_code, 404)
+
+    def test_descarga_range_etag(self):
+        _, response = self.subir()
+        url = response.json()["archivo_url"]
+        self.assertTrue(url.endswith(f"/api/recursos/{response.json()['id_recurso']}/archivo"))
+        completo = self.client.get(url)
+        self.assertEqual(completo.status_code, 200)
+        self.assertEqual(b"".join(completo.streaming_content), self.contenido)
+        tag = completo["ETag"]
+        self.assertEqual(tag, f'"{hashlib.sha256(self.contenido).hexdigest()}"')
+        self.assertEqual((completo["Content-Length"], completo["Accept-Ranges"]), (str(len(self.contenido)), "bytes"))
+        self.assertIn('inline; filename="Syllabus.pdf"', completo["Content-Disposition"])
+
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": tag}).status_code, 304)
+        parcial = self.client.get(url, headers={"Range": "bytes=1000-1999"})
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(parcial["Content-Range"], f"bytes 1000-1999/{len(self.contenido)}")
+        self.assertEqual((parcial["Content-Length"], b"".join(parcial.streaming_content)), ("1000", self.contenido[1000:2000]))
+        sufijo = self.client.get(url, headers={"Range": "bytes=-10"})
+        self.assertEqual(b"".join(sufijo.streaming_content), self.contenido[-10:])
+        fuera = self.client.get(url, headers={"Range": f"bytes={len(self.contenido)}-"})
+        self.assertEqual((fuera.status_code, fuera["Content-Range"]), (416, f"bytes */{len(self.contenido)}"))
+        # If-Range con otra versión: se ignora el Range
+        self.assertEqual(self.client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"otro"'}).status_code, 200)
+        self.assertEqual(self.client.head(url, headers={"Range": "bytes=0-9"})["Content-Length"], "10")
+        self.assertEqual(self.client.get("/api/recursos/999999/archivo").status_code, 404)
+
+    def test_descarga_offload(self):
+        _, response = self.subir()
+        url = response.json()["archivo_url"] + "?descargar=1"
+        blob = Blob.objects.get()
+        with self.settings(DOWNLOAD_OFFLOAD="x-accel-redirect", DOWNLOAD_ACCEL_PREFIX="/protected-media/"):
+            response = self.client.get(url, headers={"Range": "bytes=0-9"})
+        self.assertEqual(response.status_code, 200)  # el proxy atiende el Range
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{blob.archivo.name}")
+        self.assertEqual((response.content, response["Content-Type"]), (b"", "application/pdf"))
+        self.assertIn("attachment;", response["Content-Disposition"])
+        with self.settings(DOWNLOAD_OFFLOAD="x-sendfile"):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.media, blob.archivo.name))
+
+    def test_zip_recursos(self):
+        self.subir()
+        otro = SimpleUploadedFile("notas.txt", "clase 1: introducción".encode())
+        self.client.post("/api/asignaturas/A0/recursos/", {"titulo": "Syllabus.pdf", "file": otro})
+        url = "/api/asignaturas/A0/recursos.zip"
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "application/zip"))
+        data = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Length"], str(len(data)))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["Syllabus.pdf", "Syllabus.pdf.txt"])
+            self.assertEqual(zf.read("Syllabus.pdf"), self.contenido)
+            self.assertEqual(zf.getinfo("Syllabus.pdf").compress_type, zipfile.ZIP_STORED)
+
+        # Revalidar y reanudar: el manifiesto sale de la caché y los bytes son los mismos
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": response["ETag"]}).status_code, 304)
+        resto = self.client.get(url, headers={"Range": "bytes=1000-", "If-Range": response["ETag"]})
+        self.assertEqual(resto.status_code, 206)
+        self.assertEqual(data[:1000] + b"".join(resto.streaming_content), data)
+        tramo = self.client.get(url, headers={"Range": "bytes=40-99"})
+        self.assertEqual(b"".join(tramo.streaming_content), data[40:100])
+
+        Recurso.objects.filter(titulo="Syllabus.pdf").delete()
+        nuevo = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(nuevo.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b"".join(nuevo.streaming_content))) as zf:
+            self.assertEqual(zf.namelist(), ["Syllabus.pdf"])
+        self.assertEqual(self.client.get("/api/asignaturas/NOPE/recursos.zip").status_code, 404)
+
+
+_ejecutados = []
+
+
+@trabajos.tarea("test_registrar")
+def _registrar(valor, fallar=0):
+    _ejecutados.append(valor)
+    if _ejecutados.count(valor) <= fallar:
+        raise RuntimeError(f"falla {valor}")
+
+
+class JobQueueTests(TransactionTestCase):
+    """TransactionTestCase: los workers (hilos o procesos) usan sus propias conexiones."""
+
+    def setUp(self):
+        _ejecutados.clear()
+
+    def test_reintentos_con_backoff(self):
+        t = trabajos.encolar("test_registrar", valor="a", fallar=1, max_intentos=3)
+        with self.assertLogs("api.services.trabajos", "WARNING"):
+            self.assertEqual(trabajos.trabajar(burst=True), 1)
+        t.refresh_from_db()
+        self.assertEqual((t.estado, t.intentos), (Trabajo.PENDIENTE, 1))
+        self.assertIn("RuntimeError: falla a", t.ultimo_error)
+        self.assertGreater(t.ejecutar_en, timezone.now() + datetime.timedelta(seconds=8))
+        self.assertEqual(trabajos.trabajar(burst=True), 0)  # todavía no vence
+
+        Trabajo.objects.filter(id=t.id).update(ejecutar_en=timezone.now())
+        trabajos.trabajar(burst=True)
+        t.refresh_from_db()
+        self.assertEqual((t.estado, t.intentos, _ejecutados), (Trabajo.HECHO, 2, ["a", "a"]))
+
+        f = trabajos.encolar("test_registrar", valor="b", fallar=9, max_intentos=2)
+        for _ in range(2):
+            Trabajo.objects.filter(id=f.id).update(ejecutar_en=timezone.now())
+            with self.assertLogs("api.services.trabajos", "WARNING"):
+                trabajos.trabajar(burst=True)
+        f.refresh_from_db()
+        self.assertEqual((f.estado, f.intentos), (Trabajo.FALLIDO, 2))
+        with self.assertRaises(ValueError):
+            trabajos.encolar("no_existe")
+
+    def test_skip_locked_sin_duplicados(self):
+        for i in range(40):
+            trabajos.encolar("test_registrar", valor=i)
+
+        def worker(n):
+            try:
+                trabajos.trabajar(burst=True, worker=f"w{n}")
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(sorted(_ejecutados), list(range(40)))
+        self.assertEqual(Trabajo.objects.filter(estado=Trabajo.HECHO).count(), 40)
+        self.assertGreater(Trabajo.objects.values("tomado_por").distinct().count(), 1)
+
+    def test_rescate_y_run_workers(self):
+        perdido = trabajos.encolar("test_registrar", valor="perdido")
+        trabajos.tomar("caido")
+        Trabajo.objects.filter(id=perdido.id).update(tomado_en=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(trabajos.rescatar(), 1)
+        for i in range(5):
+            trabajos.encolar("test_registrar", valor=i)
+        call_command("run_workers", concurrency=2, burst=True, stdout=io.StringIO())
+        self.assertEqual(Trabajo.objects.filter(estado=Trabajo.HECHO).count(), 6)
+
+    def test_password_forgot_encola_el_correo(self):
+        td = TipoDocumento.objects.create(descripcion="CC")
+        Estudiante.objects.create(nombre="E", apellido="E", codigo_estudiante="E1", contrasena_estudiante="x",
+                                  tipo_documento=td, num_documento="e1", correo="e1@test.co")
+        response = self.client.post("/api/auth/password/forgot", {"email": "e1@test.co"}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        t = Trabajo.objects.get()
+        self.assertEqual(t.tarea, "correo_recuperacion")
+        self.assertEqual(set(t.args), {"rol", "id", "email"})  # sin token ni cuerpo del correo
+        trabajos.trabajar(burst=True)
+        self.assertEqual(mail.outbox[0].to, ["e1@test.co"])
+        token = mail.outbox[0].body.split("/reset?token=")[1].split()[0]
+        response = self.client.post("/api/auth/password/reset", {"token": token, "password": "nueva-clave"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+
+class _FallaBackend(locmem.EmailBackend):
+    """locmem que rechaza un destinatario (p. ej. buzón inexistente) y cuenta las conexiones."""
+    aperturas = 0
+
+    def open(self):
+        type(self).aperturas += 1
+
+    def send_messages(self, messages):
+        if any("rebota@" in to for m in messages for to in m.to):
+            raise smtplib.SMTPRecipientsRefused({"rebota@test.co": (550, b"no existe")})
+        return super().send_messages(messages)
+
+
+class DeadlineDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hoy = datetime.date.today()
+        td = TipoDocumento.objects.create(descripcion="CC")
+        ta = TipoActividad.objects.create(descripcion="Taller")
+        doc = Docente.objects.create(nombre="D", apellido="D", codigo_docente="D1", contrasenia_docente="x",
+                                     correo="d1@test.co", tipo_documento=td, num_documento="d1")
+        prog = Programa.objects.create(nombre="Sistemas", codigo_programa="P1")
+        vigente = PeriodoAcademico.objects.create(descripcion="vigente", fecha_inicio=hoy - datetime.timedelta(days=30),
+                                                  fecha_finalizacion=hoy + datetime.timedelta(days=60))
+        pasado = PeriodoAcademico.objects.create(descripcion="pasado", fecha_inicio=datetime.date(2020, 1, 1),
+                                                 fecha_finalizacion=datetime.date(2020, 6, 30))
+        asig = Asignatura.objects.create(nombre="Bases", codigo_asignatura="BD1", docente=doc, programa=prog)
+        ra = ResultadoDeAprendizaje.objects.create(asignatura=asig, porcentaje_ra=100, descripcion="RA1")
+        rels = {}
+        for nombre, dias in (("Parcial", 2), ("Taller", 1), ("Proyecto", 10), ("Quiz", -1)):
+            act = Actividad.objects.create(tipo_actividad=ta, nombre_actividad=nombre, porcentaje_actividad=25,
+                                           fecha_creacion=hoy - datetime.timedelta(days=7),
+                                           fecha_cierre=hoy + datetime.timedelta(days=dias))
+            rels[nombre] = RaActividad.objects.create(actividad=act, ra=ra, porcentaje_ra_actividad=25)
+        cls.mats = []
+        for k, (correo, periodo) in enumerate((("e0@test.co", vigente), ("e1@test.co", vigente),
+                                               ("e2@test.co", pasado), ("rebota@test.co", vigente))):
+            e = Estudiante.objects.create(nombre=f"E{k}", apellido="E", codigo_estudiante=f"E{k}", contrasena_estudiante="x",
+                                          tipo_documento=td, num_documento=f"e{k}", correo=correo)
+            cls.mats.append(Matricula.objects.create(estudiante=e, periodo=periodo, asignatura=asig))
+        # E0 ya tiene nota en el Parcial: sólo le queda el Taller
+        NotasActividad.objects.create(matricula=cls.mats[0], ra_actividad=rels["Parcial"], nota_ra_actividad=Decimal("4"))
+
+    def test_generar_y_enviar(self):
+        with self.assertNumQueries(5):  # 3 lecturas + claves existentes + bulk insert, para todos los estudiantes
+            self.assertEqual(resumenes.generar(dias=3), 3)
+        self.assertEqual(resumenes.generar(dias=3), 0)  # mismo día: deduplicado por clave
+
+        _FallaBackend.aperturas = 0
+        with self.assertLogs("api.services.resumenes", "WARNING"):
+            self.assertEqual(resumenes.enviar_pendientes(conexion=_FallaBackend()), (2, 1))
+        por_destino = {m.to[0]: m.body for m in mail.outbox}
+        self.assertEqual(set(por_destino), {"e0@test.co", "e1@test.co"})
+        self.assertIn("Bases: Taller", por_destino["e0@test.co"])
+        self.assertNotIn("Parcial", por_destino["e0@test.co"])
+        self.assertIn("Bases: Parcial", por_destino["e1@test.co"])
+        self.assertNotIn("Proyecto", por_destino["e1@test.co"])
+        self.assertEqual(_FallaBackend.aperturas, 3)  # la corrida + reabrir tras el lote fallido y tras el rebote
+
+        rebotado = Correo.objects.get(destinatario="rebota@test.co")
+        self.assertEqual((rebotado.estado, rebotado.intentos), (Correo.PENDIENTE, 1))
+        self.assertIn("SMTPRecipientsRefused", rebotado.ultimo_error)
+        # Retomar: sólo queda el pendiente; al agotar los intentos queda fallido
+        for _ in range(2):
+            with self.assertLogs("api.services.resumenes", "WARNING"):
+                self.assertEqual(resumenes.enviar_pendientes(conexion=_FallaBackend()), (0, 1))
+        self.assertEqual(Correo.objects.get(destinatario="rebota@test.co").estado, Correo.FALLIDO)
+        self.assertEqual(resumenes.enviar_pendientes(), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_comando(self):
+        out = io.StringIO()
+        call_command("enviar_resumenes", "--dias", "3", stdout=out)
+        self.assertIn("3 resúmenes nuevos", out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        call_command("enviar_resumenes", "--encolar", stdout=io.StringIO())
+        self.assertEqual(Trabajo.objects.get().tarea, "resumen_vencimientos")
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "COPY de PostgreSQL")
+class SeedLoadTests(TestCase):
+    OPCIONES = dict(programas=1, estudiantes=6, periodos=1, docentes=2, asignaturas=2, ras="2", indicadores="1-2",
+                    actividades="2", matriculas="2", seed=7, recompute=True)
+
+    def cargar(self, tag, **extra):
+        out = io.StringIO()
+        call_command("seed_load", tag=tag, stdout=out, **self.OPCIONES, **extra)
+        return out.getvalue()
+
+    def notas(self, tag):
+        return NotasActividad.objects.filter(matricula__estudiante__codigo_estudiante__startswith=f"{tag}E")
+
+    def test_copy_carga_lo_mismo_que_bulk_create(self):
+        log = self.cargar("TC")
+        self.assertIn("notas (COPY)", log)
+        self.assertIn("notas (bulk_create)", self.cargar("TB", no_copy=True))
+
+        copia, bulk = self.notas("TC"), self.notas("TB")
+        self.assertGreater(copia.count(), 0)
+        # Misma semilla: mismas notas, y cada fila es coherente con la estructura del curso
+        self.assertEqual(sorted(copia.values_list("nota_ra_actividad", flat=True)),
+                         sorted(bulk.values_list("nota_ra_actividad", flat=True)))
+        self.assertFalse(copia.exclude(ra_actividad__ra__asignatura=F("matricula__asignatura")).exists())
+        self.assertFalse(copia.exclude(indicador__ra=F("ra_actividad__ra")).exists())
+        self.assertEqual(Matricula.objects.filter(estudiante__codigo_estudiante__startswith="TCE").count(), 12)
+
+        # --recompute deja NotaRa y nota_final listos, y las cuentas pueden iniciar sesión
+        self.assertTrue(NotaRa.objects.filter(matricula__estudiante__codigo_estudiante__startswith="TCE").exists())
+        self.assertFalse(Matricula.objects.filter(estudiante__codigo_estudiante__startswith="TCE",
+                                                  notas_ra__isnull=False, nota_final__isnull=True).exists())
+        codigo = Estudiante.objects.filter(codigo_estudiante__startswith="TCE").values_list(
+            "codigo_estudiante", flat=True).first()
+        response = self.client.post("/api/auth/login", {"codigo": codigo, "password": "seed"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+
+@unittest.skipUnless(os.environ.get("RA_BENCH"), "benchmark lento: definir RA_BENCH=1")
+class EndpointBenchmarkTests(TransactionTestCase):
+    """
+    Mide todas las rutas GET de list_urls para cada tamaño de RA_BENCH_SIZES (estudiantes
+    por programa, dataset de seed_load) y compara con la línea base RA_BENCH_BASELINE.
+    Sin línea base, la corrida la crea; RA_BENCH_UPDATE=1 la reescribe.
+
+        RA_BENCH=1 RA_BENCH_SIZES=200,2000 python manage.py test api.tests.EndpointBenchmarkTests
+    """
+    def test_endpoints(self):
+        sizes = [int(s) for s in os.environ.get("RA_BENCH_SIZES", "200,2000").split(",")]
+        path = os.environ.get("RA_BENCH_BASELINE", os.path.join(os.path.dirname(bench.__file__), "baseline.json"))
+        threshold = float(os.environ.get("RA_BENCH_THRESHOLD", "0.25"))
+        repeat = int(os.environ.get("RA_BENCH_REPEAT", "20"))
+
+        resultados = {}
+        for size in sizes:
+            call_command("flush", interactive=False, verbosity=0)
+            call_command("seed_load", programas=1, estudiantes=size, periodos=2, seed=1, tag=f"B{size}",
+                         recompute=True, stdout=io.StringIO())
+            print(f"\n--- {size} estudiantes ---")
+            resultados[str(size)] = bench.run(repeat=repeat, stdout=self._Out())
+            self.assertTrue(resultados[str(size)])
+
+        if os.environ.get("RA_BENCH_UPDATE") or not os.path.exists(path):
+            base = bench.load(path) if os.path.exists(path) else {}
+            base.update(resultados)
+            bench.save(path, base)
+            return
+        self.assertEqual(bench.compare(resultados, bench.load(path), threshold), [])
+
+    class _Out:
+        def write(self, msg):
+            print(msg)
@@ -5,9 +5,12 @@ from ..views.views import (
     login_view, me_view, logout_view, password_forgot_view, password_reset_view,
     TaskViewSet, TipoDocumentoViewSet, TipoActividadViewSet, ProgramaViewSet,
     DocenteViewSet, EstudianteViewSet, AsignaturaViewSet,
-    ra_indicadores_view, ra_actividades_view, notas_view,
-    course_student_indicators_view, profile_view,
-    notifications_view, ra_validation_view, asignatura_validation_view,
+    ra_indicadores_view, ra_actividades_view, notas_view, notas_bulk_view,
+    course_student_indicators_view, course_indicators_view, profile_view,
+    notifications_view, notifications_stream_view, notifications_stream_token_view, notifications_read_view, ra_validation_view, asignatura_validation_view,
+    asignatura_export_view, programa_export_view, programa_atencion_ra_view, metrics_view,
+    recurso_subida_view, recurso_subida_finalizar_view, recurso_archivo_view,
+    asignatura_recursos_zip_view,
 )
 
 router = DefaultRouter()
@@ -20,6 +23,8 @@ router.register(r"estudiantes", EstudianteViewSet, basename="estudiante")
 router.register(r"asignaturas", AsignaturaViewSet, basename="asignatura")
 
 urlpatterns = [
+    # Antes del router: si no, la acción `recursos` lo tomaría como sufijo de formato (.zip)
+    path("asignaturas/<str:codigo_asignatura>/recursos.zip", asignatura_recursos_zip_view),  # GET/HEAD, Range
     path("", include(router.urls)),
     path("auth/login", login_view),
     path("auth/me", me_view),
@@ -32,9 +37,22 @@ urlpatterns = [
     path("validacion/ra/<int:ra_id>", ra_validation_view),
     path("validacion/asignatura/<str:codigo_asignatura>", asignatura_validation_view),
     path("notas", notas_view),  # POST/PUT
+    path("notas/bulk", notas_bulk_view),  # POST [{...}, ...]
     path(
         "asignaturas/<str:codigo_asignatura>/estudiante/<int:id_estudiante>/indicadores",
         course_student_indicators_view,
     ),
+    path("asignaturas/<str:codigo_asignatura>/indicadores", course_indicators_view),
+    path("asignaturas/<str:codigo_asignatura>/export.csv", asignatura_export_view),
+    path("programas/<int:id_programa>/export.csv", programa_export_view),
+    path("programas/<int:id_programa>/atencion-ra", programa_atencion_ra_view),
+    # Subida reanudable: POST asignaturas/<codigo>/recursos/subidas/ la inicia
+    path("recursos/subidas/<uuid:id_subida>", recurso_subida_view),  # GET, PATCH (parte), DELETE
+    path("recursos/subidas/<uuid:id_subida>/finalizar", recurso_subida_finalizar_view),  # POST
+    path("recursos/<int:id_recurso>/archivo", recurso_archivo_view, name="recurso-archivo"),  # GET/HEAD, Range
     path("notificaciones", notifications_view),
+    path("notificaciones/stream", notifications_stream_view),  # SSE (ASGI)
+    path("notificaciones/stream/token", notifications_stream_token_view),  # POST, token corto para ?token=
+    path("notificaciones/leidas", notifications_read_view),  # POST {ids?}
+    path("metrics", metrics_view),  # Prometheus
 ]
\ No newline at end of file
@@ -3,23 +3,42 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, authentication_classes, action
 from rest_framework.permissions import AllowAny
 from django.core import signing
-from django.contrib.auth.hashers import check_password, make_password
-from django.core.mail import send_mail
+from django.contrib.auth.hashers import check_password, make_password, identify_hasher
+from django.utils.crypto import constant_time_compare
 from django.conf import settings
-from django.db.models import Avg, Sum
+from django.db.models import Avg, Max, Sum
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse, JsonResponse, HttpResponse
+from django.views.decorators.http import require_GET, require_http_methods
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from django.urls import reverse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 import datetime
+import json
+import time
 
 from ..models.models import (
     TipoDocumento, TipoActividad, Programa, Docente, Estudiante, Asignatura,
-    Task, ResultadoDeAprendizaje, Matricula, IndicadoresDeLogro, Actividad, RaActividad, NotasActividad, PeriodoAcademico, Recurso, RaActividadIndicador
+    Task, ResultadoDeAprendizaje, Matricula, IndicadoresDeLogro, Actividad, RaActividad, NotasActividad, PeriodoAcademico, Recurso, RaActividadIndicador,
+    Notificacion, NotaRa, SubidaRecurso,
 )
+from ..authentication.authentication import (
+    BearerTokenAuthentication, Principal, STREAM_TOKEN_MAX_AGE, bearer_token, load_user, principal_from_stream_token,
+    principal_from_token, stream_token,
+)
+from ..pagination.pagination import KeysetPagination
+from ..metrics import metrics
+from ..services.notas import upsert_notas
+from ..services.importacion import import_grades, ImportacionError
+from ..services import exportacion, analitica, identidad, versiones, estructura, concurrencia, eventos, notificaciones, almacen, descargas, trabajos
 from ..serializers.serializers import (
-    TipoDocumentoSerializer, TipoActividadSerializer, ProgramaSerializer,
+    ValuesReadSerializer, TipoDocumentoSerializer, TipoActividadSerializer, ProgramaSerializer,
     DocenteSerializer, EstudianteSerializer, AsignaturaSerializer,
     TaskSerializer, ResultadoDeAprendizajeSerializer, RecursoSerializer
 )
 
-TOKEN_MAX_AGE = 60 * 60 * 24 * 7
 RESET_TOKEN_MAX_AGE = 60 * 60  # 1 hora
 
 def _normalize_login_payload(data: dict):
@@ -38,9 +57,88 @@ def _serialize_user(u, rol: str):
         "code": getattr(u, "codigo_docente", None) or getattr(u, "codigo_estudiante", None),
     }
 
-def _bearer_token(request):
-    auth = request.headers.get("Authorization", "")
-    return auth.split(" ", 1)[1] if auth.startswith("Bearer ") and " " in auth else None
+def _principal_or_401(request):
+    """Devuelve (Principal, None) o (None, Response 401) según lo que resolvió BearerTokenAuthentication."""
+    if isinstance(request.user, Principal):
+        return request.user, None
+    if bearer_token(request):
+        return None, Response({"detail": "Token inválido"}, status=status.HTTP_401_UNAUTHORIZED)
+    return None, Response({"detail": "No autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+
+async def _aprincipal_or_401(request, token_stream=None):
+    """
+    Versión de _principal_or_401 para las vistas async (sin DRF): (Principal, None) o (None, JsonResponse 401).
+    `token_stream` (de stream_token) sustituye al header Authorization en el stream SSE.
+    """
+    token = bearer_token(request)
+    if token or not token_stream:
+        auth = await sync_to_async(principal_from_token)(token)
+        principal = auth[0] if auth else None
+    else:
+        principal = await sync_to_async(principal_from_stream_token)(token_stream)
+    if principal:
+        return principal, None
+    return None, JsonResponse({"detail": "Token inválido" if token or token_stream else "No autorizado"},
+                              status=status.HTTP_401_UNAUTHORIZED)
+
+def _docente_or_error(request):
+    """Para vistas Django sin DRF: (Principal docente, None) o (None, JsonResponse 401/403)."""
+    token = bearer_token(request)
+    auth = principal_from_token(token) if token else None
+    if not auth:
+        return None, JsonResponse({"detail": "Token inválido" if token else "No autorizado"},
+                                  status=status.HTTP_401_UNAUTHORIZED)
+    if auth[0].rol != "docente":
+        return None, JsonResponse({"detail": "Solo disponible para docentes"}, status=status.HTTP_403_FORBIDDEN)
+    return auth[0], None
+
+def _periodo_id_from_params(params, response=Response):
+    """
+    Resuelve ?id_periodo= o ?periodo=<descripcion>: (id, None), (None, None) si no se pidió
+    periodo (todos) o (None, respuesta 400/404) si el valor dado no resuelve, para no devolver
+    en silencio todos los periodos. `response`: Response (DRF) o JsonResponse (vistas Django).
+    """
+    pid = params.get("id_periodo")
+    if pid:
+        if not str(pid).isdigit():
+            return None, response({"detail": "id_periodo inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        return int(pid), None
+    periodo_desc = params.get("periodo")
+    if periodo_desc:
+        pid = PeriodoAcademico.objects.filter(descripcion=periodo_desc).values_list("id_periodo", flat=True).first()
+        if pid is None:
+            return None, response({"detail": f"Periodo {periodo_desc} no existe"}, status=status.HTTP_404_NOT_FOUND)
+        return pid, None
+    return None, None
+
+def _float_or_none(v):
+    return float(v) if v is not None else None
+
+_PASSWORD_FIELD = {"docente": "contrasenia_docente", "estudiante": "contrasena_estudiante"}
+
+def _check_and_upgrade_password(u, field: str, password: str | None) -> bool:
+    """
+    Verifica la contraseña contra el hash guardado. Si el valor guardado es texto plano
+    (datos heredados) o usa un hasher/iteraciones desactualizados, se re-hashea al acertar.
+    """
+    if not password:
+        return True
+    db_value = getattr(u, field)
+    if not db_value:
+        return False
+
+    def upgrade(raw):
+        setattr(u, field, make_password(raw))
+        u.save(update_fields=[field])
+
+    try:
+        identify_hasher(db_value)
+    except ValueError:
+        if constant_time_compare(password, db_value):
+            upgrade(password)
+            return True
+        return False
+    return check_password(password, db_value, setter=upgrade)
 
 @api_view(["POST", "GET"])
 @permission_classes([AllowAny])
@@ -51,31 +149,13 @@ def login_view(request):
     if not (email or codigo):
         return Response({"detail": "Faltan credenciales"}, status=status.HTTP_400_BAD_REQUEST)
 
-    def ok_pass(db_value: str | None) -> bool:
-        if not password:
-            return True
-        if not db_value:
-            return False
-        try:
-            if check_password(password, db_value):
-                return True
-        except Exception:
-            pass
-        return password == db_value
-
     user = None
     user_rol = None
-    for r in (["docente", "estudiante"] if not rol else [rol]):
-        if r == "docente":
-            u = (Docente.objects.filter(codigo_docente=codigo).first()
-                 or Docente.objects.filter(correo=email).first())
-            if u and ok_pass(u.contrasenia_docente):
-                user = u; user_rol = "docente"; break
-        else:
-            u = (Estudiante.objects.filter(codigo_estudiante=codigo).first()
-                 or Estudiante.objects.filter(correo=email).first())
-            if u and ok_pass(u.contrasena_estudiante):
-                user = u; user_rol = "estudiante"; break
+    roles = identidad.ROLES if not rol else (["docente"] if rol == "docente" else ["estudiante"])
+    for r, uid in identidad.resolve(codigo, email, roles):
+        u = load_user(r, uid)  # la caché de tokens puede tener un hash de contraseña viejo
+        if u and _check_and_upgrade_password(u, _PASSWORD_FIELD[r], password):
+            user = u; user_rol = r; break
 
     if not user:
         return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -85,20 +165,12 @@ def login_view(request):
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
-@authentication_classes([])
+@authentication_classes([BearerTokenAuthentication])
 def me_view(request):
-    token = _bearer_token(request)
-    if not token:
-        return Response({"detail": "No autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-    try:
-        data = signing.loads(token, max_age=TOKEN_MAX_AGE)
-    except Exception:
-        return Response({"detail": "Token inválido"}, status=status.HTTP_401_UNAUTHORIZED)
-    rol, uid = data.get("rol"), data.get("id")
-    u = Docente.objects.filter(pk=uid).first() if rol == "docente" else Estudiante.objects.filter(pk=uid).first()
-    if not u:
-        return Response({"detail": "Usuario no encontrado"}, status=status.HTTP_401_UNAUTHORIZED)
-    return Response({"user": _serialize_user(u, rol or "estudiante")})
+    principal, err = _principal_or_401(request)
+    if err:
+        return err
+    return Response({"user": _serialize_user(principal.obj, principal.rol)})
 
 @api_view(["POST", "GET"])
 @permission_classes([AllowAny])
@@ -123,23 +195,9 @@ def password_forgot_view(request):
 
     # Siempre responder 200 para evitar enumeración de usuarios
     if u and rol:
-        payload = {"kind": "pwdreset", "rol": rol, "id": u.pk, "ts": datetime.datetime.utcnow().timestamp()}
-        token = signing.dumps(payload)
-        front = getattr(settings, "FRONTEND_URL", "http://localhost:5173")
-        reset_url = f"{front}/reset?token={token}"
-        subject = "Recuperación de contraseña"
-        message = (
-            "Hola,\n\n"
-            "Recibimos una solicitud para restablecer tu contraseña.\n"
-            f"Usa el siguiente enlace (válido por 1 hora):\n{reset_url}\n\n"
-            "Si no fuiste tú, puedes ignorar este mensaje.\n"
-            "— Universidad del Valle"
-        )
-        try:
-            send_mail(subject, message, getattr(settings, "DEFAULT_FROM_EMAIL", None), [email], fail_silently=True)
-        except Exception:
-            # En desarrollo con console backend no debería fallar; igual no exponemos detalles
-            pass
+        # El envío (SMTP) corre en un worker. Sólo se encola a quién: el token de recuperación
+        # se firma en la tarea para que no quede en claro en la tabla `trabajo`
+        trabajos.encolar("correo_recuperacion", rol=rol, id=u.pk, email=u.correo)
 
     return Response({"ok": True})
 
@@ -180,33 +238,83 @@ def password_reset_view(request):
 
     return Response({"ok": True})
 
-class TaskViewSet(viewsets.ModelViewSet):
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b,c en listados/detalle: reduce la salida del serializer y las columnas del
+    SELECT (.only()). Los nombres desconocidos o repetidos se ignoran; la PK siempre se carga.
+    """
+    def _requested_fields(self):
+        raw = self.request.query_params.get("fields") if self.request else None
+        if not raw or getattr(self, "action", None) not in ("list", "retrieve"):
+            return None
+        known = set(self.get_serializer_class()().fields)
+        return list(dict.fromkeys(f for f in (x.strip() for x in raw.split(",")) if f in known)) or None
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self._requested_fields()
+        if fields:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self._requested_fields()
+        if fields:
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            queryset = queryset.only(queryset.model._meta.pk.name, *[f for f in fields if f in model_fields])
+        return queryset
+
+class ValuesListMixin:
+    """GET de lista servido con ValuesReadSerializer (values_list + conversores) en vez del ModelSerializer."""
+    def list(self, request, *args, **kwargs):
+        reader = ValuesReadSerializer.for_serializer(self.get_serializer_class(), self._requested_fields())
+        rows = reader.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(rows))
+
+class VersionedListMixin:
+    """GET de lista condicional (ETag/304) según las claves de version_recurso en `version_keys`."""
+    version_keys = ()
+
+    @method_decorator(versiones.conditional(lambda request, *a, **kw: request.parser_context["view"].version_keys))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class TaskViewSet(ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
 
-class TipoDocumentoViewSet(viewsets.ModelViewSet):
+class TipoDocumentoViewSet(VersionedListMixin, ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = TipoDocumento.objects.all()
     serializer_class = TipoDocumentoSerializer
+    version_keys = (versiones.TIPOS_DOCUMENTO,)
 
-class TipoActividadViewSet(viewsets.ModelViewSet):
+class TipoActividadViewSet(VersionedListMixin, ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = TipoActividad.objects.all()
     serializer_class = TipoActividadSerializer
+    version_keys = (versiones.TIPOS_ACTIVIDAD,)
 
-class ProgramaViewSet(viewsets.ModelViewSet):
+class ProgramaViewSet(VersionedListMixin, ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Programa.objects.all()
     serializer_class = ProgramaSerializer
+    version_keys = (versiones.PROGRAMAS,)
 
-class DocenteViewSet(viewsets.ModelViewSet):
+class DocenteViewSet(ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Docente.objects.all()
     serializer_class = DocenteSerializer
+    pagination_class = KeysetPagination
 
-class EstudianteViewSet(viewsets.ModelViewSet):
+class EstudianteViewSet(ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Estudiante.objects.all()
     serializer_class = EstudianteSerializer
+    pagination_class = KeysetPagination
 
-class AsignaturaViewSet(viewsets.ModelViewSet):
+class AsignaturaViewSet(ValuesListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Asignatura.objects.all()
     serializer_class = AsignaturaSerializer
+    pagination_class = KeysetPagination
     lookup_field = "codigo_asignatura"
 
     def get_queryset(self):
@@ -220,50 +328,39 @@ class AsignaturaViewSet(viewsets.ModelViewSet):
         if docente_code: return qs.filter(docente__codigo_docente=docente_code)
         if estudiante_id: return qs.filter(matricula__estudiante__id_estudiante=estudiante_id).distinct()
         if estudiante_code: return qs.filter(matricula__estudiante__codigo_estudiante=estudiante_code).distinct()
-        token = _bearer_token(req)
-        if token:
-            try:
-                data = signing.loads(token, max_age=TOKEN_MAX_AGE)
-                if data.get("rol") == "docente":
-                    return qs.filter(docente__id_docente=data.get("id"))
-                if data.get("rol") == "estudiante":
-                    return qs.filter(matricula__estudiante__id_estudiante=data.get("id")).distinct()
-            except Exception:
-                pass
+        principal = req.user
+        if isinstance(principal, Principal):
+            if principal.rol == "docente":
+                return qs.filter(docente__id_docente=principal.id)
+            if principal.rol == "estudiante":
+                return qs.filter(matricula__estudiante__id_estudiante=principal.id).distinct()
         return qs
 
     @action(detail=True, methods=["get"])
     def estudiantes(self, request, codigo_asignatura=None):
         asignatura = self.get_object()
         qs = Matricula.objects.filter(asignatura=asignatura).select_related("estudiante", "periodo")
-        pid = request.query_params.get("id_periodo")
-        periodo_desc = request.query_params.get("periodo")
+        pid, err = _periodo_id_from_params(request.query_params)
+        if err:
+            return err
         if pid:
             qs = qs.filter(periodo_id=pid)
-        elif periodo_desc:
-            p = PeriodoAcademico.objects.filter(descripcion=periodo_desc).first()
-            if p: qs = qs.filter(periodo=p)
         rows = [{
             "id_estudiante": m.estudiante_id,
             "nombre": m.estudiante.nombre,
             "apellido": m.estudiante.apellido,
             "id_matricula": m.id_matricula,
             "periodo": m.periodo.descripcion,
+            "nota_final": _float_or_none(m.nota_final),
         } for m in qs.order_by("estudiante__nombre", "estudiante__apellido")]
         return Response(rows)
 
     @action(detail=True, methods=["get"], url_path="mi-matricula")
     def mi_matricula(self, request, codigo_asignatura=None):
         asignatura = self.get_object()
-        token = _bearer_token(request)
         student_id = None
-        if token:
-            try:
-                data = signing.loads(token, max_age=TOKEN_MAX_AGE)
-                if data.get("rol") == "estudiante":
-                    student_id = data.get("id")
-            except Exception:
-                pass
+        if isinstance(request.user, Principal) and request.user.rol == "estudiante":
+            student_id = request.user.id
         if not student_id:
             student_id = request.query_params.get("id_estudiante")
         if not student_id:
@@ -271,11 +368,15 @@ class AsignaturaViewSet(viewsets.ModelViewSet):
         mat = Matricula.objects.filter(asignatura=asignatura, estudiante_id=student_id).order_by("-id_matricula").first()
         if not mat:
             return Response({"id_matricula": None}, status=status.HTTP_200_OK)
-        return Response({"id_matricula": mat.id_matricula}, status=status.HTTP_200_OK)
+        return Response({"id_matricula": mat.id_matricula, "nota_final": _float_or_none(mat.nota_final)}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["get"], url_path="periodos")
     def periodos(self, request, codigo_asignatura=None):
-        asignatura = self.get_object()
+        return self._periodos(request, self.get_object())
+
+    @method_decorator(versiones.conditional(lambda request, asignatura: [
+        versiones.asignatura_key(asignatura.pk, "periodos"), versiones.PERIODOS]))
+    def _periodos(self, request, asignatura):
         qs = (PeriodoAcademico.objects
               .filter(matricula__asignatura=asignatura)
               .distinct()
@@ -284,65 +385,256 @@ class AsignaturaViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["get"], url_path="ras")
     def ras(self, request, codigo_asignatura=None):
-        asignatura = self.get_object()
-        qs = ResultadoDeAprendizaje.objects.filter(asignatura=asignatura).order_by("id_ra")
+        # get_object() aplica el alcance de get_queryset() antes de la validación condicional
+        return self._ras(request, self.get_object())
+
+    @method_decorator(versiones.conditional(lambda request, asignatura: [
+        versiones.asignatura_key(asignatura.pk, "ras")]))
+    def _ras(self, request, asignatura):
         return Response([{
-            "id_ra": r.id_ra,
-            "id": r.id_ra,
-            "porcentaje_ra": float(r.porcentaje_ra),
-            "descripcion": r.descripcion,
-        } for r in qs])
+            "id_ra": r["id_ra"],
+            "id": r["id_ra"],
+            "porcentaje_ra": r["porcentaje_ra"],
+            "descripcion": r["descripcion"],
+        } for r in estructura.ras(asignatura.pk)])
+
+    @action(detail=True, methods=["get"], url_path="gradebook")
+    def gradebook(self, request, codigo_asignatura=None):
+        """
+        Matriz completa matrícula x ra_actividad del curso (opcionalmente filtrada por periodo).
+        El número de consultas es constante: no depende de estudiantes, RAs ni actividades.
+        """
+        asignatura = self.get_object()
+        pid, err = _periodo_id_from_params(request.query_params)
+        if err:
+            return err
+
+        mats = Matricula.objects.filter(asignatura=asignatura)
+        if pid:
+            mats = mats.filter(periodo_id=pid)
+        estudiantes = [{
+            "id_matricula": id_mat,
+            "id_estudiante": id_est,
+            "nombre": nombre,
+            "apellido": apellido,
+            "periodo": periodo,
+            "nota_final": _float_or_none(nota_final),
+        } for id_mat, id_est, nombre, apellido, periodo, nota_final in mats.order_by("estudiante__nombre", "estudiante__apellido").values_list(
+            "id_matricula", "estudiante_id", "estudiante__nombre", "estudiante__apellido", "periodo__descripcion", "nota_final")]
+
+        inds_por_rel = {}
+        for id_rel, id_ind in (RaActividadIndicador.objects
+                               .filter(ra_actividad__ra__asignatura=asignatura)
+                               .order_by("indicador_id")
+                               .values_list("ra_actividad_id", "indicador_id")):
+            inds_por_rel.setdefault(id_rel, []).append(id_ind)
+
+        ras = {}
+        for r in ResultadoDeAprendizaje.objects.filter(asignatura=asignatura).order_by("id_ra"):
+            ras[r.id_ra] = {
+                "id_ra": r.id_ra,
+                "porcentaje_ra": float(r.porcentaje_ra),
+                "descripcion": r.descripcion,
+                "actividades": [],
+            }
+        rels = (RaActividad.objects
+                .filter(ra__asignatura=asignatura)
+                .select_related("actividad")
+                .order_by("ra_id", "id_ra_actividad"))
+        for rel in rels:
+            act = rel.actividad
+            ras[rel.ra_id]["actividades"].append({
+                "id_ra_actividad": rel.id_ra_actividad,
+                "id_actividad": act.id_actividad,
+                "nombre_actividad": act.nombre_actividad,
+                "porcentaje_actividad": float(act.porcentaje_actividad),
+                "porcentaje_ra_actividad": float(rel.porcentaje_ra_actividad),
+                "id_tipo_actividad": act.tipo_actividad_id,
+                "fecha_cierre": act.fecha_cierre,
+                "indicadores": inds_por_rel.get(rel.id_ra_actividad, []),
+            })
+
+        notas_qs = NotasActividad.objects.filter(matricula__asignatura=asignatura)
+        if pid:
+            notas_qs = notas_qs.filter(matricula__periodo_id=pid)
+        notas = {}
+        for id_mat, id_rel, nota, retro, id_ind in notas_qs.values_list(
+                "matricula_id", "ra_actividad_id", "nota_ra_actividad", "retroalimentacion", "indicador_id"):
+            notas.setdefault(str(id_mat), {})[str(id_rel)] = {
+                "nota": _float_or_none(nota),
+                "retroalimentacion": retro,
+                "id_ind": id_ind,
+            }
+
+        notas_ra_qs = NotaRa.objects.filter(matricula__asignatura=asignatura)
+        if pid:
+            notas_ra_qs = notas_ra_qs.filter(matricula__periodo_id=pid)
+        notas_ra = {}
+        for id_mat, id_ra, nota in notas_ra_qs.values_list("matricula_id", "ra_id", "nota"):
+            notas_ra.setdefault(str(id_mat), {})[str(id_ra)] = _float_or_none(nota)
+
+        return Response({
+            "codigo_asignatura": asignatura.codigo_asignatura,
+            "id_periodo": int(pid) if pid else None,
+            "ras": list(ras.values()),
+            "estudiantes": estudiantes,
+            "notas": notas,
+            "notas_ra": notas_ra,
+        })
+
+    @action(detail=True, methods=["post"], url_path="importar-notas")
+    def importar_notas(self, request, codigo_asignatura=None):
+        """Importa notas desde un CSV/XLSX subido en `file` (ver services/importacion.py)."""
+        asignatura = self.get_object()
+        f = request.FILES.get("file") or request.FILES.get("archivo")
+        if not f:
+            return Response({"detail": "Archivo requerido (file)"}, status=status.HTTP_400_BAD_REQUEST)
+        en_cuerpo = request.data.get("id_periodo") or request.data.get("periodo")
+        pid, err = _periodo_id_from_params(request.data if en_cuerpo else request.query_params)
+        if err:
+            return err
+        try:
+            res = import_grades(f.file, f.name, asignatura, pid)
+        except ImportacionError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(res, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["get", "post"], url_path="recursos")
     def recursos(self, request, codigo_asignatura=None):
         # Buscar asignatura por código
-        asign = Asignatura.objects.filter(codigo_asignatura=codigo_asignatura).first()
-        if not asign:
+        asign_id = estructura.asignatura_id(codigo_asignatura)
+        if not asign_id:
             return Response({"detail": "Asignatura no encontrada"}, status=status.HTTP_404_NOT_FOUND)
 
         # GET: listar recursos con URL absoluta para descarga
         if request.method.lower() == "get":
-            qs = Recurso.objects.filter(asignatura=asign).order_by("-fecha_subida")
-            base_url = request.build_absolute_uri("/")[:-1]  # http://localhost:8000
-            out = []
-            for r in qs:
-                rel = r.archivo.url if hasattr(r.archivo, "url") else ""
-                abs_url = (base_url + rel) if rel.startswith("/") else rel
-                out.append({
-                    "id_recurso": r.id_recurso,
-                    "titulo": r.titulo,
-                    "archivo": rel,
-                    "archivo_url": abs_url,
-                    "fecha_subida": r.fecha_subida,
-                })
-            return Response(out)
-
-        # POST: subir archivo
+            qs = Recurso.objects.filter(asignatura_id=asign_id).order_by("-fecha_subida")
+            return Response([_recurso_json(request, r) for r in qs])
+
+        # POST: subir archivo (en una sola petición; para archivos grandes ver recursos/subidas)
         titulo = request.data.get("titulo") or request.data.get("title") or "Recurso"
         f = request.FILES.get("file") or request.FILES.get("archivo")
         if not f:
             return Response({"detail": "Archivo requerido (file)"}, status=status.HTTP_400_BAD_REQUEST)
-        rec = Recurso.objects.create(asignatura=asign, titulo=titulo, archivo=f)
-        abs_url = request.build_absolute_uri(rec.archivo.url)
-        return Response({
-            "id_recurso": rec.id_recurso,
-            "titulo": rec.titulo,
-            "archivo": rec.archivo.url,
-            "archivo_url": abs_url,
-            "fecha_subida": rec.fecha_subida,
-        }, status=status.HTTP_201_CREATED)
+        rec = almacen.guardar(asign_id, titulo, f)
+        return Response(_recurso_json(request, rec), status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"], url_path="recursos/subidas")
+    def recursos_subidas(self, request, codigo_asignatura=None):
+        """
+        Inicia una subida reanudable por partes: {titulo, nombre, tamano, sha256?}.
+        Las partes se envían con PATCH a /api/recursos/subidas/<id> y se cierra con
+        POST /api/recursos/subidas/<id>/finalizar (ver services/almacen.py).
+        """
+        asign_id = estructura.asignatura_id(codigo_asignatura)
+        if not asign_id:
+            return Response({"detail": "Asignatura no encontrada"}, status=status.HTTP_404_NOT_FOUND)
+        body = request.data or {}
+        nombre = body.get("nombre") or body.get("filename") or ""
+        try:
+            subida = almacen.iniciar(asign_id, body.get("titulo") or body.get("title") or nombre or "Recurso",
+                                     nombre, body.get("tamano") or body.get("size"), body.get("sha256") or "")
+        except almacen.SubidaError as e:
+            return _subida_error(e)
+        return Response(_subida_json(subida), status=status.HTTP_201_CREATED)
 
+def _recurso_json(request, r):
+    rel = r.archivo.url if r.archivo else ""
+    return {
+        "id_recurso": r.id_recurso,
+        "titulo": r.titulo,
+        "archivo": rel,
+        # MEDIA_URL sólo se sirve con DEBUG: los clientes descargan por la vista de abajo
+        "archivo_url": request.build_absolute_uri(reverse("recurso-archivo", args=[r.id_recurso])) if rel else "",
+        "fecha_subida": r.fecha_subida,
+    }
+
+def _subida_json(subida):
+    return {
+        "id": str(subida.id),
+        "offset": subida.recibido,
+        "tamano": subida.tamano,
+        "chunk_max": almacen.CHUNK_MAX,
+    }
+
+def _subida_error(e):
+    body = {"detail": str(e)}
+    headers = None
+    if e.offset is not None:
+        body["offset"] = e.offset
+        headers = {"Upload-Offset": str(e.offset)}
+    return Response(body, status=e.status, headers=headers)
+
+@api_view(["GET", "PATCH", "DELETE"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def recurso_subida_view(request, id_subida):
+    """
+    GET: estado de la subida ({offset} para reanudar). DELETE: la cancela.
+    PATCH: agrega una parte. El cuerpo es el contenido crudo (application/offset+octet-stream)
+    y el header Upload-Offset el offset en el que empieza; si no coincide con lo recibido
+    responde 409 con el offset correcto. El cuerpo se copia al disco por bloques, sin
+    cargarlo en memoria (no se toca request.data).
+    """
+    if request.method == "DELETE":
+        if not almacen.cancelar(id_subida):
+            return Response({"detail": "Subida no existe o expiró"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    if request.method == "GET":
+        subida = SubidaRecurso.objects.filter(pk=id_subida).first()
+        if not subida:
+            return Response({"detail": "Subida no existe o expiró"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_subida_json(subida), headers={"Upload-Offset": str(subida.recibido)})
+
+    offset = request.headers.get("Upload-Offset") or request.query_params.get("offset")
+    longitud = request.META.get("CONTENT_LENGTH")
+    if not (offset and offset.isdigit()):
+        return Response({"detail": "Header Upload-Offset requerido"}, status=status.HTTP_400_BAD_REQUEST)
+    if not (longitud and longitud.isdigit()):
+        return Response({"detail": "Content-Length requerido"}, status=status.HTTP_411_LENGTH_REQUIRED)
+    try:
+        nuevo = almacen.escribir(id_subida, int(offset), request.stream, int(longitud))
+    except almacen.SubidaError as e:
+        return _subida_error(e)
+    return Response({"offset": nuevo}, headers={"Upload-Offset": str(nuevo)})
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def recurso_subida_finalizar_view(request, id_subida):
+    """Cierra la subida: verifica tamaño y sha256 y crea el Recurso (201, como POST .../recursos/)."""
+    try:
+        rec = almacen.finalizar(id_subida)
+    except almacen.SubidaError as e:
+        return _subida_error(e)
+    return Response(_recurso_json(request, rec), status=status.HTTP_201_CREATED)
+
+@require_http_methods(["GET", "HEAD"])
+def recurso_archivo_view(request, id_recurso: int):
+    """
+    Contenido del recurso con Range, ETag/If-None-Match y, si DOWNLOAD_OFFLOAD está
+    configurado, X-Accel-Redirect/X-Sendfile (ver services/descargas.py).
+    ?descargar=1 lo sirve como adjunto en lugar de inline.
+    """
+    rec = Recurso.objects.select_related("blob").filter(pk=id_recurso).first()
+    if rec is None or not rec.archivo:
+        return JsonResponse({"detail": "Recurso no existe"}, status=404)
+    try:
+        return descargas.responder(request, rec, adjunto=request.GET.get("descargar") in ("1", "true"))
+    except FileNotFoundError:
+        return JsonResponse({"detail": "Archivo no disponible"}, status=404)
+
+@versiones.conditional(lambda request, ra_id: [versiones.ra_key(ra_id, "indicadores")])
 @api_view(["GET"])
 @permission_classes([AllowAny])
 @authentication_classes([])
 def ra_indicadores_view(request, ra_id: int):
-    inds = IndicadoresDeLogro.objects.filter(ra_id=ra_id).order_by("id_ind")
     return Response([{
-        "id": ind.id_ind,
-        "id_ind": ind.id_ind,
-        "descripcion": ind.descripcion,
-        "porcentaje_ind": float(ind.porcentaje_ind),
-    } for ind in inds])
+        "id": ind["id_ind"],
+        "id_ind": ind["id_ind"],
+        "descripcion": ind["descripcion"],
+        "porcentaje_ind": ind["porcentaje_ind"],
+    } for ind in estructura.indicadores_ra(ra_id)])
 
 @api_view(["GET", "POST"])
 @permission_classes([AllowAny])
@@ -350,36 +642,13 @@ def ra_indicadores_view(request, ra_id: int):
 def ra_actividades_view(request, ra_id: int):
     if request.method == "GET":
         id_matricula = request.query_params.get("id_matricula")
-        rels = (RaActividad.objects
-                .filter(ra_id=ra_id)
-                .select_related("actividad__tipo_actividad")
-                .prefetch_related("indicadores_rel__indicador"))
+        notas = {}
+        if id_matricula:
+            notas = {n.ra_actividad_id: n for n in NotasActividad.objects.filter(matricula_id=id_matricula, ra_actividad__ra_id=ra_id)}
         out = []
-        for rel in rels:
-            act = rel.actividad
-            inds = [
-                {
-                    "id_ind": rir.indicador_id,
-                    "descripcion": rir.indicador.descripcion,
-                    "porcentaje_ind": float(rir.indicador.porcentaje_ind),
-                }
-                for rir in rel.indicadores_rel.all()
-            ]
-            row = {
-                "id_actividad": act.id_actividad,
-                "id_ra_actividad": rel.id_ra_actividad,
-                "nombre_actividad": act.nombre_actividad,
-                "porcentaje_actividad": float(act.porcentaje_actividad),
-                "porcentaje_ra_actividad": float(rel.porcentaje_ra_actividad),
-                "id_tipo_actividad": act.tipo_actividad_id,
-                "tipo_actividad": getattr(act.tipo_actividad, "descripcion", None),
-                "fecha_cierre": act.fecha_cierre,
-                "indicadores": inds,
-            }
+        for row in estructura.actividades_ra(ra_id):
             if id_matricula:
-                nota = (NotasActividad.objects
-                        .filter(matricula_id=id_matricula, ra_actividad_id=rel.id_ra_actividad)
-                        .first())
+                nota = notas.get(row["id_ra_actividad"])
                 if nota:
                     row["nota"] = float(nota.nota_ra_actividad) if nota.nota_ra_actividad is not None else None
                     row["retroalimentacion"] = nota.retroalimentacion
@@ -429,6 +698,7 @@ def ra_actividades_view(request, ra_id: int):
         bulk = [RaActividadIndicador(ra_actividad=rel, indicador_id=i) for i in valid_inds]
         if bulk:
             RaActividadIndicador.objects.bulk_create(bulk, ignore_conflicts=True)
+            estructura.invalidate_actividades(ra_id)  # bulk_create no emite post_save
     return Response({
         "id_actividad": act.id_actividad,
         "id_ra_actividad": rel.id_ra_actividad,
@@ -468,67 +738,143 @@ def notas_view(request):
         "id_ind": obj.indicador_id,
     }, status=status.HTTP_200_OK if not created else status.HTTP_201_CREATED)
 
-@api_view(["GET"])
+NOTAS_BULK_MAX_ROWS = 20000
+
+@api_view(["POST"])
 @permission_classes([AllowAny])
 @authentication_classes([])
-def course_student_indicators_view(request, codigo_asignatura: str, id_estudiante: int):
-    asignatura = Asignatura.objects.filter(codigo_asignatura=codigo_asignatura).first()
-    if not asignatura:
-        return Response({"detail": "Asignatura no existe"}, status=status.HTTP_404_NOT_FOUND)
-    mat = Matricula.objects.filter(asignatura=asignatura, estudiante_id=id_estudiante).order_by("-id_matricula").first()
-    if not mat:
-        return Response([], status=status.HTTP_200_OK)
-    inds = IndicadoresDeLogro.objects.filter(ra__asignatura=asignatura).select_related("ra")
-    rows = []
-    for ind in inds:
-        qs = NotasActividad.objects.filter(matricula=mat, indicador_id=ind.id_ind)
-        avg_nota = qs.aggregate(v=Avg("nota_ra_actividad"))["v"]
-        rows.append({
-            "id_ind": ind.id_ind,
-            "ra_id": ind.ra_id,
-            "descripcion": ind.descripcion,
-            "porcentaje_ind": float(ind.porcentaje_ind),
-            "avg_nota": float(avg_nota) if avg_nota is not None else None,
-            "avg_pct": float(avg_nota * 20) if avg_nota is not None else None,
+def notas_bulk_view(request):
+    """
+    Carga masiva de notas: body = [{id_matricula, id_ra_actividad, nota, retroalimentacion?, id_ind?}, ...]
+    (o {"notas": [...]}). Devuelve un resultado por fila; las filas inválidas no impiden guardar las demás.
+    """
+    body = request.data
+    rows = body.get("notas") if isinstance(body, dict) else body
+    if not isinstance(rows, list) or not rows:
+        return Response({"detail": "Se espera una lista de notas"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > NOTAS_BULK_MAX_ROWS:
+        return Response({"detail": f"Máximo {NOTAS_BULK_MAX_ROWS} filas por solicitud"}, status=status.HTTP_400_BAD_REQUEST)
+    results = upsert_notas(rows)
+    resumen = {k: 0 for k in ("created", "updated", "duplicate", "error")}
+    for r in results:
+        resumen[r["status"]] += 1
+    return Response({"resumen": resumen, "resultados": results}, status=status.HTTP_200_OK)
+
+def _indicator_averages(notas_qs):
+    """
+    Promedio de nota por (matrícula, indicador) en una sola agregación agrupada.
+    Devuelve {id_matricula: {id_ind: avg}}.
+    """
+    out = {}
+    rows = (notas_qs
+            .filter(indicador__isnull=False)
+            .values("matricula_id", "indicador_id")
+            .annotate(v=Avg("nota_ra_actividad"))
+            .values_list("matricula_id", "indicador_id", "v"))
+    for id_mat, id_ind, avg in rows:
+        out.setdefault(id_mat, {})[id_ind] = avg
+    return out
+
+def _indicator_row(avg_nota):
+    return {
+        "avg_nota": float(avg_nota) if avg_nota is not None else None,
+        "avg_pct": float(avg_nota * 20) if avg_nota is not None else None,
+    }
+
+# Vistas async: bajo ASGI un agregado lento no bloquea el worker, y las consultas
+# independientes se lanzan a la vez con concurrencia.gather (ver backend/asgi.py).
+
+@require_GET
+async def course_student_indicators_view(request, codigo_asignatura: str, id_estudiante: int):
+    asig_id = await sync_to_async(estructura.asignatura_id)(codigo_asignatura)
+    if not asig_id:
+        return JsonResponse({"detail": "Asignatura no existe"}, status=status.HTTP_404_NOT_FOUND)
+
+    def promedios():
+        id_mat = (Matricula.objects.filter(asignatura_id=asig_id, estudiante_id=id_estudiante)
+                  .order_by("-id_matricula").values_list("id_matricula", flat=True).first())
+        return _indicator_averages(NotasActividad.objects.filter(matricula_id=id_mat)).get(id_mat, {}) if id_mat else None
+
+    avgs, inds = await concurrencia.gather(promedios, lambda: estructura.indicadores_asignatura(asig_id))
+    if avgs is None:
+        return JsonResponse([], safe=False)
+    return JsonResponse([{**ind, **_indicator_row(avgs.get(ind["id_ind"]))} for ind in inds], safe=False)
+
+@require_GET
+async def course_indicators_view(request, codigo_asignatura: str):
+    """
+    Modo cohorte: promedios por estudiante e indicador para todo el curso
+    (opcionalmente filtrado por ?id_periodo= o ?periodo=) en una sola respuesta.
+    Indicadores, promedios y listado de matrículas se consultan en paralelo.
+    """
+    asig_id = await sync_to_async(estructura.asignatura_id)(codigo_asignatura)
+    if not asig_id:
+        return JsonResponse({"detail": "Asignatura no existe"}, status=status.HTTP_404_NOT_FOUND)
+    pid, err = await sync_to_async(_periodo_id_from_params)(request.GET, JsonResponse)
+    if err:
+        return err
+
+    mats = Matricula.objects.filter(asignatura_id=asig_id)
+    notas_qs = NotasActividad.objects.filter(matricula__asignatura_id=asig_id)
+    if pid:
+        mats = mats.filter(periodo_id=pid)
+        notas_qs = notas_qs.filter(matricula__periodo_id=pid)
+    inds, avgs, filas = await concurrencia.gather(
+        lambda: estructura.indicadores_asignatura(asig_id),
+        lambda: _indicator_averages(notas_qs),
+        lambda: list(mats.order_by("estudiante__nombre", "estudiante__apellido").values_list(
+            "id_matricula", "estudiante_id", "estudiante__nombre", "estudiante__apellido")),
+    )
+
+    estudiantes = []
+    for id_mat, id_est, nombre, apellido in filas:
+        por_ind = avgs.get(id_mat, {})
+        estudiantes.append({
+            "id_matricula": id_mat,
+            "id_estudiante": id_est,
+            "nombre": nombre,
+            "apellido": apellido,
+            "indicadores": {str(i["id_ind"]): _indicator_row(por_ind.get(i["id_ind"])) for i in inds},
         })
-    return Response(rows)
+    return JsonResponse({
+        "codigo_asignatura": codigo_asignatura,
+        "id_periodo": int(pid) if pid else None,
+        "indicadores": inds,
+        "estudiantes": estudiantes,
+    })
 
-@api_view(["GET", "PUT", "PATCH"])
-@permission_classes([AllowAny])
-@authentication_classes([])
-def profile_view(request):
-    token = _bearer_token(request)
-    if not token:
-        return Response({"detail": "No autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
-    try:
-        tok = signing.loads(token, max_age=TOKEN_MAX_AGE)
-    except Exception:
-        return Response({"detail": "Token inválido"}, status=status.HTTP_401_UNAUTHORIZED)
+@csrf_exempt
+@require_http_methods(["GET", "PUT", "PATCH"])
+async def profile_view(request):
+    principal, err = await _aprincipal_or_401(request)
+    if err:
+        return err
 
-    rol, uid = tok.get("rol"), tok.get("id")
+    rol, uid = principal.rol, principal.id
+    u = principal.obj
 
     if request.method in ("PUT", "PATCH"):
-        body = request.data or {}
+        try:
+            body = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"detail": "JSON inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(body, dict):
+            return JsonResponse({"detail": "Se espera un objeto JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        # Se edita una copia fresca, no la instancia cacheada; post_save invalida la caché de auth
+        model = Docente if rol == "docente" else Estudiante
+        u = await model.objects.filter(pk=uid).select_related("tipo_documento").afirst()
+        if not u:
+            return JsonResponse({"detail": "Usuario no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        if "correo" in body: u.correo = body["correo"]
         if rol == "docente":
-            u = Docente.objects.filter(pk=uid).first()
-            if not u: return Response({"detail": "Usuario no encontrado"}, status=status.HTTP_404_NOT_FOUND)
-            if "correo" in body: u.correo = body["correo"]
             if "telefono" in body or "num_telefono" in body: u.num_telefono = body.get("telefono") or body.get("num_telefono")
-            u.save()
-        else:
-            u = Estudiante.objects.filter(pk=uid).first()
-            if not u: return Response({"detail": "Usuario no encontrado"}, status=status.HTTP_404_NOT_FOUND)
-            if "correo" in body: u.correo = body["correo"]
-            if "jornada" in body: u.jornada = body["jornada"]
-            u.save()
-        request.method = "GET"
+        elif "jornada" in body:
+            u.jornada = body["jornada"]
+        await u.asave()
 
     if rol == "docente":
-        u = Docente.objects.filter(pk=uid).select_related("tipo_documento").first()
-        if not u:
-            return Response({"detail": "Usuario no encontrado"}, status=status.HTTP_404_NOT_FOUND)
         cursos_qs = Asignatura.objects.filter(docente=u).select_related("programa")
-        cursos = [{"codigo": a.codigo_asignatura, "nombre": a.nombre, "grupo": a.grupo, "programa": getattr(a.programa, "nombre", None)} for a in cursos_qs]
+        cursos = [{"codigo": a.codigo_asignatura, "nombre": a.nombre, "grupo": a.grupo, "programa": getattr(a.programa, "nombre", None)} async for a in cursos_qs]
         details = {
             "correo": u.correo,
             "codigo": u.codigo_docente,
@@ -536,18 +882,15 @@ def profile_view(request):
             "telefono": u.num_telefono,
             "zona_horaria": settings.TIME_ZONE,
         }
-        return Response({"user": _serialize_user(u, "docente"), "details": details, "cursos": cursos, "cursos_por_periodo": []})
+        return JsonResponse({"user": _serialize_user(u, "docente"), "details": details, "cursos": cursos, "cursos_por_periodo": []})
 
-    u = Estudiante.objects.filter(pk=uid).select_related("tipo_documento").first()
-    if not u:
-        return Response({"detail": "Usuario no encontrado"}, status=status.HTTP_404_NOT_FOUND)
     mats = (Matricula.objects
             .filter(estudiante=u)
             .select_related("asignatura__programa", "periodo")
             .order_by("periodo__fecha_inicio"))
     cursos_actuales = []
     grupos = {}
-    for m in mats:
+    async for m in mats:
         a = m.asignatura
         p = m.periodo
         cursos_actuales.append({"codigo": a.codigo_asignatura, "nombre": a.nombre, "grupo": a.grupo, "programa": getattr(a.programa, "nombre", None)})
@@ -562,7 +905,7 @@ def profile_view(request):
         "jornada": u.jornada,
         "zona_horaria": settings.TIME_ZONE,
     }
-    return Response({"user": _serialize_user(u, "estudiante"), "details": details, "cursos": cursos_actuales[-10:], "cursos_por_periodo": list(grupos.values())})
+    return JsonResponse({"user": _serialize_user(u, "estudiante"), "details": details, "cursos": cursos_actuales[-10:], "cursos_por_periodo": list(grupos.values())})
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
@@ -583,48 +926,224 @@ def ra_validation_view(request, ra_id: int):
 @permission_classes([AllowAny])
 @authentication_classes([])
 def asignatura_validation_view(request, codigo_asignatura: str):
-    asig = Asignatura.objects.filter(codigo_asignatura=codigo_asignatura).first()
-    if not asig:
+    asig_id = estructura.asignatura_id(codigo_asignatura)
+    if not asig_id:
         return Response({"detail": "Asignatura no existe"}, status=status.HTTP_404_NOT_FOUND)
-    ra_sum = ResultadoDeAprendizaje.objects.filter(asignatura=asig).aggregate(v=Sum("porcentaje_ra"))["v"] or 0
+    ra_sum = sum(r["porcentaje_ra"] for r in estructura.ras(asig_id))
     return Response({
         "codigo_asignatura": codigo_asignatura,
         "ras": {"suma": float(ra_sum), "ok": float(ra_sum) == 100.0, "faltante": max(0.0, 100.0 - float(ra_sum))},
     })
 
+def _csv_stream_response(qs, filename):
+    resp = StreamingHttpResponse(exportacion.iter_csv(qs), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+@require_GET
+def metrics_view(request):
+    """
+    Exposición Prometheus (texto 0.0.4) de las métricas de todos los workers. El scraper se
+    autentica con `Authorization: Bearer <METRICS_TOKEN>`; sin METRICS_TOKEN no se expone.
+    """
+    esperado = getattr(settings, "METRICS_TOKEN", None)
+    if not esperado:
+        return JsonResponse({"detail": "Métricas deshabilitadas: defina METRICS_TOKEN"}, status=status.HTTP_403_FORBIDDEN)
+    if not constant_time_compare(bearer_token(request) or "", esperado):
+        return JsonResponse({"detail": "No autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@require_http_methods(["GET", "HEAD"])
+def asignatura_recursos_zip_view(request, codigo_asignatura: str):
+    """
+    Todos los recursos de la asignatura en un ZIP armado en streaming (sin compresión,
+    reanudable con Range y revalidable con If-None-Match; ver services/descargas.py).
+    """
+    asig_id = estructura.asignatura_id(codigo_asignatura)
+    if not asig_id:
+        return JsonResponse({"detail": "Asignatura no existe"}, status=404)
+    qs = Recurso.objects.filter(asignatura_id=asig_id).select_related("blob").order_by("fecha_subida", "id_recurso")
+    return descargas.responder_zip(request, qs, f"{codigo_asignatura}-recursos.zip")
+
+@require_GET
+def asignatura_export_view(request, codigo_asignatura: str):
+    """CSV con todas las notas de la asignatura (?id_periodo= / ?periodo= opcional), en streaming. Sólo docentes."""
+    _, err = _docente_or_error(request)
+    if err:
+        return err
+    asig_id = estructura.asignatura_id(codigo_asignatura)
+    if not asig_id:
+        return JsonResponse({"detail": "Asignatura no existe"}, status=404)
+    pid, err = _periodo_id_from_params(request.GET, JsonResponse)
+    if err:
+        return err
+    qs = exportacion.notas_queryset(asignatura_id=asig_id, periodo_id=pid)
+    return _csv_stream_response(qs, f"notas_{codigo_asignatura}.csv")
+
+@require_GET
+def programa_export_view(request, id_programa: int):
+    """CSV con las notas de todas las asignaturas del programa (?id_periodo= / ?periodo= opcional). Sólo docentes."""
+    _, err = _docente_or_error(request)
+    if err:
+        return err
+    if not Programa.objects.filter(pk=id_programa).exists():
+        return JsonResponse({"detail": "Programa no existe"}, status=404)
+    pid, err = _periodo_id_from_params(request.GET, JsonResponse)
+    if err:
+        return err
+    qs = exportacion.notas_queryset(programa_id=id_programa, periodo_id=pid)
+    return _csv_stream_response(qs, f"notas_programa_{id_programa}.csv")
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 @authentication_classes([])
-def notifications_view(request):
-    token = _bearer_token(request)
-    if not token:
-        return Response({"detail": "No autorizado"}, status=status.HTTP_401_UNAUTHORIZED)
+def programa_atencion_ra_view(request, id_programa: int):
+    """Logro de RA e indicadores de todas las asignaturas del programa (?id_periodo= / ?periodo=, ?refresh=1)."""
+    if not Programa.objects.filter(pk=id_programa).exists():
+        return Response({"detail": "Programa no existe"}, status=status.HTTP_404_NOT_FOUND)
+    pid, err = _periodo_id_from_params(request.query_params)
+    if err:
+        return err
+    refresh = request.query_params.get("refresh") in ("1", "true")
+    return Response(analitica.get(id_programa, pid, refresh=refresh))
+
+NOTIFICATIONS_LIMIT = 20
+
+def _estudiante_id(request):
+    """Devuelve (id_estudiante | None, Response 401 | None); None para docentes."""
+    principal, err = _principal_or_401(request)
+    if err:
+        return None, err
+    return (principal.id if principal.rol == "estudiante" else None), None
+
+@require_GET
+async def notifications_view(request):
+    """
+    Lectura del feed materializado (ver services/notificaciones.py).
+    ?since=<id> devuelve solo avisos más nuevos que ese id; ?unread=1 solo los no leídos.
+    """
+    principal, err = await _aprincipal_or_401(request)
+    if err:
+        return err
+    if principal.rol != "estudiante":
+        return JsonResponse([], safe=False)
+
+    qs = (Notificacion.objects
+          .filter(estudiante_id=principal.id)
+          .exclude(vence__lt=datetime.date.today()))
+    since = request.GET.get("since")
+    if since:
+        if not str(since).isdigit():
+            return JsonResponse({"detail": "since inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = qs.filter(id__gt=since)
+    if request.GET.get("unread") in ("1", "true"):
+        qs = qs.filter(leida=False)
     try:
-        tok = signing.loads(token, max_age=TOKEN_MAX_AGE)
-    except Exception:
-        return Response({"detail": "Token inválido"}, status=status.HTTP_401_UNAUTHORIZED)
-    rol, uid = tok.get("rol"), tok.get("id")
-    if rol != "estudiante":
-        return Response([], status=status.HTTP_200_OK)
-
-    mats = Matricula.objects.filter(estudiante_id=uid).select_related("asignatura")
-    hoy = datetime.date.today()
-    limite = hoy + datetime.timedelta(days=7)
-    proximas, bajas = [], []
-
-    for m in mats:
-        rels = RaActividad.objects.filter(ra__asignatura=m.asignatura).select_related("actividad", "ra")
-        notas = {n.ra_actividad_id: n for n in NotasActividad.objects.filter(matricula=m)}
-        for rel in rels:
-            act = rel.actividad
-            n = notas.get(rel.id_ra_actividad)
-            if act.fecha_cierre and (hoy <= act.fecha_cierre <= limite) and (not n or n.nota_ra_actividad is None):
-                proximas.append({"kind": "warning", "text": f'Actividad "{act.nombre_actividad}" de {m.asignatura.nombre} vence {act.fecha_cierre.isoformat()}'})
+        limit = min(int(request.GET.get("limit", NOTIFICATIONS_LIMIT)), 100)
+    except ValueError:
+        limit = NOTIFICATIONS_LIMIT
+    rows = qs.order_by("-id").values_list("id", "kind", "texto", "fecha_creacion", "leida")[:limit]
+    return JsonResponse([{
+        "id": id_notif, "kind": kind, "text": texto, "date": fecha, "read": leida,
+    } async for id_notif, kind, texto, fecha, leida in rows], safe=False)
+
+SSE_KEEPALIVE = getattr(settings, "SSE_KEEPALIVE", 15)
+SSE_RESYNC_INTERVAL = getattr(settings, "SSE_RESYNC_INTERVAL", 60)
+SSE_RETRY_MS = 5000
+
+def _sse(evento, data, id=None):
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {evento}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
 
-    for m in mats:
-        qs = NotasActividad.objects.filter(matricula=m).exclude(nota_ra_actividad__isnull=True)
-        avg = qs.aggregate(v=Avg("nota_ra_actividad"))["v"]
-        if avg is not None and avg < 3.0:
-            bajas.append({"kind": "danger", "text": f'Vas bajo en {m.asignatura.nombre}: promedio {avg:.2f}/5'})
+def _ultimo_aviso(uid):
+    return Notificacion.objects.filter(estudiante_id=uid).aggregate(m=Max("id"))["m"] or 0
 
-    return Response((proximas[:10] + bajas[:10])[:20])
\ No newline at end of file
+def _avisos_desde(uid, last_id):
+    qs = (Notificacion.objects
+          .filter(estudiante_id=uid, id__gt=last_id)
+          .exclude(vence__lt=datetime.date.today())
+          .order_by("id"))
+    return [notificaciones.fila(n) for n in qs]
+
+async def _notifications_stream(uid, last_id):
+    if last_id is None:
+        last_id = await sync_to_async(_ultimo_aviso)(uid)
+    # Lo creado entre esta lectura y la suscripción lo recoge la primera resincronización
+    sub = eventos.suscribir(uid)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        resync, ultimo_resync = True, 0.0
+        while True:
+            if resync or sub.desbordada:
+                # Avisos creados en otros procesos, eventos perdidos o los previos a Last-Event-ID
+                sub.desbordada = False
+                for row in await sync_to_async(_avisos_desde)(uid, last_id):
+                    last_id = row["id"]
+                    yield _sse("notificacion", row, id=last_id)
+                ultimo_resync = time.monotonic()
+            evento = await sub.get(SSE_KEEPALIVE)
+            resync = time.monotonic() - ultimo_resync >= SSE_RESYNC_INTERVAL
+            if evento is None:
+                yield ": keepalive\n\n"
+            elif evento["tipo"] != "notificacion":
+                yield _sse(evento["tipo"], evento["data"])
+            elif evento["data"]["id"] > last_id:
+                last_id = evento["data"]["id"]
+                yield _sse("notificacion", evento["data"], id=last_id)
+    finally:
+        eventos.cancelar(sub)
+
+@require_GET
+async def notifications_stream_view(request):
+    """
+    Server-Sent Events con los avisos del estudiante a medida que cambian sus notas y
+    actividades (pub/sub de services/eventos.py), en lugar de sondear /api/notificaciones.
+    Eventos: `notificacion` (fila del feed, con id), `actualizada` (fila con texto nuevo, mismo
+    id), `retiradas` ({ids}) y `nota` (nota nueva).
+    Al reconectar, EventSource envía Last-Event-ID (o el cliente ?since=) y se reenvían los
+    avisos posteriores. Como EventSource no admite headers, ?token= acepta el token corto de
+    POST /api/notificaciones/stream/token, nunca el de sesión.
+    Sólo bajo ASGI (backend/asgi.py): bajo WSGI StreamingHttpResponse consume el generador
+    async entero antes de enviar un byte, así que se responde 501 y el cliente sigue sondeando.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "El stream requiere un servidor ASGI"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    principal, err = await _aprincipal_or_401(request, request.GET.get("token"))
+    if err:
+        return err
+    if principal.rol != "estudiante":
+        return JsonResponse({"detail": "Solo disponible para estudiantes"}, status=status.HTTP_403_FORBIDDEN)
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    if last_id and not str(last_id).isdigit():
+        return JsonResponse({"detail": "Last-Event-ID inválido"}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(_notifications_stream(principal.id, int(last_id) if last_id else None),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: entregar cada evento sin bufferizar
+    return response
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([BearerTokenAuthentication])
+def notifications_stream_token_view(request):
+    """Token de vida corta para abrir el stream SSE con EventSource (?token=)."""
+    principal, err = _principal_or_401(request)
+    if err:
+        return err
+    return Response({"token": stream_token(principal), "expires_in": STREAM_TOKEN_MAX_AGE})
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+@authentication_classes([BearerTokenAuthentication])
+def notifications_read_view(request):
+    """Marca como leídas las notificaciones indicadas en `ids` (o todas si no se envía)."""
+    uid, err = _estudiante_id(request)
+    if err:
+        return err
+    if not uid:
+        return Response({"updated": 0})
+    qs = Notificacion.objects.filter(estudiante_id=uid, leida=False)
+    ids = (request.data or {}).get("ids")
+    if isinstance(ids, (list, tuple)):
+        qs = qs.filter(id__in=[i for i in ids if str(i).isdigit()])
+    return Response({"updated": qs.update(leida=True)})
@@ -5,6 +5,22 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Las lecturas pesadas de los dashboards (auth/profile, notificaciones y los reportes de
+indicadores por curso) son vistas async: bajo un servidor ASGI esperan a la base sin
+ocupar el worker, así un solo proceso atiende muchas cargas de dashboard a la vez, y
+lanzan sus consultas independientes en paralelo (api/services/concurrencia.py). El resto
+de vistas (DRF) son síncronas y Django las corre en su pool de hilos.
+
+    pip install uvicorn
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+    # o, con gunicorn como gestor de procesos:
+    gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Con varios workers ver también CACHES (DJANGO_CACHE_DIR) y METRICS_DIR en settings.py.
+Bajo WSGI (runserver, backend/wsgi.py) las vistas async también funcionan, pero cada
+request ocupa el hilo completo; el stream SSE /api/notificaciones/stream responde 501 y
+el frontend se queda con el sondeo. Tests: api.tests.AsyncViewTests.
 """
 
 import os
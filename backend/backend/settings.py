@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 
@@ -51,9 +52,25 @@ DATABASES = {
             'PASSWORD': '0422524', # The password for the PostgreSQL user
             'HOST': 'localhost',   # Or the IP address/hostname of your PostgreSQL server
             'PORT': '5432',            # Leave empty for default (5432) or specify if different
+            # Pool de conexiones de psycopg 3 por proceso: abrir/cerrar una conexión pasa a ser
+            # tomarla/devolverla al pool. Lo necesitan sobre todo las vistas async, cuyo fan-out
+            # (api/services/concurrencia.py) usa una conexión por consulta en paralelo. Con pool,
+            # CONN_MAX_AGE queda en 0 (Django lo exige). max_size por proceso: workers x max_size
+            # debe caber en max_connections de PostgreSQL.
+            'OPTIONS': {
+                'pool': {
+                    'min_size': 2,
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': 10,  # segundos esperando una conexión libre antes de fallar
+                },
+            },
         }
     }
 
+# Consultas en paralelo por proceso de concurrencia.gather() (hilos propios). Debe quedar
+# por debajo de DB_POOL_MAX_SIZE para que el fan-out no agote el pool de los requests.
+DB_FANOUT_WORKERS = int(os.environ.get('DB_FANOUT_WORKERS', 4))
+
 
 # Application definition
 
@@ -70,6 +87,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.metrics.MetricsMiddleware",  # primero: mide todo el stack
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -147,8 +165,86 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Si tu front espera arrays (sin {count, results}):
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": None,
+    # Bearer token de /api/auth/login con caché de usuario (api/authentication/authentication.py)
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "api.authentication.authentication.BearerTokenAuthentication",
+    ],
 }
 
+# Caché de Django: LocMem en desarrollo (por proceso). Con varios workers definir
+# DJANGO_CACHE_DIR para usar un backend de archivos compartido, así la invalidación
+# por señales (api/services/estructura.py, autenticación) llega a todos los procesos.
+if os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["DJANGO_CACHE_DIR"],
+            "OPTIONS": {"MAX_ENTRIES": 50000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ra-manager",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Caché de estructura de cursos (asignatura por código, RA, indicadores, árbol de actividades)
+STRUCTURE_CACHE_TIMEOUT = 60 * 60
+
+# Métricas Prometheus en /api/metrics (api/metrics/metrics.py). Con varios workers,
+# METRICS_DIR apunta a un directorio local compartido donde cada proceso vuelca su estado
+# (los archivos de procesos terminados se descartan solos). El scraper manda
+# `Authorization: Bearer $METRICS_TOKEN`; sin METRICS_TOKEN el endpoint responde 403.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_FLUSH_INTERVAL = 5  # segundos
+
+# Stream SSE de notificaciones (/api/notificaciones/stream, sólo bajo ASGI; bajo WSGI
+# responde 501): comentario keepalive para que proxies no corten la conexión y relectura
+# periódica del feed para recoger avisos creados en otros workers (el pub/sub de
+# api/services/eventos.py es por proceso).
+SSE_KEEPALIVE = 15  # segundos
+SSE_RESYNC_INTERVAL = 60  # segundos
+SSE_TOKEN_MAX_AGE = 60  # segundos de validez del token de ?token= (el cliente pide uno por conexión)
+
+# Subidas reanudables de recursos (api/services/almacen.py). UPLOAD_TMP_DIR guarda las
+# partes recibidas: mismo sistema de archivos que MEDIA_ROOT y compartido entre workers.
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR") or str(MEDIA_ROOT.parent / "subidas")
+UPLOAD_CHUNK_MAX = 8 * 1024 * 1024  # bytes por parte
+UPLOAD_MAX_SIZE = 1024 * 1024 * 1024  # bytes por archivo
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # segundos sin actividad antes de descartar la subida
+
+# Cola de trabajos (api/services/trabajos.py): `python manage.py run_workers --concurrency N`.
+# JOBS_EAGER=1 ejecuta cada trabajo en el mismo proceso al confirmar (desarrollo sin workers).
+JOBS_EAGER = os.environ.get("JOBS_EAGER") == "1"
+JOBS_POLL_INTERVAL = 1.0  # segundos entre sondeos de un worker sin trabajo
+JOBS_LEASE = 15 * 60  # segundos; un trabajo en curso más tiempo se da por perdido y se reintenta
+JOBS_BACKOFF_BASE = 10  # segundos antes del primer reintento; se duplica en cada fallo
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_KEEP_DONE = 7 * 24 * 60 * 60  # segundos que se conservan los trabajos terminados
+
+# Resumen diario de vencimientos por correo (api/services/resumenes.py, `manage.py enviar_resumenes`)
+RESUMEN_DIAS = 3  # ventana de cierre de actividades
+RESUMEN_LOTE = 100  # correos por send_messages (y por transacción de la bandeja)
+RESUMEN_MAX_INTENTOS = 3
+
+# Caché de autenticación: LRU por proceso + caché compartida de Django
+AUTH_LRU_SIZE = 2048
+AUTH_LRU_TTL = 60  # segundos; ventana máxima de datos viejos en otros workers
+AUTH_SHARED_CACHE_TTL = 300
+
 # Email (desarrollo): imprime los correos en la consola
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@univalle.local"
+
+# Descarga de recursos (/api/recursos/<id>/archivo, api/services/descargas.py). Con nginx
+# o Apache delante, DOWNLOAD_OFFLOAD="x-accel-redirect" / "x-sendfile" deja el envío del
+# archivo al proxy; vacío, lo envía Django con FileResponse (sendfile bajo gunicorn).
+DOWNLOAD_OFFLOAD = os.environ.get("DOWNLOAD_OFFLOAD") or None
+DOWNLOAD_ACCEL_PREFIX = "/protected-media/"  # location `internal` de nginx con alias a MEDIA_ROOT
+DOWNLOAD_MAX_AGE = 24 * 60 * 60  # segundos; el contenido de un recurso no cambia
+ZIP_MANIFEST_TTL = 24 * 60 * 60  # manifiesto (CRC-32 y layout) del ZIP de recursos de una asignatura
@@ -1,5 +1,5 @@
 import React, { useEffect, useMemo, useRef, useState } from 'react'
-import { getNotifications, type NotificationItem } from '@/services/api'
+import { getNotifications, subscribeNotifications, type NotificationItem } from '@/services/api'
 import { useNavigate } from 'react-router-dom'
 
 const fmt = (iso?: string) => {
@@ -24,8 +24,20 @@ const NotificationsBell: React.FC<Props> = ({ intervalMs = 60000 }) => {
 
   useEffect(() => {
     load()
-    const id = window.setInterval(load, intervalMs)
-    return () => window.clearInterval(id)
+    // Se sondea hasta que el stream SSE abre y otra vez si se cae (o el backend no lo soporta)
+    let poll: number | undefined
+    const startPolling = () => { if (poll === undefined) poll = window.setInterval(load, intervalMs) }
+    const stopPolling = () => { window.clearInterval(poll); poll = undefined }
+    startPolling()
+    const unsubscribe = subscribeNotifications(
+      // Un aviso ya listado (p. ej. `actualizada`) se reemplaza en su lugar
+      it => setItems(prev => prev.some(p => p.id === it.id) ? prev.map(p => p.id === it.id ? it : p) : [it, ...prev]),
+      ids => setItems(prev => prev.filter(p => !ids.includes(p.id))),
+      live => {
+        if (live) { stopPolling(); load() } else startPolling()
+      },
+    )
+    return () => { unsubscribe(); stopPolling() }
   }, [intervalMs])
 
   // close on click outside
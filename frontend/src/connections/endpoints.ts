@@ -30,6 +30,8 @@ export const endpoints = {
   },
   notas: '/notas',
   notificaciones: '/notificaciones',
+  notificacionesStream: '/notificaciones/stream',
+  notificacionesStreamToken: '/notificaciones/stream/token',
 }
 
 export type UserProfile = {
@@ -181,14 +181,68 @@ export async function uploadRecurso(courseId: string, file: File, titulo?: strin
 }
 
 // Notificaciones
+const toNotification = (n: any): NotificationItem => ({
+  id: String(n.id ?? n.uuid ?? Math.random()),
+  kind: n.kind || n.tipo || undefined,
+  text: n.text || n.mensaje || n.descripcion || 'Nueva notificación',
+  date: n.date || n.created_at || n.fecha || undefined,
+  read: Boolean(n.read ?? n.visto ?? false),
+  link: n.link || n.url || undefined,
+})
+
 export async function getNotifications(): Promise<NotificationItem[]> {
   const { data } = await api.get<any[]>(endpoints.notificaciones)
-  return (data || []).map((n: any) => ({
-    id: String(n.id ?? n.uuid ?? Math.random()),
-    kind: n.kind || n.tipo || undefined,
-    text: n.text || n.mensaje || n.descripcion || 'Nueva notificación',
-    date: n.date || n.created_at || n.fecha || undefined,
-    read: Boolean(n.read ?? n.visto ?? false),
-    link: n.link || n.url || undefined,
-  }))
+  return (data || []).map(toNotification)
+}
+
+// Stream SSE de notificaciones. EventSource no permite headers: la query lleva un token
+// corto que sólo sirve para el stream (se pide uno por conexión), nunca el de sesión.
+// onLive(true) llega con el primer `open`; ante un error (red, token vencido o un backend
+// WSGI que responde 501) se cierra, onLive(false) y se reintenta con backoff: el llamador
+// sondea mientras no esté en vivo. Devuelve la función para cerrarlo.
+const STREAM_RETRY_MIN_MS = 5000
+const STREAM_RETRY_MAX_MS = 5 * 60 * 1000
+
+export function subscribeNotifications(
+  onItem: (item: NotificationItem) => void,
+  onRemoved: (ids: string[]) => void,
+  onLive: (live: boolean) => void,
+): () => void {
+  const hasSession = typeof localStorage !== 'undefined' && !!localStorage.getItem('auth_token')
+  if (typeof EventSource === 'undefined' || !hasSession) return () => {}
+  let es: EventSource | null = null
+  let timer: number | undefined
+  let closed = false
+  let lastId = ''
+  let delay = STREAM_RETRY_MIN_MS
+  const onData = (fn: (data: any) => void) => (e: Event) => {
+    try { fn(JSON.parse((e as MessageEvent).data)) } catch { /* ignore */ }
+  }
+  const retry = () => {
+    if (closed) return
+    timer = window.setTimeout(connect, delay)
+    delay = Math.min(delay * 2, STREAM_RETRY_MAX_MS)
+  }
+  async function connect() {
+    let token: string
+    try {
+      const { data } = await api.post<{ token: string }>(endpoints.notificacionesStreamToken)
+      token = data.token
+    } catch { retry(); return }
+    if (closed) return
+    const params = new URLSearchParams({ token })
+    if (lastId) params.set('since', lastId)  // lo que llegó mientras no había stream
+    es = new EventSource(`${api.defaults.baseURL}${endpoints.notificacionesStream}?${params}`)
+    es.onopen = () => { delay = STREAM_RETRY_MIN_MS; onLive(true) }
+    es.onerror = () => { es?.close(); es = null; onLive(false); retry() }
+    es.addEventListener('notificacion', e => {
+      lastId = (e as MessageEvent).lastEventId || lastId
+      onData(n => onItem(toNotification(n)))(e)
+    })
+    es.addEventListener('actualizada', onData(n => onItem(toNotification(n))))
+    es.addEventListener('nota', onData(n => onItem(toNotification(n))))
+    es.addEventListener('retiradas', onData(d => onRemoved((d.ids || []).map(String))))
+  }
+  connect()
+  return () => { closed = true; window.clearTimeout(timer); es?.close() }
 }